@@ -0,0 +1,83 @@
+"""
+법령 청크 분할 벤치마크
+— 대용량 합성 법령 텍스트로 기존 3-정규식 방식과 단일 패스 분할기를 비교
+사용: python bench_legal_chunk.py [--refs] [조문 수 ...]
+  기본 입력은 본문에 조문 인용이 없어 두 방식이 같은 조문을 나누는 공정 비교
+  --refs: 본문에 "제N조에 따른" 인용을 넣음 — 기존 방식은 인용마다 잘려 대부분을 버림 (정확성 비교)
+"""
+import re
+import sys
+import time
+
+from data.label_engine import _chunk_legal_text
+
+
+def _legacy_chunk(text):
+    """기존 방식: DOTALL 지연 정규식 3개 + 2,000자 절단"""
+    patterns = [
+        r'(제\d+조(?:의\d+)?[\s\(].*?)(?=제\d+조|$)',
+        r'(별표\s*\d+.*?)(?=별표\s*\d+|$)',
+        r'(부칙.*?)(?=부칙|$)',
+    ]
+    found = []
+    for pat in patterns:
+        for m in re.finditer(pat, text, re.DOTALL):
+            found.append(m.group(1).strip())
+    return [{"idx": i, "text": c[:2000]} for i, c in enumerate(found) if len(c) > 50]
+
+
+def make_law_text(n_articles, refs=False):
+    """조 → 항 → 호 구조와 별표·부칙을 갖춘 합성 법령 텍스트 (refs=True면 본문에 조문 인용 포함)"""
+    lines = ["식품등의 표시기준", "[시행 2024. 1. 1.] [식품의약품안전처고시]", ""]
+    for a in range(1, n_articles + 1):
+        ref = f"제{max(a - 1, 1)}조에 따른" if refs else "식품의"
+        lines.append(f"제{a}조(목적) 이 고시는 {ref} 표시 기준을 정한다.")
+        for p, mark in enumerate("①②③"[: 1 + a % 3]):
+            lines.append(f"{mark} 영업자는 다음 각 호의 사항을 표시하여야 한다. " + "가나다라마바사 " * (5 + a % 40))
+            for h in range(1, 4):
+                lines.append(f"{h}. 제품명, 내용량 및 원재료명 " + "표시 " * 10)
+    for b in range(1, max(2, n_articles // 50)):
+        lines.append(f"[별표 {b}] 표시방법")
+        lines.extend("1. 글자 크기는 10포인트 이상으로 한다." for _ in range(20))
+    lines.append("부칙 <제2023-1호, 2023. 1. 1.>")
+    lines.append("제1조(시행일) 이 고시는 2024년 1월 1일부터 시행한다. " + "경과조치 " * 20)
+    return "\n".join(lines)
+
+
+def _time(fn, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _covered(text, spans):
+    """청크가 덮는 원문 문자 수 (겹침은 한 번만)"""
+    covered, last = 0, 0
+    for start, end in sorted(spans):
+        start = max(start, last)
+        if end > start:
+            covered += end - start
+            last = end
+    return covered
+
+
+def main(sizes, refs=False):
+    print(f"{'조문수':>8} {'문자수':>12} {'기존(s)':>10} {'단일패스(s)':>12} {'기존청크':>8} {'신규청크':>8}"
+          f" {'기존 유실(자)':>12} {'신규 유실(자)':>12}")
+    for n in sizes:
+        text = make_law_text(n, refs)
+        t_old, old = _time(_legacy_chunk, text)
+        t_new, new = _time(_chunk_legal_text, text)
+        lost_old = len(text) - sum(len(c["text"]) for c in old)
+        lost_new = len(text.strip()) - _covered(text, [(c["start"], c["end"]) for c in new])
+        print(f"{n:>8,} {len(text):>12,} {t_old:>10.4f} {t_new:>12.4f} {len(old):>8,} {len(new):>8,}"
+              f" {max(lost_old, 0):>12,} {max(lost_new, 0):>12,}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    refs = "--refs" in args
+    main([int(x) for x in args if x != "--refs"] or [100, 1000, 5000], refs)
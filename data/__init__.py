@@ -2,6 +2,22 @@
 통합 데이터 모듈
 - common: 식품 R&D 공통 데이터 (매출, 브랜드, 배합비, 원가, 공정 등)
 - label_engine: 표시사항 적부판정 엔진 (법령 스키마, 판정 로직, KB)
+- pdf_ingest: PDF 수집 파이프라인 (페이지별 지연 추출, 병렬 처리, 해시 캐시)
+- beverage_engine: 음료 이화학 엔진 (원료 매칭, 일괄 계산, 배합 최적화, 유사 시장제품)
+- ice_cream_engine: 빙과 이화학 엔진 (엑셀 수식 일괄 계산, 빙점·경도 스윕)
+- formula_engine: 배합비 비교 엔진 (정규화 원료 행렬, L1·코사인 유사도 순위, 메모이즈 CSV 스캐너)
+- formula_store: 배합비 저장소 (SQLite, 학생·제품명·시각 인덱스 조회, 원료 목록 지연 로딩)
+- cost_engine: 원가 엔진 (단가표 최장 일치 인덱스, 원가표, 배합 × 용량 원가 행렬)
+- discrimination_engine: 차이식별 검정 엔진 (최소 정답자 표, 검정력, 필요 패널 수)
+- reliability_engine: 패널 신뢰도 엔진 (패널 × 시료 × 반복 배열, F·CV·ICC·반복성·Cronbach α)
+- anova_engine: 평점 ANOVA 엔진 (균형 설계 배열 제곱합, 불균형은 statsmodels, 해시 메모이즈)
+- batch_engine: 다속성 일괄 분석 (속성별 ANOVA·Tukey·Friedman 병렬 계산, 속성 단위 캐시)
+- posthoc_engine: 사후검정 엔진 (벡터화 Tukey HSD, 스튜던트화 범위 분포, 동질군 문자 표시)
+- ranking_engine: 순위법 정확·순열 검정 (행별 순위, 동점 보정 Friedman, 정확 분포·몬테카를로 조기 종료)
+- bootstrap_engine: 부트스트랩 신뢰구간 (패널 군집 재표집 인덱스 메모이즈, 평균·순위합·JAR 편차 CI)
+- simulation_engine: 조사지 가상 응답 생성 (Generator 기반 패널 × 시료 × 반복 배열, 검정력 시뮬레이터)
+- power_engine: 검정력 · 필요 패널 수 (이항·비중심 F·t 닫힌 식, 몬테카를로 격자 병렬 계산, 칸별 캐시)
+- result_store: 세션 분석 결과 저장소 (표는 세션 임시 디렉터리 Parquet, 메모리엔 요약만, 지연 로딩)
 """
 from data.common import *
 from data.label_engine import (
@@ -13,5 +29,6 @@ from data.label_engine import (
     # re-export under label_ prefix to avoid name collisions
 )
 # Alias to avoid collision with common.py's render_chatbot
+from data.pdf_ingest import iter_pdf_pages, extract_pdf_document, read_upload
 from data.label_engine import render_chatbot as render_label_chatbot
 from data.label_engine import render_api_key_input as render_label_api_key_input
@@ -0,0 +1,144 @@
+"""
+관능 평점 ANOVA 엔진
+- anova_table: 일원(시료) / 이원(시료 + 패널, 선택적으로 시료×패널) ANOVA 표
+  균형 설계(모든 시료×패널 칸의 반복 수 동일)는 배열 합계로 제곱합을 직접 계산하고,
+  불균형이면 statsmodels(ols + anova_lm typ=2)로 넘김 — 결과 표 형식은 두 경로가 동일
+- 같은 데이터·옵션은 내용 해시로 메모이즈 (재실행·다속성 분석 시 재계산 없음)
+"""
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from scipy.stats import f as f_dist
+
+ANOVA_COLUMNS = ["sum_sq", "df", "F", "PR(>F)"]
+_CACHE_SIZE = 64
+_anova_cache = OrderedDict()        # (데이터 해시, 옵션) → ANOVA 결과
+
+
+def term_label(column):
+    """statsmodels 수식과 같은 항 이름 (예: C(Q('시료')))"""
+    return f"C(Q('{column}'))"
+
+
+def data_digest(df, columns):
+    """사용 컬럼 내용 해시 (메모이즈 키)"""
+    h = hashlib.sha1()
+    h.update(repr(list(columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _table(rows, ss_res, df_res):
+    """[(항 이름, 제곱합, 자유도)] + 잔차 → anova_lm(typ=2) 형식 DataFrame"""
+    ms_res = ss_res / df_res if df_res > 0 else np.nan
+    index, data = [], []
+    for name, ss, dof in rows:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            F = (ss / dof) / ms_res if dof > 0 else np.nan
+        p = f_dist.sf(F, dof, df_res) if np.isfinite(F) and df_res > 0 else np.nan
+        index.append(name)
+        data.append([ss, float(dof), F, p])
+    index.append("Residual")
+    data.append([ss_res, float(df_res), np.nan, np.nan])
+    return pd.DataFrame(data, index=index, columns=ANOVA_COLUMNS)
+
+
+def _one_way(y, a_codes, n_a):
+    n_i = np.bincount(a_codes, minlength=n_a)
+    s_i = np.bincount(a_codes, weights=y, minlength=n_a)
+    grand = y.mean()
+    ss_total = ((y - grand) ** 2).sum()
+    present = n_i > 0
+    ss_a = (s_i[present] ** 2 / n_i[present]).sum() - len(y) * grand ** 2
+    ss_a = max(ss_a, 0.0)
+    return ss_a, present.sum() - 1, ss_total - ss_a, len(y) - present.sum()
+
+
+def _cell_counts(a_codes, b_codes, n_a, n_b):
+    return np.bincount(a_codes * n_b + b_codes, minlength=n_a * n_b)
+
+
+def _two_way_balanced(y, a_codes, b_codes, n_a, n_b, n_rep, interaction):
+    cell = a_codes * n_b + b_codes
+    cell_mean = (np.bincount(cell, weights=y, minlength=n_a * n_b) / n_rep).reshape(n_a, n_b)
+    grand = y.mean()
+    a_mean = cell_mean.mean(axis=1)
+    b_mean = cell_mean.mean(axis=0)
+    ss_total = ((y - grand) ** 2).sum()
+    ss_a = n_b * n_rep * ((a_mean - grand) ** 2).sum()
+    ss_b = n_a * n_rep * ((b_mean - grand) ** 2).sum()
+    rows = [(ss_a, n_a - 1), (ss_b, n_b - 1)]
+    if interaction:
+        ss_ab = n_rep * ((cell_mean - a_mean[:, None] - b_mean[None, :] + grand) ** 2).sum()
+        rows.append((ss_ab, (n_a - 1) * (n_b - 1)))
+        df_res = n_a * n_b * (n_rep - 1)
+    else:
+        df_res = len(y) - n_a - n_b + 1
+    ss_res = max(ss_total - sum(r[0] for r in rows), 0.0)
+    return rows, ss_res, df_res
+
+
+def _statsmodels_table(data, score, sample, panel, interaction):
+    """불균형 설계 — statsmodels ols + anova_lm(typ=2)"""
+    from statsmodels.formula.api import ols
+    from statsmodels.stats.anova import anova_lm
+    op = " * " if interaction else " + "
+    rhs = term_label(sample) if panel is None else f"{term_label(sample)}{op}{term_label(panel)}"
+    model = ols(f"Q('{score}') ~ {rhs}", data=data).fit()
+    table = anova_lm(model, typ=2)
+    return table[ANOVA_COLUMNS]
+
+
+def anova_table(df, score, sample, panel=None, interaction=False):
+    """
+    ANOVA 표 (index: 항 이름 + Residual, columns: sum_sq, df, F, PR(>F))
+    panel=None → 일원(시료), panel 지정 → 이원(시료 + 패널), interaction=True → 시료×패널 항 추가
+    (상호작용 항은 빈 칸이 없고 반복 관측이 있을 때만 추정 가능 — 아니면 자동으로 제외)
+    returns: {"table", "method": "balanced"/"one-way"/"statsmodels", "balanced", "n_rep", "interaction"}
+    """
+    columns = [score, sample] + ([panel] if panel is not None else [])
+    key = (data_digest(df, columns), score, sample, panel, bool(interaction))
+    hit = _anova_cache.get(key)
+    if hit is not None:
+        _anova_cache.move_to_end(key)
+        return {**hit, "table": hit["table"].copy()}
+
+    data = df[columns].dropna()
+    y = pd.to_numeric(data[score], errors="coerce").to_numpy(dtype=float)
+    a_codes, a_levels = pd.factorize(data[sample], sort=True)
+    if panel is None:
+        ss_a, df_a, ss_res, df_res = _one_way(y, a_codes, len(a_levels))
+        out = {"table": _table([(term_label(sample), ss_a, df_a)], ss_res, df_res),
+               "method": "one-way", "balanced": None, "n_rep": None, "interaction": False}
+    else:
+        b_codes, b_levels = pd.factorize(data[panel], sort=True)
+        counts = _cell_counts(a_codes, b_codes, len(a_levels), len(b_levels))
+        n_rep = int(counts[0]) if counts.min() == counts.max() and counts[0] > 0 else None
+        # 상호작용 항은 빈 칸이 없고 반복 관측이 있을 때만 추정 가능
+        use_interaction = bool(interaction) and counts.min() > 0 and counts.sum() > len(counts)
+        if n_rep is not None:
+            rows, ss_res, df_res = _two_way_balanced(y, a_codes, b_codes, len(a_levels), len(b_levels),
+                                                     n_rep, use_interaction)
+            names = [term_label(sample), term_label(panel)]
+            if use_interaction:
+                names.append(f"{term_label(sample)}:{term_label(panel)}")
+            table = _table([(nm, ss, d) for nm, (ss, d) in zip(names, rows)], ss_res, df_res)
+            method = "balanced"
+        else:
+            try:
+                table = _statsmodels_table(data, score, sample, panel, use_interaction)
+            except (ValueError, np.linalg.LinAlgError):
+                if not use_interaction:
+                    raise
+                # 칸별 반복이 너무 적어 상호작용 검정이 불가하면 주효과 모형으로
+                use_interaction = False
+                table = _statsmodels_table(data, score, sample, panel, False)
+            method = "statsmodels"
+        out = {"table": table, "method": method, "balanced": n_rep is not None, "n_rep": n_rep,
+               "interaction": use_interaction}
+
+    _anova_cache[key] = out
+    if len(_anova_cache) > _CACHE_SIZE:
+        _anova_cache.popitem(last=False)
+    return {**out, "table": out["table"].copy()}
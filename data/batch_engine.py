@@ -0,0 +1,186 @@
+"""
+다속성 일괄 분석 엔진 (QDA·평점 데이터의 모든 숫자 속성 컬럼)
+- 속성마다 ANOVA(+ Tukey HSD·동질군)와 Friedman 순위 검정을 계산해 한 표로 통합
+- 속성 단위로 프로세스 풀에 분산 (속성이 적거나 풀을 만들 수 없으면 단일 프로세스)
+- 속성별 결과는 (컬럼 내용 해시, 옵션)으로 메모이즈 — 같은 파일을 다시 돌리면 바뀐 속성만 계산
+- sample_means: 시료 × 속성 평균표 (평점법 합격 판정 입력용)
+"""
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import friedmanchisquare
+
+from data.anova_engine import anova_table, data_digest
+from data.posthoc_engine import tukey_hsd
+
+ID_COLUMNS = ("패널", "시료", "반복", "순서", "코드")
+PARALLEL_MIN_ATTRS = 4               # 이보다 적은 속성은 단일 프로세스로 계산
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+_CACHE_SIZE = 256
+_attr_cache = OrderedDict()          # (해시, 속성, 시료, 패널, α) → 속성 결과
+
+
+def attribute_columns(df, exclude=()):
+    """분석 대상 속성 컬럼: 숫자형이고 식별 컬럼(패널·시료·반복 등)이 아닌 컬럼"""
+    skip = set(ID_COLUMNS) | set(c for c in exclude if c)
+    return [c for c in df.select_dtypes(include=np.number).columns if c not in skip]
+
+
+def sample_means(df, attrs, sample="시료"):
+    """시료 × 속성 평균표"""
+    return df.groupby(sample)[list(attrs)].mean()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 속성 하나 분석 (워커에서 실행)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _friedman(data, attr, sample, panel):
+    """패널 × 시료 평균 → 패널 안 순위 Friedman 검정 (빈 칸 있는 패널 제외, 시료 3개 미만이면 NaN)"""
+    if panel is None:
+        return np.nan, np.nan, 0
+    wide = data.groupby([panel, sample])[attr].mean().unstack(sample).dropna()
+    if wide.shape[1] < 3 or wide.shape[0] < 2:
+        return np.nan, np.nan, len(wide)
+    try:
+        stat, p = friedmanchisquare(*[wide[c].to_numpy() for c in wide.columns])
+    except ValueError:
+        return np.nan, np.nan, len(wide)
+    return float(stat), float(p), len(wide)
+
+
+def analyze_attribute(data, attr, sample="시료", panel=None, alpha=0.05):
+    """
+    속성 하나: ANOVA(패널 있으면 이원) + Tukey HSD(+ 동질군 문자) + Friedman
+    returns: {"attr", "n", "means", "anova", "F", "p", "tukey", "sig_pairs", "letters",
+              "friedman_chi2", "friedman_p", "friedman_blocks", "error"}
+    """
+    cols = [attr, sample] + ([panel] if panel else [])
+    data = data[cols].dropna()
+    out = {"attr": attr, "n": len(data), "means": data.groupby(sample)[attr].mean(),
+           "anova": None, "F": np.nan, "p": np.nan, "tukey": None, "sig_pairs": [], "letters": {},
+           "friedman_chi2": np.nan, "friedman_p": np.nan, "friedman_blocks": 0, "error": None}
+    if data[sample].nunique() < 2:
+        out["error"] = "시료 2개 미만"
+        return out
+    try:
+        res = anova_table(data, attr, sample, panel)
+        table = res["table"]
+        out["anova"] = table
+        out["F"], out["p"] = float(table.iloc[0]["F"]), float(table.iloc[0]["PR(>F)"])
+        tukey_res = tukey_hsd(data[attr], data[sample], alpha)
+        tukey = tukey_res["table"]
+        out["tukey"] = tukey
+        out["letters"] = tukey_res["letters"]
+        out["sig_pairs"] = [f"{r.group1}-{r.group2}" for r in tukey.itertuples() if r.reject]
+    except Exception as e:
+        out["error"] = str(e)
+    out["friedman_chi2"], out["friedman_p"], out["friedman_blocks"] = _friedman(data, attr, sample, panel)
+    return out
+
+
+def _worker(payload):
+    data, attr, sample, panel, alpha = payload
+    return analyze_attribute(data, attr, sample, panel, alpha)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 전체 속성 일괄 분석
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _iter_results(payloads, max_workers):
+    """(속성 인덱스, 결과)를 완료되는 대로 yield — 속성이 많으면 프로세스 풀 사용"""
+    if len(payloads) < PARALLEL_MIN_ATTRS or max_workers <= 1:
+        for i, p in enumerate(payloads):
+            yield i, _worker(p)
+        return
+    try:
+        ex = ProcessPoolExecutor(max_workers=max_workers)
+    except Exception:
+        ex = None  # 풀 생성 불가 환경 → 단일 프로세스
+    if ex is None:
+        for i, p in enumerate(payloads):
+            yield i, _worker(p)
+        return
+
+    # 대기 중인 작업을 워커 수의 2배로 제한
+    pending = deque()
+    todo = iter(enumerate(payloads))
+    try:
+        for i, p in todo:
+            pending.append((i, ex.submit(_worker, p)))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            i, fut = pending.popleft()
+            result = fut.result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append((nxt[0], ex.submit(_worker, nxt[1])))
+            yield i, result
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def summary_table(results, alpha=0.05):
+    """속성별 결과 → 통합 표 (속성, N, F, p, 유의, Tukey 유의쌍, Friedman χ², Friedman p, 최고·최저 시료)"""
+    rows = []
+    for r in results:
+        means = r["means"]
+        rows.append({
+            "속성": r["attr"],
+            "N": r["n"],
+            "F": r["F"],
+            "p": r["p"],
+            "유의": bool(r["p"] < alpha) if not np.isnan(r["p"]) else False,
+            "Tukey 유의쌍": len(r["sig_pairs"]),
+            "Friedman χ²": r["friedman_chi2"],
+            "Friedman p": r["friedman_p"],
+            "최고 시료": means.idxmax() if len(means) else None,
+            "최저 시료": means.idxmin() if len(means) else None,
+            "오류": r["error"] or "",
+        })
+    return pd.DataFrame(rows)
+
+
+def analyze_attributes(df, attrs=None, sample="시료", panel=None, alpha=0.05,
+                       max_workers=MAX_WORKERS, on_progress=None, use_cache=True):
+    """
+    모든 속성 일괄 분석
+    on_progress(완료 수, 전체 수, 속성명): 속성 결과가 나올 때마다 호출 (캐시 적중 포함)
+    returns: (통합 표 DataFrame, {속성: analyze_attribute 결과})
+    """
+    attrs = list(attrs) if attrs is not None else attribute_columns(df, (sample, panel))
+    total = len(attrs)
+    results, payloads, keys, missing = {}, [], [], []
+    done = 0
+    for attr in attrs:
+        cols = [attr, sample] + ([panel] if panel else [])
+        key = (data_digest(df, cols), attr, sample, panel, float(alpha))
+        hit = _attr_cache.get(key) if use_cache else None
+        if hit is not None:
+            _attr_cache.move_to_end(key)
+            results[attr] = hit
+            done += 1
+            if on_progress:
+                on_progress(done, total, attr)
+        else:
+            payloads.append((df[cols].copy(), attr, sample, panel, alpha))
+            keys.append(key)
+            missing.append(attr)
+
+    for i, res in _iter_results(payloads, max_workers):
+        results[missing[i]] = res
+        _attr_cache[keys[i]] = res
+        if len(_attr_cache) > _CACHE_SIZE:
+            _attr_cache.popitem(last=False)
+        done += 1
+        if on_progress:
+            on_progress(done, total, missing[i])
+
+    ordered = [results[a] for a in attrs]
+    return summary_table(ordered, alpha), {a: results[a] for a in attrs}
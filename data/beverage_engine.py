@@ -0,0 +1,629 @@
+"""
+음료 이화학 엔진 (beverage_db.json 기반)
+- build_ingredient_index: 원료 DB → 정규화 이름 해시맵 + n-gram 부분일치 인덱스 + 분류 인덱스 + 키워드 별칭표
+- match_ingredient: 기존 find_ingredient와 동일한 우선순위로 O(1)~O(log n) 조회
+- calculate_physical_batch: 배합 × 원료 비율 행렬 → Brix/pH/산도/감미도를 행렬곱 한 번으로 계산
+- optimize_recipe: 목표 규격(beverage_specs) 범위 안에서 최소 원가 배합 + 원가-편차 파레토 집합 (scipy LP)
+- nearest_market_products: 시장제품 특성 행렬 + KD-tree로 유사 제품 k-NN (가중 L1, 결측 특성 마스킹)
+"""
+import os, json
+import numpy as np
+import pandas as pd
+
+from data.cost_engine import price_of
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BEVERAGE_DB_PATH = os.path.join(_APP_DIR, "beverage_db.json")
+
+# 3차 매칭용 키워드 별칭 (입력에 키워드가 있으면 대상 원료명으로 매핑, 순서 = 우선순위)
+INGREDIENT_KEYWORD_ALIASES = {
+    '설탕': '백설탕', '사탕무당': '백설탕',
+    '과당': '고과당', 'hfcs': '고과당',
+    '물': '정제수', '정제수': '정제수',
+    '산미료': '구연산', '시트르산': '구연산',
+    '탄산': '정제수', 'co2': '정제수',
+    '우유': '전지유',
+    '소금': '정제염',
+}
+
+_INDEX_CACHE_SIZE = 4
+_index_cache = []       # [(원료·제품 리스트, 인덱스)] — 같은 리스트 객체면 재사용
+
+
+def read_beverage_db(path=BEVERAGE_DB_PATH):
+    """음료 DB(JSON) 로드 — 파일이 없거나 깨졌으면 빈 DB"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {'ingredients': [], 'market_products': [], 'beverage_specs': []}
+
+
+def normalize_name(value):
+    """매칭용 정규화: 공백 제거 + 소문자"""
+    return str(value).replace(' ', '').lower()
+
+
+# ━━━ 부분일치 인덱스 ━━━
+# 문자열 집합에서 "s ⊆ q 또는 q ⊆ s" 인 s 중 DB 순서가 가장 앞선 것을 찾는다
+#   - s ⊆ q: q의 부분문자열을 해시맵에서 조회 (q 길이에만 비례)
+#   - q ⊆ s: q의 2-gram 포스팅 리스트 교집합 후보만 검증
+
+def _containment_table(keys_with_pos):
+    first = {}
+    for key, pos in keys_with_pos:
+        if key and key not in first:
+            first[key] = pos
+    grams = {}
+    for key in first:
+        for g in _grams(key):
+            grams.setdefault(g, set()).add(key)
+    return {
+        "first": first,
+        "grams": grams,
+        "max_len": max((len(k) for k in first), default=0),
+    }
+
+
+def _grams(s):
+    return {s} if len(s) < 2 else {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+def _containment_lookup(table, q):
+    """조건을 만족하는 키 중 최소 DB 위치 (없으면 None)"""
+    first = table["first"]
+    best = None
+
+    # s ⊆ q (완전일치 포함)
+    max_len = table["max_len"]
+    for i in range(len(q)):
+        for j in range(i + 1, min(len(q), i + max_len) + 1):
+            pos = first.get(q[i:j])
+            if pos is not None and (best is None or pos < best):
+                best = pos
+
+    # q ⊆ s
+    if len(q) < 2:
+        candidates = (k for k in first if q in k)
+    else:
+        postings = []
+        for g in _grams(q):
+            keys = table["grams"].get(g)
+            if not keys:
+                postings = None
+                break
+            postings.append(keys)
+        if postings is None:
+            candidates = ()
+        else:
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+    for k in candidates:
+        if q in k:
+            pos = first[k]
+            if best is None or pos < best:
+                best = pos
+    return best
+
+
+# ━━━ 원료 인덱스 ━━━
+
+def build_ingredient_index(ingredients_db):
+    """원료 리스트 → 매칭 인덱스 (load_beverage_db 결과로 1회 생성 후 재사용)"""
+    ingredients_db = ingredients_db or []
+    names = _containment_table(
+        (normalize_name(ing.get('name', '')), pos) for pos, ing in enumerate(ingredients_db))
+    subs = _containment_table(
+        (normalize_name(ing.get('category_sub', '')), pos) for pos, ing in enumerate(ingredients_db))
+    mains = _containment_table(
+        (normalize_name(ing.get('category_main', '')), pos) for pos, ing in enumerate(ingredients_db))
+
+    aliases = []
+    for kw, mapped in INGREDIENT_KEYWORD_ALIASES.items():
+        target = next((pos for pos, ing in enumerate(ingredients_db)
+                       if mapped in str(ing.get('name', ''))), None)
+        if target is not None:
+            aliases.append((kw, target))
+
+    categories = {}
+    for pos, ing in enumerate(ingredients_db):
+        categories.setdefault(str(ing.get('category_main', '')), []).append(pos)
+
+    return {
+        "ingredients": ingredients_db,
+        "names": names,
+        "subs": subs,
+        "mains": mains,
+        "aliases": aliases,
+        "by_category": categories,
+        "memo": {},
+    }
+
+
+def ingredient_index(ingredients_db):
+    """원료 리스트(또는 이미 만든 인덱스) → 인덱스 — 같은 리스트 객체는 다시 만들지 않음"""
+    if isinstance(ingredients_db, dict) and "names" in ingredients_db:
+        return ingredients_db
+    for src, idx in _index_cache:
+        if src is ingredients_db and "names" in idx:
+            return idx
+    idx = build_ingredient_index(ingredients_db)
+    _index_cache.append((ingredients_db, idx))
+    del _index_cache[:-_INDEX_CACHE_SIZE]
+    return idx
+
+
+def match_ingredient(index, name_query):
+    """
+    원료명 → 원료 dict 또는 None (find_ingredient와 같은 우선순위)
+    1차 원료명 부분일치 → 2차 소분류·대분류 부분일치 → 3차 키워드 별칭
+    각 단계 안에서는 DB 순서가 앞선 원료가 우선
+    """
+    if not name_query or not index["ingredients"]:
+        return None
+    q = normalize_name(str(name_query).strip())
+    if not q:
+        return None
+    memo = index["memo"]
+    if q in memo:
+        return memo[q]
+
+    pos = _containment_lookup(index["names"], q)
+    if pos is None:
+        p_sub = _containment_lookup(index["subs"], q)
+        p_main = _containment_lookup(index["mains"], q)
+        cands = [p for p in (p_sub, p_main) if p is not None]
+        pos = min(cands) if cands else None
+    if pos is None:
+        pos = next((target for kw, target in index["aliases"] if kw in q), None)
+
+    found = index["ingredients"][pos] if pos is not None else None
+    memo[q] = found
+    return found
+
+
+def ingredients_in_category(index, category_main):
+    """대분류 → 해당 원료 리스트 (DB 순서)"""
+    return [index["ingredients"][p] for p in index["by_category"].get(category_main, [])]
+
+
+# ━━━ 일괄 이화학 계산 (행렬) ━━━
+# 배합 i의 이화학값 = Σ_j 비율[i, j] × 계수[j, :]  →  R(배합×원료) @ C(원료×4)
+
+COEF_FIELDS = ['brix_per_1pct', 'ph_delta_per_1pct', 'acidity_per_1pct', 'sweetness_per_1pct']
+BASE_PH = 3.5                   # pH 기준값 (ph_delta 합을 더함)
+PH_CLIP = (2.0, 9.0)
+
+
+def _to_float(value):
+    try:
+        return float(value or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def coefficient_matrix(index):
+    """원료 DB → 계수 행렬 C (원료 수 × 4) — 인덱스에 1회 저장 후 재사용"""
+    if "coef" not in index:
+        index["coef"] = np.array(
+            [[_to_float(ing.get(f)) for f in COEF_FIELDS] for ing in index["ingredients"]],
+            dtype=float).reshape(len(index["ingredients"]), len(COEF_FIELDS))
+    return index["coef"]
+
+
+def recipes_to_matrix(recipes, index):
+    """
+    배합 리스트 → (비율 행렬 R, 미매칭 원료 리스트)
+    recipes: [[{'ingredient': 원료명, 'ratio_pct': 비율}, ...], ...]
+    R[i, j] = 배합 i에서 DB 원료 j의 비율 합 (0 이하·숫자 아닌 비율은 제외)
+    """
+    n = len(index["ingredients"])
+    pos_of = {id(ing): j for j, ing in enumerate(index["ingredients"])}
+    R = np.zeros((len(recipes), n), dtype=float)
+    unmatched = []
+    for i, recipe in enumerate(recipes):
+        missing = []
+        for item in recipe:
+            name = item.get('ingredient', '')
+            try:
+                ratio = float(item.get('ratio_pct', 0))
+            except (ValueError, TypeError):
+                continue
+            if ratio <= 0:
+                continue
+            found = match_ingredient(index, name)
+            if found is None:
+                missing.append(name)
+            else:
+                R[i, pos_of[id(found)]] += ratio
+        unmatched.append(missing)
+    return R, unmatched
+
+
+def calculate_physical_batch(ratios, index, unmatched=None):
+    """
+    비율 행렬 R (배합 수 × DB 원료 수, 단위 %) → 배합별 이화학값 DataFrame
+    calculate_physical_from_recipe와 같은 반올림·pH 제한·당산비·신뢰도 규칙 적용
+    columns: calculated_brix, calculated_ph, calculated_acidity_pct, calculated_sweetness_index,
+             sugar_acid_ratio, total_matched_ratio, confidence (+ unmatched_ingredients)
+    """
+    R = np.atleast_2d(np.asarray(ratios, dtype=float))
+    C = coefficient_matrix(index)
+    sums = R @ C                                 # (배합 수 × 4) — 한 번의 행렬곱
+    matched = R.sum(axis=1)
+    has = matched > 0
+
+    brix = np.round(sums[:, 0], 2)
+    ph = np.clip(np.round(BASE_PH + sums[:, 1], 2), *PH_CLIP)
+    acidity = np.round(sums[:, 2], 3)
+    sweetness = np.round(sums[:, 3], 2)
+
+    sar_ok = has & (brix != 0) & (acidity > 0.01)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sar = np.where(sar_ok, np.round(brix / np.where(sar_ok, acidity, 1.0), 1), np.nan)
+
+    confidence = np.select([matched >= 90, matched >= 70], ['high', 'medium'], default='low')
+
+    out = pd.DataFrame({
+        'calculated_brix': np.where(has, brix, np.nan),
+        'calculated_ph': np.where(has, ph, np.nan),
+        'calculated_acidity_pct': np.where(has, acidity, np.nan),
+        'calculated_sweetness_index': np.where(has, sweetness, np.nan),
+        'sugar_acid_ratio': sar,
+        'total_matched_ratio': np.round(matched, 1),
+        'confidence': confidence,
+    })
+    if unmatched is not None:
+        out['unmatched_ingredients'] = unmatched
+    return out
+
+
+def calculate_recipes_batch(recipes, index):
+    """배합 리스트 → 이화학값 DataFrame (recipes_to_matrix + calculate_physical_batch)"""
+    R, unmatched = recipes_to_matrix(recipes, index)
+    return calculate_physical_batch(R, index, unmatched)
+
+
+def ratio_sweep(base_recipe, ingredient, values, index, balance='정제수'):
+    """
+    what-if 스윕: base_recipe에서 ingredient 비율만 values로 바꾼 배합들의 비율 행렬
+    balance 원료가 있으면 총합 100%가 유지되도록 그 비율로 차이를 보정
+    returns: (R, values)
+    """
+    R, _ = recipes_to_matrix([base_recipe], index)
+    target = match_ingredient(index, ingredient)
+    if target is None:
+        raise KeyError(f"DB에 없는 원료: {ingredient}")
+    pos_of = {id(ing): j for j, ing in enumerate(index["ingredients"])}
+    j = pos_of[id(target)]
+    values = np.asarray(values, dtype=float)
+    sweep = np.repeat(R, len(values), axis=0)
+    delta = values - sweep[:, j]
+    sweep[:, j] = values
+    filler = match_ingredient(index, balance) if balance else None
+    if filler is not None and pos_of[id(filler)] != j:
+        k = pos_of[id(filler)]
+        sweep[:, k] = np.maximum(sweep[:, k] - delta, 0.0)
+    return sweep, values
+
+
+# ━━━ 배합 최적화 (LP) ━━━
+# 변수 x_j = 후보 원료 j의 비율(%), Σx = 100, 하한 ≤ x_j ≤ 상한
+# 이화학값은 x에 선형 (brix = C_b·x, pH = 3.5 + C_p·x, 산도 = C_a·x) → 규격 범위 = 선형 제약
+# 편차 = Σ_k |값_k − 범위 중앙_k| / 반폭_k  (|·|는 보조변수 s⁺, s⁻로 선형화)
+# 원가 최소 ↔ 편차 최소 사이를 ε-제약법으로 훑어 파레토 집합 생성
+
+TARGET_PROPS = [('brix', 0), ('ph', 1), ('acidity', 2)]     # (규격 키, 계수 열)
+
+
+def parse_spec_range(value):
+    """'10~14' → (10.0, 14.0), '0' → (0.0, 0.0), '—'·'≥10%'·None → None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return (float(value), float(value))
+    parts = str(value).replace('％', '').replace('%', '').split('~')
+    try:
+        nums = [float(p.strip()) for p in parts]
+    except ValueError:
+        return None
+    if len(nums) == 1:
+        return (nums[0], nums[0])
+    if len(nums) == 2 and nums[0] <= nums[1]:
+        return (nums[0], nums[1])
+    return None
+
+
+def spec_targets(spec):
+    """beverage_specs 항목 → {'brix': (lo, hi), 'ph': ..., 'acidity': ...} (수치 범위가 있는 것만)"""
+    targets = {}
+    for key in ('brix', 'ph', 'acidity'):
+        rng = parse_spec_range(spec.get(f'{key}_range'))
+        if rng is not None:
+            targets[key] = rng
+    return targets
+
+
+def find_spec(db, beverage_type):
+    """음료 유형명 → beverage_specs 항목 (없으면 None)"""
+    return next((s for s in db.get('beverage_specs', []) if s.get('type') == beverage_type), None)
+
+
+def _lp_solve(c, A_ub, b_ub, A_eq, b_eq, bounds):
+    from scipy.optimize import linprog
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    return res.x if res.status == 0 else None
+
+
+def optimize_recipe(index, shortlist, targets, prices=None, cost_table=None,
+                    volume_ml=500, n_points=12, hard_ranges=True):
+    """
+    목표 규격을 맞추는 최소 원가 배합 + 원가-편차 파레토 집합
+
+    index: ingredient_index 결과
+    shortlist: [원료명, ...] 또는 {원료명: (하한%, 상한%)}
+    targets: {'brix': (lo, hi), 'ph': (lo, hi), 'acidity': (lo, hi)} — spec_targets 결과 등
+    prices: {원료명: 원/kg} (우선) / cost_table: INGREDIENT_COSTS 형식 (cost_engine 최장 일치 보조)
+    hard_ranges: True면 규격 범위를 제약으로, False면 편차만 최소화 대상으로 사용
+
+    returns: (result, msg)
+      result = {"ingredients", "matched", "unmatched", "unpriced", "targets",
+                "points": 파레토 DataFrame (원가↑ 편차↓ 순), "min_cost", "min_dev"}
+    """
+    if isinstance(shortlist, dict):
+        items = [(name, shortlist[name]) for name in shortlist]
+    else:
+        items = [(name, (0.0, 100.0)) for name in shortlist]
+    if not items:
+        return None, "후보 원료가 없습니다"
+
+    C_all = coefficient_matrix(index)
+    pos_of = {id(ing): j for j, ing in enumerate(index["ingredients"])}
+    names, rows, bounds, unit_prices, matched, unpriced, unmatched = [], [], [], [], {}, [], []
+    for name, (lo, hi) in items:
+        found = match_ingredient(index, name)
+        if found is None:
+            unmatched.append(name)
+            continue
+        price = (prices or {}).get(name)
+        if price is None:
+            price, _ = price_of(name, cost_table) if cost_table else (None, "")
+        if price is None:
+            price = 0.0
+            unpriced.append(name)
+        names.append(name)
+        rows.append(C_all[pos_of[id(found)]])
+        bounds.append((max(float(lo), 0.0), min(float(hi), 100.0)))
+        unit_prices.append(float(price))
+        matched[name] = found.get('name', '')
+
+    if not names:
+        return None, f"DB에서 찾을 수 없는 원료뿐입니다: {', '.join(unmatched)}"
+
+    C = np.array(rows)                                       # (후보 수 × 4)
+    n = len(names)
+    props = [(key, col) for key, col in TARGET_PROPS if key in targets]
+    K = len(props)
+    if K == 0:
+        return None, "수치 목표 범위가 없습니다 (Brix/pH/산도 중 하나 이상 필요)"
+
+    base = {'brix': 0.0, 'ph': BASE_PH, 'acidity': 0.0}
+    mids = np.array([(targets[k][0] + targets[k][1]) / 2 for k, _ in props])
+    halfw = np.array([max((targets[k][1] - targets[k][0]) / 2, 0.05 if k == 'ph' else 0.1)
+                      for k, _ in props])
+    coef = np.array([C[:, col] for _, col in props])        # (K × n)
+    offs = np.array([base[k] for k, _ in props])
+
+    # 변수 [x(n), s⁺(K), s⁻(K)]
+    cost = np.concatenate([np.array(unit_prices) * volume_ml / 100 / 1000, np.zeros(2 * K)])
+    dev = np.concatenate([np.zeros(n), 1 / halfw, 1 / halfw])
+
+    A_eq = np.zeros((1 + K, n + 2 * K))
+    A_eq[0, :n] = 1.0
+    A_eq[1:, :n] = coef
+    A_eq[1:, n:n + K] = -np.eye(K)
+    A_eq[1:, n + K:] = np.eye(K)
+    b_eq = np.concatenate([[100.0], mids - offs])
+
+    A_ub, b_ub = [], []
+    if hard_ranges:
+        los = np.array([targets[k][0] for k, _ in props]) - offs
+        his = np.array([targets[k][1] for k, _ in props]) - offs
+        pad = np.zeros((K, 2 * K))
+        A_ub += list(np.hstack([coef, pad])) + list(np.hstack([-coef, pad]))
+        b_ub += list(his) + list(-los)
+    var_bounds = bounds + [(0, None)] * (2 * K)
+
+    def solve(obj, eps=None):
+        A, b = list(A_ub), list(b_ub)
+        if eps is not None:
+            A.append(dev)
+            b.append(eps)
+        return _lp_solve(obj, np.array(A) if A else None, np.array(b) if b else None,
+                         A_eq, b_eq, var_bounds)
+
+    x_cost = solve(cost + 1e-9 * dev)
+    if x_cost is None:
+        return None, "규격 범위를 만족하는 배합이 없습니다 (후보 원료·비율 범위를 확인하세요)"
+    x_dev = solve(dev + 1e-9 * cost)
+    d_min, d_max = float(dev @ x_dev), float(dev @ x_cost)
+
+    sols = [x_dev]
+    if d_max - d_min > 1e-6:
+        for eps in np.linspace(d_min, d_max, max(n_points, 2))[1:-1]:
+            x = solve(cost, eps + 1e-9)
+            if x is not None:
+                sols.append(x)
+    sols.append(x_cost)
+
+    X = np.array([x[:n] for x in sols])
+    values = X @ C
+    points = pd.DataFrame(np.round(X, 3), columns=names)
+    points.insert(0, "원가(원)", np.round(X @ cost[:n], 2))
+    points.insert(1, "편차", np.round(np.array([dev @ x for x in sols]), 4))
+    points.insert(2, "Brix", np.round(values[:, 0], 2))
+    points.insert(3, "pH", np.clip(np.round(BASE_PH + values[:, 1], 2), *PH_CLIP))
+    points.insert(4, "산도(%)", np.round(values[:, 2], 3))
+    points = (points.drop_duplicates(subset=["원가(원)", "편차"])
+              .sort_values(["원가(원)", "편차"]).reset_index(drop=True))
+    # 지배되는 점 제거 (원가가 같거나 높은데 편차도 같거나 큰 점)
+    keep = points["편차"] < points["편차"].cummin().shift(fill_value=np.inf)
+    points = points[keep].reset_index(drop=True)
+
+    result = {
+        "ingredients": names,
+        "matched": matched,
+        "unmatched": unmatched,
+        "unpriced": unpriced,
+        "targets": {k: targets[k] for k, _ in props},
+        "points": points,
+        "min_cost": points.iloc[0],
+        "min_dev": points.iloc[-1],
+    }
+    msg = f"파레토 배합 {len(points)}개"
+    if unmatched:
+        msg += f" (DB 미매칭 {len(unmatched)}종 제외: {', '.join(unmatched)})"
+    if unpriced:
+        msg += f" (단가 미등록 {len(unpriced)}종은 0원으로 계산: {', '.join(unpriced)})"
+    return result, msg
+
+
+# ━━━ 유사 시장제품 탐색 (KD-tree) ━━━
+# 거리 = 2·|ΔBrix| + 3·|ΔpH| + 5·|Δ산도| — 한쪽이라도 값이 없는 특성은 더하지 않음 (마스킹)
+# 제품을 "값이 있는 특성 조합(마스크)"별로 묶으면 묶음 안에서는 쓰는 차원이 같으므로
+# 가중치를 곱한 좌표로 L1 KD-tree를 만들 수 있다 (묶음 × 질의 마스크별 1회 생성 후 재사용)
+
+MARKET_FEATURES = ['brix', 'ph', 'acidity_pct']
+MARKET_WEIGHTS = np.array([2.0, 3.0, 5.0])
+PHYSICAL_KEYS = ['calculated_brix', 'calculated_ph', 'calculated_acidity_pct']
+
+
+def _market_category_key(category):
+    """카테고리 → 후보군 키 ('음료'만 후보를 좁히고 나머지는 전체)"""
+    return '음료' if category == '음료' else '*'
+
+
+def _in_market_category(key, product):
+    if key != '음료':
+        return True
+    p_main = str(product.get('category_main', ''))
+    p_sub = str(product.get('category_sub', ''))
+    if '음료' in p_main or '음료' in p_sub:
+        return True
+    return '과일' in p_main or '탄산' in p_main or '차' in p_main
+
+
+def _feature(value, allow_zero):
+    """특성값 → float, 없거나(0 포함 여부는 allow_zero) 숫자가 아니면 NaN"""
+    if value is None or (not allow_zero and not value):
+        return np.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def build_market_index(products):
+    """market_products → 특성 행렬 X (제품 수 × 3, 결측 NaN) + 후보군별 마스크 묶음"""
+    products = products or []
+    X = np.array([[_feature(p.get('brix'), True),
+                   _feature(p.get('ph'), False),
+                   _feature(p.get('acidity_pct'), False)] for p in products],
+                 dtype=float).reshape(len(products), 3)
+    present = ~np.isnan(X)
+    groups = {}
+    for key in ('음료', '*'):
+        rows = np.array([i for i, p in enumerate(products)
+                         if present[i, 0] and _in_market_category(key, p)], dtype=int)
+        by_mask = {}
+        for i in rows:
+            by_mask.setdefault(tuple(present[i]), []).append(i)
+        groups[key] = {m: np.array(r, dtype=int) for m, r in by_mask.items()}
+    return {"products": products, "X": X, "groups": groups, "trees": {}}
+
+
+def market_index(products):
+    """market_products(또는 이미 만든 인덱스) → 인덱스 — 같은 리스트 객체는 다시 만들지 않음"""
+    if isinstance(products, dict) and "groups" in products:
+        return products
+    for src, idx in _index_cache:
+        if src is products and "groups" in idx:
+            return idx
+    idx = build_market_index(products)
+    _index_cache.append((products, idx))
+    del _index_cache[:-_INDEX_CACHE_SIZE]
+    return idx
+
+
+def _market_tree(mindex, key, pmask, dims):
+    from scipy.spatial import cKDTree
+    tkey = (key, pmask, dims)
+    if tkey not in mindex["trees"]:
+        rows = mindex["groups"][key][pmask]
+        d = list(dims)
+        mindex["trees"][tkey] = cKDTree(mindex["X"][rows][:, d] * MARKET_WEIGHTS[d])
+    return mindex["trees"][tkey]
+
+
+def _physical_row(physical):
+    """이화학값 dict → 질의 벡터 (Brix 0 허용, pH·산도는 0/None이면 미사용)"""
+    return [_feature(physical.get(PHYSICAL_KEYS[0]), True),
+            _feature(physical.get(PHYSICAL_KEYS[1]), False),
+            _feature(physical.get(PHYSICAL_KEYS[2]), False)]
+
+
+def nearest_market_products(mindex, physicals, category, top_n=3):
+    """
+    여러 배합의 이화학값 → 각각의 유사 시장제품 상위 top_n (거리 같으면 DB 순서)
+    physicals: [calculate_physical_from_recipe 결과 dict, ...] 또는 DataFrame (calculated_* 컬럼)
+    returns: [[제품 dict, ...], ...] — Brix가 없는 질의는 []
+    """
+    if isinstance(physicals, pd.DataFrame):
+        physicals = physicals.to_dict('records')
+    Q = np.array([_physical_row(ph) for ph in physicals], dtype=float).reshape(len(physicals), 3)
+    results = [[] for _ in range(len(Q))]
+    key = _market_category_key(category)
+    groups = mindex["groups"].get(key, {})
+    if not groups or top_n <= 0:
+        return results
+
+    X = mindex["X"]
+    qpresent = ~np.isnan(Q)
+    valid = np.flatnonzero(qpresent[:, 0])
+    qmasks = {}
+    for qi in valid:
+        qmasks.setdefault(tuple(qpresent[qi]), []).append(qi)
+
+    for qmask, qrows in qmasks.items():
+        qrows = np.array(qrows, dtype=int)
+        # 1) 묶음별 k-NN으로 k번째 거리 상한 확보
+        plans = []
+        for pmask, rows in groups.items():
+            dims = tuple(d for d in range(3) if qmask[d] and pmask[d])
+            tree = _market_tree(mindex, key, pmask, dims)
+            pts = Q[qrows][:, list(dims)] * MARKET_WEIGHTS[list(dims)]
+            k = min(top_n, len(rows))
+            dist, _ = tree.query(pts, k=k, p=1)
+            dist = dist.reshape(len(qrows), k)
+            plans.append((rows, dims, tree, pts, dist))
+        all_d = np.sort(np.hstack([p[4] for p in plans]), axis=1)
+        kth = all_d[:, min(top_n, all_d.shape[1]) - 1]
+        radius = kth * (1 + 1e-9) + 1e-9
+
+        # 2) 상한 이내 후보를 모아 원래 식 그대로 거리 재계산 → (거리, DB 순서) 정렬
+        cands = [[] for _ in range(len(qrows))]
+        for rows, dims, tree, pts, _ in plans:
+            for j, hits in enumerate(tree.query_ball_point(pts, r=radius, p=1)):
+                if hits:
+                    cands[j].append(rows[hits])
+        for j, qi in enumerate(qrows):
+            idx = np.sort(np.concatenate(cands[j]))
+            P = X[idx]
+            d = np.abs(Q[qi, 0] - P[:, 0]) * 2.0
+            for f in (1, 2):
+                if qmask[f]:
+                    use = ~np.isnan(P[:, f])
+                    d = d + np.where(use, np.abs(Q[qi, f] - np.where(use, P[:, f], 0.0)) * MARKET_WEIGHTS[f], 0.0)
+            order = np.argsort(d, kind='stable')[:top_n]
+            results[qi] = [mindex["products"][i] for i in idx[order]]
+    return results
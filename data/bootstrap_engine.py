@@ -0,0 +1,148 @@
+"""
+관능 평균 부트스트랩 신뢰구간 엔진 (패널 단위 군집 재표집)
+- resample_index: (반복 × 패널) 재표집 인덱스 행렬 — (패널 수, 반복 수, seed)별로 한 번 만들어 메모이즈
+- resample_counts: 인덱스 행렬 → 패널별 선택 횟수 행렬 (합계형 통계량은 행렬곱 한 번)
+- bootstrap_stat: 임의 통계량 CI — statistic(재표본, axis=1)로 반복 축 전체를 한 번에 축약 (반복 묶음 단위)
+- cluster_means: 긴 형식(패널·그룹·점수) 평균 CI — 패널별 합계·관측 수로 군집 비율 평균
+- rank_sum_ci / jar_deviation_ci: 순위합, JAR 편차(|평균 − 최적|)의 CI
+- 같은 seed면 같은 결과 (전역 난수 상태를 쓰지 않음)
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+N_BOOT = 10000
+CONFIDENCE = 0.95
+SEED = 0
+_BOOT_CHUNK_CELLS = 2_000_000        # bootstrap_stat 한 묶음의 (반복 × 패널 × 값) 상한
+_CACHE_SIZE = 8
+_index_cache = OrderedDict()         # (패널 수, 반복 수, seed) → 재표집 인덱스 행렬
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 재표집 인덱스
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def resample_index(n_clusters, n_boot=N_BOOT, seed=SEED):
+    """(n_boot × n_clusters) 복원추출 인덱스 — 같은 (패널 수, 반복 수, seed)면 같은 행렬 재사용"""
+    key = (int(n_clusters), int(n_boot), seed)
+    hit = _index_cache.get(key)
+    if hit is not None:
+        _index_cache.move_to_end(key)
+        return hit
+    rng = np.random.default_rng(seed)
+    dtype = np.int32 if n_clusters < 2 ** 31 else np.int64
+    idx = rng.integers(0, n_clusters, size=(int(n_boot), int(n_clusters)), dtype=dtype)
+    idx.setflags(write=False)
+    _index_cache[key] = idx
+    if len(_index_cache) > _CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return idx
+
+
+def resample_counts(n_clusters, n_boot=N_BOOT, seed=SEED):
+    """(n_boot × n_clusters) 패널별 선택 횟수 — 재표본 합계 = counts @ 패널별 합계"""
+    idx = resample_index(n_clusters, n_boot, seed)
+    offsets = (np.arange(idx.shape[0], dtype=np.int64) * n_clusters)[:, None]
+    flat = np.bincount((idx + offsets).ravel(), minlength=idx.size)
+    return flat.reshape(idx.shape).astype(float)
+
+
+def _interval(boot, estimate, confidence):
+    """백분위 CI → {"estimate", "lower", "upper", "se"} (반복 축 = 0)"""
+    a = (1 - confidence) / 2
+    lower, upper = np.nanquantile(boot, [a, 1 - a], axis=0)
+    return {"estimate": estimate, "lower": lower, "upper": upper,
+            "se": np.nanstd(boot, axis=0, ddof=1)}
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 일반 통계량
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def bootstrap_stat(data, statistic=np.mean, n_boot=N_BOOT, confidence=CONFIDENCE, seed=SEED):
+    """
+    패널 단위 부트스트랩 CI — data: (패널 × …) 배열 (행 하나 = 패널 하나)
+    statistic(x, axis): 패널 축을 축약하는 함수 (np.mean, np.median, np.nanmean …)
+      추정값은 statistic(data, axis=0), 재표본은 statistic(data[idx], axis=1)로 반복 묶음 전체를 한 번에 계산
+    returns: {"estimate", "lower", "upper", "se", "n_boot"}
+    """
+    x = np.asarray(data, dtype=float)
+    n = x.shape[0]
+    idx = resample_index(n, n_boot, seed)
+    per_boot = max(n * int(np.prod(x.shape[1:], dtype=np.int64)), 1)
+    chunk = max(1, _BOOT_CHUNK_CELLS // per_boot)
+    boot = np.concatenate([statistic(x[idx[i:i + chunk]], axis=1)
+                           for i in range(0, len(idx), chunk)], axis=0)
+    out = _interval(boot, statistic(x, axis=0), confidence)
+    out["n_boot"] = len(idx)
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. 관능 지표별 CI
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _cluster_totals(df, value, group, cluster):
+    """긴 형식 → (패널 × 그룹) 합계·관측 수 행렬, 그룹 목록"""
+    data = df[[cluster, group, value]].copy()
+    data[value] = pd.to_numeric(data[value], errors="coerce")
+    data = data.dropna()
+    c_codes, _ = pd.factorize(data[cluster], sort=True)
+    g_codes, groups = pd.factorize(data[group], sort=True)
+    shape = (c_codes.max() + 1 if len(c_codes) else 0, len(groups))
+    flat = c_codes * len(groups) + g_codes
+    sums = np.bincount(flat, weights=data[value].to_numpy(dtype=float),
+                       minlength=shape[0] * shape[1]).reshape(shape)
+    counts = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape).astype(float)
+    return sums, counts, list(groups)
+
+
+def cluster_means(df, value, group, cluster=None, n_boot=N_BOOT, confidence=CONFIDENCE, seed=SEED):
+    """
+    그룹(시료)별 평균의 군집 부트스트랩 CI — 패널을 통째로 재표집 (패널 내 반복·시료 간 상관 유지)
+    cluster=None이면 관측 한 건을 한 군집으로 취급
+    returns: DataFrame (그룹, 평균, CI 하한, CI 상한, 부트 SE, 패널 수)
+    """
+    data = df if cluster is not None else df.assign(_obs=np.arange(len(df)))
+    sums, counts, groups = _cluster_totals(data, value, group, cluster if cluster is not None else "_obs")
+    weights = resample_counts(sums.shape[0], n_boot, seed)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        boot = (weights @ sums) / (weights @ counts)
+        estimate = sums.sum(axis=0) / counts.sum(axis=0)
+    ci = _interval(boot, estimate, confidence)
+    return pd.DataFrame({
+        group: groups, "평균": estimate, "CI 하한": ci["lower"], "CI 상한": ci["upper"],
+        "부트 SE": ci["se"], "패널 수": (counts > 0).sum(axis=0),
+    })
+
+
+def rank_sum_ci(ranks, samples, n_boot=N_BOOT, confidence=CONFIDENCE, seed=SEED):
+    """
+    순위합 CI — ranks: (패널 × 시료) 순위 행렬, 패널 재표집 (순위합 = 선택 횟수 @ 순위)
+    returns: DataFrame (시료, 순위합, CI 하한, CI 상한)
+    """
+    r = np.asarray(ranks, dtype=float)
+    boot = resample_counts(r.shape[0], n_boot, seed) @ r
+    ci = _interval(boot, r.sum(axis=0), confidence)
+    return pd.DataFrame({"시료": list(samples), "순위합": ci["estimate"],
+                         "CI 하한": ci["lower"], "CI 상한": ci["upper"]})
+
+
+def jar_deviation_ci(scores, optimal, tolerance, n_boot=N_BOOT, confidence=CONFIDENCE, seed=SEED):
+    """
+    JAR 편차 |평균 − 최적| CI + 재표본 중 허용 범위 안 비율 — scores: 패널별 점수 (결측 제외)
+    returns: {"deviation", "lower", "upper", "mean_lower", "mean_upper", "p_within"}
+    """
+    x = pd.to_numeric(pd.Series(scores), errors="coerce").dropna().to_numpy(dtype=float)
+    if len(x) == 0:
+        return None
+    weights = resample_counts(len(x), n_boot, seed)
+    means = weights @ x / len(x)
+    dev = np.abs(means - optimal)
+    a = (1 - confidence) / 2
+    lo, hi = np.quantile(dev, [a, 1 - a])
+    m_lo, m_hi = np.quantile(means, [a, 1 - a])
+    return {"deviation": float(abs(x.mean() - optimal)), "lower": float(lo), "upper": float(hi),
+            "mean_lower": float(m_lo), "mean_upper": float(m_hi),
+            "p_within": float((dev <= tolerance).mean())}
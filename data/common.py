@@ -2,8 +2,7 @@
 공통 데이터 & 유틸리티
 """
 import pandas as pd
-import os, json
-from datetime import datetime
+import os
 
 # ━━━ 경로 ━━━
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -204,25 +203,25 @@ def get_sorted_categories():
     return sorted(SALES_DATA.keys(), key=lambda c: SALES_DATA[c]["2024"], reverse=True)
 
 def parse_csv_formula(text):
-    """CSV 텍스트 → DataFrame 파싱"""
+    """CSV 텍스트 → DataFrame 파싱 (작은 입력은 해시 메모이즈 스캐너, 큰 입력은 pandas.read_csv)"""
     import io
+    from data.formula_engine import FAST_CSV_MAX_CHARS, csv_column_alias, scan_formula_csv, scan_to_frame
     if not text.strip():
         return None, "빈 입력"
     try:
         lines = text.strip().split("\n")
         if len(lines) < 2:
             return None, "최소 헤더+1행 필요"
+        if len(text) <= FAST_CSV_MAX_CHARS:
+            scan = scan_formula_csv(text)
+            if scan["error"]:
+                return None, scan["error"]
+            if "원료명" not in scan["columns"]:
+                return None, "'원료명' 컬럼을 찾을 수 없습니다"
+            return scan_to_frame(scan), "OK"
         df = pd.read_csv(io.StringIO(text))
         # 컬럼 표준화
-        col_map = {}
-        for c in df.columns:
-            cl = c.strip().lower()
-            if "원료" in cl or "name" in cl: col_map[c] = "원료명"
-            elif "함량" in cl or "amount" in cl: col_map[c] = "함량"
-            elif "비율" in cl or "%" in cl or "pct" in cl: col_map[c] = "비율(%)"
-            elif "기능" in cl or "func" in cl: col_map[c] = "기능"
-            elif "등급" in cl or "grade" in cl: col_map[c] = "등급"
-        df = df.rename(columns=col_map)
+        df = df.rename(columns={c: csv_column_alias(c) for c in df.columns})
         if "원료명" not in df.columns:
             return None, "'원료명' 컬럼을 찾을 수 없습니다"
         if "비율(%)" in df.columns:
@@ -231,11 +230,31 @@ def parse_csv_formula(text):
     except Exception as e:
         return None, str(e)
 
-def validate_formula(df, meta=None):
-    """배합비 검증"""
+def validate_formula(df, meta=None, scan=None):
+    """
+    배합비 검증
+    scan: data.formula_engine.scan_formula_csv 결과 — 주면 스캔 때 모은 합계·원료 여부를 쓰고
+          행 단위 문제(줄 번호 포함)를 함께 보고 (결과의 "lines"에 구조화된 목록)
+    """
     issues, warnings = [], []
-    if "비율(%)" in df.columns:
-        total = df["비율(%)"].sum()
+    if scan is not None and not scan.get("error"):
+        summary = scan["summary"]
+        total = summary["total"] if "비율(%)" in df.columns else None
+        has_water = summary["has_water"]
+        has_sweet, has_acid = summary["has_sweetener"], summary["has_acid"]
+        line_issues = scan["issues"]
+    else:
+        total = df["비율(%)"].sum() if "비율(%)" in df.columns else None
+        names = df["원료명"].str.lower().tolist() if "원료명" in df.columns else []
+        has_water = any("정제수" in n or "물" in n for n in names)
+        has_sweet = has_acid = None
+        if "기능" in df.columns:
+            funcs = df["기능"].str.lower().fillna("").tolist()
+            has_sweet = any("감미" in f for f in funcs)
+            has_acid = any("산미" in f for f in funcs)
+        line_issues = []
+
+    if total is not None:
         if total < 99:
             issues.append(f"비율 합계 {total:.1f}% — 100%에 미달 ({100-total:.1f}% 부족)")
         elif total > 101:
@@ -243,17 +262,16 @@ def validate_formula(df, meta=None):
         else:
             warnings.append(f"비율 합계 {total:.1f}% ✓")
     
-    names = df["원료명"].str.lower().tolist() if "원료명" in df.columns else []
-    if not any("정제수" in n or "물" in n for n in names):
+    if not has_water:
         warnings.append("정제수(식품용수)가 없습니다")
-    if "기능" in df.columns:
-        funcs = df["기능"].str.lower().fillna("").tolist()
-        if not any("감미" in f for f in funcs):
-            warnings.append("감미료가 없습니다")
-        if not any("산미" in f for f in funcs):
-            warnings.append("산미료가 없습니다")
+    if has_sweet is False:
+        warnings.append("감미료가 없습니다")
+    if has_acid is False:
+        warnings.append("산미료가 없습니다")
     if len(df) < 3:
         issues.append("원료 3종 미만")
+    for li in line_issues:
+        (issues if li["level"] == "error" else warnings).append(f"{li['line']}행: {li['message']}")
     
     if meta:
         brix = meta.get("brix")
@@ -263,158 +281,36 @@ def validate_formula(df, meta=None):
         if pH and (pH < 2 or pH > 8):
             issues.append(f"pH {pH} — 범위(2~8) 벗어남")
     
-    return {"issues": issues, "warnings": warnings, "passed": len(issues) == 0}
+    return {"issues": issues, "warnings": warnings, "passed": len(issues) == 0, "lines": line_issues}
 
 def save_formula(name, df, meta, student_name="default"):
-    """배합비를 JSON으로 저장"""
-    filepath = os.path.join(SAVE_DIR, f"{student_name}_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
-    data = {
-        "name": name,
-        "student": student_name,
-        "meta": meta,
-        "ingredients": df.to_dict(orient="records"),
-        "timestamp": datetime.now().isoformat(),
-    }
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return filepath
-
-def load_saved_formulas():
-    """저장된 배합비 목록"""
-    results = []
-    for fn in sorted(os.listdir(SAVE_DIR), reverse=True):
-        if fn.endswith(".json"):
-            try:
-                with open(os.path.join(SAVE_DIR, fn), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                data["filename"] = fn
-                results.append(data)
-            except:
-                pass
-    return results
+    """배합비를 저장소(saved/formulas.db)에 저장 → 저장 키 (이전 JSON 파일명 규칙, 파일은 만들지 않음)"""
+    from data.formula_store import add_formula
+    _, filename = add_formula(name, df.to_dict(orient="records"), meta, student_name)
+    return filename
+
+def load_saved_formulas(student=None, name=None):
+    """저장된 배합비 목록 (최근 저장 순, 원료 목록 포함) — 요약·페이지 조회는 data.formula_store.query_formulas"""
+    from data.formula_store import load_all_formulas
+    return load_all_formulas(student=student, name=name)
 
 
 def calc_cost_table(df, volume_ml=500):
-    """배합비 DataFrame에 원가 컬럼 추가"""
-    costs = []
-    for _, row in df.iterrows():
-        name = row.get("원료명", "")
-        pct = float(row.get("비율(%)", 0))
-        # 원료명으로 단가 검색 (부분 매칭)
-        unit_price = 0
-        matched = ""
-        for key, info in INGREDIENT_COSTS.items():
-            if key in name or name in key:
-                unit_price = info["unit_price"]
-                matched = key
-                break
-        # g 기준 환산: volume_ml * pct/100 = g, 단가는 원/kg이므로 /1000
-        amount_g = volume_ml * pct / 100
-        cost_per_unit = amount_g * unit_price / 1000  # 원
-        costs.append({
-            "원료명": name,
-            "비율(%)": pct,
-            "함량(g)": round(amount_g, 2),
-            "단가(원/kg)": unit_price,
-            "원가(원)": round(cost_per_unit, 2),
-            "매칭원료": matched,
-        })
-    return pd.DataFrame(costs)
+    """배합비 DataFrame에 원가 컬럼 추가 (단가표 인덱스로 최장 일치 매칭)"""
+    from data.cost_engine import cost_table_frame
+    return cost_table_frame(df, volume_ml, INGREDIENT_COSTS)
 
 
 def compare_formulations(df_mine, df_standard):
-    """내 배합비 vs 표준배합비 비교"""
-    result = []
-    all_names = set()
-    mine_dict = {}
-    std_dict = {}
-
-    if "원료명" in df_mine.columns and "비율(%)" in df_mine.columns:
-        for _, r in df_mine.iterrows():
-            mine_dict[r["원료명"]] = float(r["비율(%)"])
-            all_names.add(r["원료명"])
-
-    if "원료명" in df_standard.columns and "비율(%)" in df_standard.columns:
-        for _, r in df_standard.iterrows():
-            std_dict[r["원료명"]] = float(r["비율(%)"])
-            all_names.add(r["원료명"])
-
-    for name in sorted(all_names):
-        mine_val = mine_dict.get(name, 0)
-        std_val = std_dict.get(name, 0)
-        diff = mine_val - std_val
-        result.append({
-            "원료명": name,
-            "내 배합(%)": mine_val,
-            "표준(%)": std_val,
-            "차이(%)": round(diff, 3),
-            "판정": "✅ 동일" if abs(diff) < 0.01 else ("⬆️ 초과" if diff > 0 else "⬇️ 부족"),
-        })
-    return pd.DataFrame(result)
-
-
-def extract_pdf_text(uploaded_file):
-    """업로드된 PDF에서 텍스트 추출 (다중 라이브러리 폴백)"""
-    import io
-    # 파일 바이트를 먼저 읽어두기 (seek 문제 방지)
-    try:
-        uploaded_file.seek(0)
-    except:
-        pass
-    try:
-        raw = uploaded_file.read()
-    except:
-        return None, "파일 읽기 실패"
-    if not raw or len(raw) < 100:
-        return None, "파일이 비어있거나 너무 작습니다"
+    """내 배합비 vs 표준배합비 비교 (정규화 원료명으로 정렬, 같은 원료는 합산)"""
+    from data.formula_engine import pair_table
+    return pair_table(df_mine, df_standard)
 
-    # 방법 1: pypdf
-    try:
-        from pypdf import PdfReader
-        reader = PdfReader(io.BytesIO(raw))
-        text = ""
-        for page in reader.pages:
-            t = page.extract_text()
-            if t:
-                text += t + "\n"
-        if text.strip():
-            return text, f"pypdf로 {len(reader.pages)}페이지 추출 완료"
-    except ImportError:
-        pass
-    except Exception as e:
-        pass  # 다음 방법 시도
-
-    # 방법 2: pdfplumber (표/복잡한 레이아웃에 강함)
-    try:
-        import pdfplumber
-        with pdfplumber.open(io.BytesIO(raw)) as pdf:
-            text = ""
-            for page in pdf.pages:
-                t = page.extract_text()
-                if t:
-                    text += t + "\n"
-        if text.strip():
-            return text, f"pdfplumber로 {len(pdf.pages)}페이지 추출 완료"
-    except ImportError:
-        pass
-    except Exception as e:
-        pass
-
-    # 방법 3: PyPDF2 (레거시)
-    try:
-        import PyPDF2
-        reader = PyPDF2.PdfReader(io.BytesIO(raw))
-        text = ""
-        for page in reader.pages:
-            t = page.extract_text()
-            if t:
-                text += t + "\n"
-        if text.strip():
-            return text, f"PyPDF2로 {len(reader.pages)}페이지 추출 완료"
-    except:
-        pass
 
-    return None, "텍스트 추출 실패 — 스캔 PDF이거나 보안 설정된 파일일 수 있습니다. OCR이 필요할 수 있습니다."
+def extract_pdf_text(uploaded_file, pages=None, on_page=None):
+    """업로드된 PDF에서 텍스트 추출 (data.pdf_ingest 공통 파이프라인 사용)"""
+    from data.pdf_ingest import extract_pdf_document
+    return extract_pdf_document(uploaded_file, pages=pages, on_page=on_page)
 
 
 def get_current_formula_csv():
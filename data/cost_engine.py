@@ -0,0 +1,266 @@
+"""
+원가 엔진 (INGREDIENT_COSTS 기반)
+- build_cost_index: 단가표 → 정규화 키·별칭 해시맵 + 2-gram 포스팅 (1회 생성, 단가표 변경 시 자동 재생성)
+- match_cost_key: 원료명 → 단가표 키 (완전일치 > 원료명에 포함된 가장 긴 키 > 원료명을 포함하는 가장 짧은 키)
+- cost_table_frame: 배합비 DataFrame → 원가표 (원료명 단위 1회 매칭 후 벡터 연산)
+- formula_cost_matrix: 여러 배합 × 여러 충전 용량 원가 행렬 (배치 시나리오)
+- simulate_cost / cost_tornado: 단가 변동 몬테카를로 원가 분포 + 원료별 민감도 (토네이도)
+"""
+import numpy as np
+import pandas as pd
+
+# 단가표 키의 동의어 (정규화 문자열 → 단가표 키), 원료명 부분일치 후보로 함께 사용
+COST_ALIASES = {
+    '액상과당': '과당포도당액', 'hfcs': '과당포도당액', '고과당': '과당포도당액',
+    '백설탕': '설탕(백설탕)', '정백당': '설탕(백설탕)',
+    'co2': '탄산가스', '이산화탄소': '탄산가스',
+    '아스코르빈산': '비타민C', '비타민c': '비타민C',
+    '스테비아': '스테비아추출물',
+    '잔탄': '잔탄검', '크산탄검': '잔탄검',
+    '카라멜': '카라멜색소',
+    '나이아신아마이드': '니코틴산아미드',
+}
+
+_COST_INDEX_CACHE = {}      # 단가표 지문 → 인덱스 (단가 수정 탭에서 표가 바뀌면 새 지문)
+_COST_INDEX_CACHE_SIZE = 8
+
+
+def _norm(value):
+    return str(value).replace(' ', '').lower()
+
+
+def _grams(s):
+    return {s} if len(s) < 2 else {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+def _fingerprint(cost_table):
+    return tuple((k, v.get("unit_price", 0)) for k, v in cost_table.items())
+
+
+# ━━━ 단가표 인덱스 ━━━
+
+def build_cost_index(cost_table):
+    """단가표 → 매칭 인덱스 {"keys", "prices", "entries", "grams", "max_len", "memo"}"""
+    keys = list(cost_table)
+    pos_of = {k: i for i, k in enumerate(keys)}
+    entries = {}                                   # 정규화 문자열 → 키 위치 (먼저 등록된 것 우선)
+    for i, k in enumerate(keys):
+        entries.setdefault(_norm(k), i)
+    for alias, target in COST_ALIASES.items():
+        if target in pos_of:
+            entries.setdefault(_norm(alias), pos_of[target])
+    grams = {}
+    for s in entries:
+        for g in _grams(s):
+            grams.setdefault(g, set()).add(s)
+    return {
+        "keys": keys,
+        "prices": np.array([float(cost_table[k].get("unit_price", 0) or 0) for k in keys]),
+        "entries": entries,
+        "grams": grams,
+        "max_len": max((len(s) for s in entries), default=0),
+        "memo": {},
+    }
+
+
+def cost_index(cost_table=None):
+    """단가표(기본 INGREDIENT_COSTS) → 인덱스 — 내용이 같으면 재사용"""
+    if cost_table is None:
+        from data.common import INGREDIENT_COSTS
+        cost_table = INGREDIENT_COSTS
+    if isinstance(cost_table, dict) and "entries" in cost_table:
+        return cost_table
+    fp = _fingerprint(cost_table)
+    idx = _COST_INDEX_CACHE.get(fp)
+    if idx is None:
+        if len(_COST_INDEX_CACHE) >= _COST_INDEX_CACHE_SIZE:
+            _COST_INDEX_CACHE.pop(next(iter(_COST_INDEX_CACHE)))
+        idx = _COST_INDEX_CACHE[fp] = build_cost_index(cost_table)
+    return idx
+
+
+def match_cost_key(index, name):
+    """원료명 → 단가표 키 위치 또는 None"""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    q = _norm(str(name).strip())
+    if not q:
+        return None
+    memo = index["memo"]
+    if q in memo:
+        return memo[q]
+    entries = index["entries"]
+
+    pos = entries.get(q)
+    if pos is None:
+        # 원료명에 포함된 키 중 가장 긴 것 (같은 길이면 단가표 순서)
+        best = None
+        for i in range(len(q)):
+            for j in range(i + 1, min(len(q), i + index["max_len"]) + 1):
+                p = entries.get(q[i:j])
+                if p is not None:
+                    cand = (-(j - i), p)
+                    if best is None or cand < best:
+                        best = cand
+        if best is not None:
+            pos = best[1]
+    if pos is None:
+        # 원료명을 포함하는 키 중 가장 짧은 것
+        postings = [index["grams"].get(g, ()) for g in _grams(q)]
+        if all(postings):
+            cands = set(min(postings, key=len)).intersection(*postings)
+            hits = sorted((len(s), entries[s]) for s in cands if q in s)
+            if hits:
+                pos = hits[0][1]
+    memo[q] = pos
+    return pos
+
+
+def price_of(name, cost_table=None):
+    """원료명 → (단가 원/kg, 매칭키) — 매칭 실패 시 (None, '')"""
+    index = cost_index(cost_table)
+    pos = match_cost_key(index, name)
+    if pos is None:
+        return None, ""
+    return index["prices"][pos], index["keys"][pos]
+
+
+# ━━━ 원가표 ━━━
+
+def _lookup_columns(names, index):
+    """원료명 Series → (단가 배열, 매칭키 배열) — 고유 원료명만 매칭"""
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    pos = [match_cost_key(index, n) for n in uniques]
+    u_price = np.array([index["prices"][p] if p is not None else 0 for p in pos], dtype=float)
+    u_key = np.array([index["keys"][p] if p is not None else "" for p in pos], dtype=object)
+    return u_price[codes], u_key[codes]
+
+
+def cost_table_frame(df, volume_ml=500, cost_table=None):
+    """배합비 DataFrame → 원가표 (원료명, 비율(%), 함량(g), 단가(원/kg), 원가(원), 매칭원료)"""
+    index = cost_index(cost_table)
+    n = len(df)
+    names = df["원료명"] if "원료명" in df.columns else pd.Series([""] * n, index=df.index)
+    pct = (df["비율(%)"].astype(float).to_numpy() if "비율(%)" in df.columns
+           else np.zeros(n))
+    price, key = _lookup_columns(names.to_numpy(dtype=object), index)
+    # g 기준 환산: volume_ml * pct/100 = g, 단가는 원/kg이므로 /1000
+    amount_g = volume_ml * pct / 100
+    return pd.DataFrame({
+        "원료명": names.to_numpy(dtype=object),
+        "비율(%)": pct,
+        "함량(g)": np.round(amount_g, 2),
+        "단가(원/kg)": price,
+        "원가(원)": np.round(amount_g * price / 1000, 2),
+        "매칭원료": key,
+    })
+
+
+def formula_cost_matrix(formulas, volumes_ml, cost_table=None):
+    """
+    여러 배합 × 여러 충전 용량 원가
+    formulas: {배합명: 배합비 DataFrame} (원료명, 비율(%))
+    volumes_ml: [용량(ml), ...]
+    returns: (원가 행렬 DataFrame — 행=배합, 열=용량, 값=1개당 원재료비(원),
+              배합별 원/ml·미매칭 원료 요약 DataFrame)
+    """
+    index = cost_index(cost_table)
+    names = list(formulas)
+    volumes = np.asarray(volumes_ml, dtype=float).ravel()
+    if not names:
+        return pd.DataFrame(columns=volumes), pd.DataFrame(columns=["원/ml", "미매칭원료"])
+
+    # 전 배합을 하나의 긴 표로 합쳐 원료명 매칭·단가 조회를 한 번에
+    long = pd.concat(
+        [pd.DataFrame({"배합": name,
+                       "원료명": f["원료명"].to_numpy(dtype=object) if "원료명" in f.columns else "",
+                       "비율(%)": f["비율(%)"].astype(float).to_numpy() if "비율(%)" in f.columns else 0.0})
+         for name, f in formulas.items()],
+        ignore_index=True)
+    price, key = _lookup_columns(long["원료명"].to_numpy(dtype=object), index)
+    long["원/ml"] = long["비율(%)"].to_numpy() / 100 * price / 1000
+    per_ml = long.groupby("배합", sort=False)["원/ml"].sum().reindex(names).fillna(0.0)
+    missing = long[key == ""].groupby("배합", sort=False)["원료명"].agg(lambda s: ", ".join(map(str, s)))
+
+    matrix = pd.DataFrame(np.round(np.outer(per_ml.to_numpy(), volumes), 2),
+                          index=pd.Index(names, name="배합"), columns=volumes)
+    summary = pd.DataFrame({"원/ml": per_ml.round(5),
+                            "미매칭원료": missing.reindex(names).fillna("")})
+    return matrix, summary
+
+
+# ━━━ 가격 변동 리스크 (몬테카를로·토네이도) ━━━
+# 1개당 원가 = Σ_i 함량_i(kg) × 단가_i  →  시나리오 단가 행렬 P (시나리오 × 원료) @ 함량 벡터
+
+PRICE_DISTRIBUTIONS = ["균등", "정규", "삼각"]
+COST_PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def _price_shocks(rng, dist, n, k, vol):
+    """변동률 행렬 (n × k) — vol은 원료별 ±변동폭 (비율)"""
+    if dist == "정규":
+        # ±vol을 약 95% 구간(2σ)으로 보고, 단가가 음수가 되지 않도록 하한 제한
+        return np.maximum(rng.standard_normal((n, k)) * (vol / 2), -0.95)
+    if dist == "삼각":
+        return rng.triangular(-1.0, 0.0, 1.0, (n, k)) * vol
+    return rng.uniform(-1.0, 1.0, (n, k)) * vol
+
+
+def simulate_cost(cost_df, n_scenarios=5000, volatility=0.15, dist="균등", history=None, seed=None):
+    """
+    원가표(cost_table_frame 결과) → 단가 변동 시나리오별 1개당 원가 분포
+    volatility: 공통 ±변동폭(비율) 또는 {매칭원료: 변동폭}
+    history: {매칭원료: [과거 단가, ...]} — 있으면 해당 원료는 이력에서 복원추출
+    returns: {"costs": 시나리오 원가 배열, "base", "mean", "std", "percentiles": {p: 값}}
+    """
+    rng = np.random.default_rng(seed)
+    keys = cost_df["매칭원료"].to_numpy(dtype=object)
+    base_price = cost_df["단가(원/kg)"].to_numpy(dtype=float)
+    amount_kg = cost_df["함량(g)"].to_numpy(dtype=float) / 1000
+    k = len(base_price)
+
+    if isinstance(volatility, dict):
+        vol = np.array([float(volatility.get(key, 0.0)) for key in keys])
+    else:
+        vol = np.full(k, float(volatility))
+    prices = base_price * (1 + _price_shocks(rng, dist, n_scenarios, k, vol))
+    for i, key in enumerate(keys):
+        series = (history or {}).get(key)
+        if key and series is not None and len(series):
+            prices[:, i] = rng.choice(np.asarray(series, dtype=float), n_scenarios)
+
+    costs = prices @ amount_kg
+    base = float(base_price @ amount_kg)
+    return {
+        "costs": costs,
+        "base": base,
+        "mean": float(costs.mean()) if n_scenarios else base,
+        "std": float(costs.std()) if n_scenarios else 0.0,
+        "percentiles": dict(zip(COST_PERCENTILES, np.percentile(costs, COST_PERCENTILES)))
+        if n_scenarios else {},
+    }
+
+
+def cost_tornado(cost_df, swing=0.15):
+    """
+    원료별 단가를 ±swing 만큼 바꿨을 때의 1개당 원가 (나머지는 기준 단가) — 영향 큰 순
+    swing: 공통 비율 또는 {매칭원료: 비율}
+    returns: DataFrame (원료명, 매칭원료, 하한원가, 상한원가, 변동폭(원))
+    """
+    keys = cost_df["매칭원료"].to_numpy(dtype=object)
+    contrib = cost_df["단가(원/kg)"].to_numpy(dtype=float) * cost_df["함량(g)"].to_numpy(dtype=float) / 1000
+    if isinstance(swing, dict):
+        sw = np.array([float(swing.get(key, 0.0)) for key in keys])
+    else:
+        sw = np.full(len(keys), float(swing))
+    base = contrib.sum()
+    delta = contrib * sw
+    out = pd.DataFrame({
+        "원료명": cost_df["원료명"].to_numpy(dtype=object),
+        "매칭원료": keys,
+        "하한원가": base - delta,
+        "상한원가": base + delta,
+        "변동폭(원)": 2 * delta,
+    })
+    out = out[out["변동폭(원)"] > 0]
+    return out.sort_values("변동폭(원)", ascending=False, kind="stable").reset_index(drop=True)
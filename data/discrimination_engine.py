@@ -0,0 +1,114 @@
+"""
+차이식별 검정 통계 엔진 (삼점·일-이점 이항검정)
+- critical_count: 유의 판정 최소 정답자 수 — binom.isf 한 번으로 계산 (x 전수 반복 없음)
+- critical_table: 패널 수 × 유의수준 최소 정답자 표 (삼점 p0=1/3, 일-이점 p0=1/2, 메모이즈)
+- discrimination_power / sample_size: 구별자 비율(pd) 기준 검정력과 필요 패널 수
+"""
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from scipy.stats import binom
+
+P0_TRIANGLE = 1 / 3
+P0_DUO_TRIO = 1 / 2
+TABLE_ALPHAS = (0.05, 0.01, 0.001)
+TABLE_MAX_N = 200
+
+
+def chance_probability(test_type):
+    """검사 종류 문자열 → 우연 정답 확률 (삼점 1/3, 그 외 1/2)"""
+    return P0_TRIANGLE if "삼점" in str(test_type) or "triangle" in str(test_type).lower() else P0_DUO_TRIO
+
+
+def discrimination_pvalue(correct, n, p0):
+    """단측(greater) 이항검정 p-value = P(X ≥ correct) — binomtest(..., alternative='greater')와 동일"""
+    return float(binom.sf(int(correct) - 1, int(n), p0))
+
+
+def _critical_counts(n, p0, alpha):
+    """
+    n·alpha 배열 → 최소 정답자 수 배열 (P(X ≥ x) < alpha 인 최소 x, 없으면 n)
+    isf로 경계를 구한 뒤 경계값이 alpha와 같은 경우(부등호 방향)만 한 칸 보정
+    """
+    n = np.asarray(n, dtype=int)
+    alpha = np.asarray(alpha, dtype=float)
+    x = np.asarray(binom.isf(alpha, n, p0), dtype=float) + 1
+    x = np.where(np.isnan(x), n + 1, x).astype(int)
+    x = np.where(binom.sf(x - 1, n, p0) < alpha, x, x + 1)
+    x = np.where((x > 0) & (binom.sf(x - 2, n, p0) < alpha), x - 1, x)
+    return np.where(x > n, n, x)
+
+
+@lru_cache(maxsize=4096)
+def critical_count(n, p0, alpha=0.05):
+    """유의 판정 최소 정답자 수 (유의 영역이 없으면 n — 예전 반복문과 같은 규칙)"""
+    return int(_critical_counts(int(n), p0, alpha))
+
+
+@lru_cache(maxsize=32)
+def _critical_grid(p0, max_n, alphas):
+    ns = np.arange(1, max_n + 1)
+    grid = _critical_counts(ns[:, None], p0, np.asarray(alphas)[None, :])
+    # 정답자 전원이어도 유의하지 않은 n은 결측 처리 (표에서 '-')
+    reachable = binom.sf(grid - 1, ns[:, None], p0) < np.asarray(alphas)[None, :]
+    return ns, np.where(reachable, grid, -1)
+
+
+def critical_table(p0, ns=None, alphas=TABLE_ALPHAS, max_n=TABLE_MAX_N):
+    """
+    패널 수 × 유의수준 최소 정답자 표 (DataFrame, index=패널수, columns=α)
+    전체 1~max_n 격자를 p0·α 조합별로 한 번 계산해 메모이즈하고 필요한 행만 잘라 반환
+    """
+    alphas = tuple(float(a) for a in alphas)
+    if ns is not None:
+        max_n = max(max_n, int(max(ns)))
+    grid_n, grid = _critical_grid(float(p0), int(max_n), alphas)
+    table = pd.DataFrame(grid, index=pd.Index(grid_n, name="패널수"),
+                         columns=[f"α={a:g}" for a in alphas])
+    table = table.where(table >= 0)
+    if ns is not None:
+        table = table.loc[list(ns)]
+    return table.astype("Int64")
+
+
+def _alternative_p(p0, pd_prop):
+    """구별자 비율 pd → 정답 확률 p1 = pd + (1 - pd)·p0"""
+    return pd_prop + (1 - pd_prop) * p0
+
+
+def discrimination_power(n, p0, pd_prop, alpha=0.05):
+    """
+    검정력 = P(X ≥ 최소정답자 | p1) — n은 스칼라 또는 배열
+    pd_prop: 실제 구별할 수 있는 패널 비율 (0~1)
+    """
+    n_arr = np.asarray(n, dtype=int)
+    x = _critical_counts(n_arr, p0, alpha)
+    sig = binom.sf(x - 1, n_arr, p0) < alpha
+    power = np.where(sig, binom.sf(x - 1, n_arr, _alternative_p(p0, pd_prop)), 0.0)
+    return float(power) if power.ndim == 0 else power
+
+
+def sample_size(p0, pd_prop, alpha=0.05, power=0.8, max_n=2000):
+    """
+    목표 검정력을 처음 달성하는 최소 패널 수 (이항 이산성 때문에 n에 대해 단조가 아니므로
+    그 이상 모든 n에서 유지되는 값도 함께 반환) → (최소 n, 안정 n) — 못 찾으면 (None, None)
+    """
+    ns = np.arange(1, int(max_n) + 1)
+    pw = discrimination_power(ns, p0, pd_prop, alpha)
+    ok = pw >= power
+    if not ok.any():
+        return None, None
+    first = int(ns[np.argmax(ok)])
+    fail = np.flatnonzero(~ok)
+    stable = int(ns[fail[-1] + 1]) if len(fail) and fail[-1] + 1 < len(ns) else (first if not len(fail) else None)
+    return first, stable
+
+
+def power_curve(p0, pd_prop, alpha=0.05, max_n=200):
+    """패널 수 1~max_n 검정력 곡선 (DataFrame: 패널수, 최소정답, 검정력)"""
+    ns = np.arange(1, int(max_n) + 1)
+    return pd.DataFrame({
+        "패널수": ns,
+        "최소정답": _critical_counts(ns, p0, alpha),
+        "검정력": discrimination_power(ns, p0, pd_prop, alpha),
+    })
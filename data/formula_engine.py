@@ -0,0 +1,300 @@
+"""
+배합비 비교 엔진
+- formula_space: 여러 배합비 → 정규화 원료명 인덱스로 정렬한 밀집 행렬 (배합 × 원료, 단위 %)
+- compare_formula_sets: 배합 묶음 A × 표준 묶음 B 전 쌍의 원료별 차이·L1 거리·코사인 유사도를 한 번에 계산
+- rank_similarity: 배합별 표준 유사도 순위표
+- scan_formula_csv: 붙여넣은 CSV 한 번 훑기 (헤더 별칭·숫자 변환·행 단위 검증, 줄 번호 포함) — 입력 해시로 메모이즈
+"""
+import csv, hashlib, io
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+SAME_TOLERANCE = 0.01       # |차이| < 0.01%p → 동일
+FAST_CSV_MAX_CHARS = 200_000    # 이보다 긴 CSV는 pandas.read_csv 경로 사용
+_SCAN_CACHE_SIZE = 32
+_scan_cache = OrderedDict()     # sha1(텍스트) → scan 결과
+
+# pandas.read_csv 기본 결측 표기
+_NA_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+              "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+_TRUE_VALUES = {"True", "TRUE", "true"}
+_FALSE_VALUES = {"False", "FALSE", "false"}
+
+
+def normalize_formula_name(value):
+    """원료명 정렬용 정규화: 앞뒤·내부 공백 제거 + 소문자"""
+    return str(value).replace(' ', '').strip().lower()
+
+
+def _rows(df):
+    """배합비 DataFrame → [(원료명, 비율)] (원료명·비율(%) 컬럼이 없으면 빈 리스트)"""
+    if df is None or "원료명" not in df.columns or "비율(%)" not in df.columns:
+        return []
+    pct = pd.to_numeric(df["비율(%)"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    return list(zip(df["원료명"].tolist(), pct))
+
+
+def formula_space(*groups):
+    """
+    배합 묶음들({이름: 배합비 DataFrame}) → 공통 원료 축으로 정렬한 행렬
+    같은 배합 안에서 정규화 이름이 같은 원료는 비율을 합산
+    returns: {"ingredients": 표시 원료명(처음 나온 표기), "index": {정규화명: 열},
+              "matrices": [묶음별 (배합 수 × 원료 수) 행렬], "formulas": [묶음별 배합 이름]}
+    """
+    index, display = {}, []
+    coded = []
+    for group in groups:
+        group_rows = []
+        for name, df in group.items():
+            cols, vals = [], []
+            for raw, pct in _rows(df):
+                key = normalize_formula_name(raw)
+                if key not in index:
+                    index[key] = len(display)
+                    display.append(raw)
+                cols.append(index[key])
+                vals.append(pct)
+            group_rows.append((cols, vals))
+        coded.append((list(group), group_rows))
+
+    n = len(display)
+    matrices, formulas = [], []
+    for names, group_rows in coded:
+        M = np.zeros((len(names), n), dtype=float)
+        for i, (cols, vals) in enumerate(group_rows):
+            np.add.at(M[i], np.asarray(cols, dtype=int), np.asarray(vals, dtype=float))
+        matrices.append(M)
+        formulas.append(names)
+    return {"ingredients": display, "index": index, "matrices": matrices, "formulas": formulas}
+
+
+def compare_formula_sets(formulas, standards):
+    """
+    배합 묶음 × 표준 묶음 전 쌍 비교
+    returns: {"space", "diff": (배합 × 표준 × 원료) 차이 배열, "l1": (배합 × 표준),
+              "cosine": (배합 × 표준), "shared": 공통 원료 수 (배합 × 표준)}
+    """
+    space = formula_space(formulas, standards)
+    A, B = space["matrices"]
+    diff = A[:, None, :] - B[None, :, :]
+    l1 = np.abs(diff).sum(axis=2)
+    na = np.linalg.norm(A, axis=1)[:, None]
+    nb = np.linalg.norm(B, axis=1)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = np.where((na > 0) & (nb > 0), (A @ B.T) / (na * nb), 0.0)
+    shared = (A > 0).astype(int) @ (B > 0).astype(int).T
+    return {"space": space, "diff": diff, "l1": l1, "cosine": cosine, "shared": shared}
+
+
+def rank_similarity(formulas, standards, by="cosine"):
+    """
+    배합별 표준 유사도 순위표 (by: 'cosine' 높은 순 또는 'l1' 낮은 순, 동점이면 나머지 기준)
+    columns: 배합, 표준, 순위, 코사인유사도, L1거리(%p), 공통원료
+    """
+    res = compare_formula_sets(formulas, standards)
+    f_names, s_names = res["space"]["formulas"]
+    if not f_names or not s_names:
+        return pd.DataFrame(columns=["배합", "표준", "순위", "코사인유사도", "L1거리(%p)", "공통원료"])
+    # 주 기준이 같으면 다른 기준으로 (코사인 ↔ L1) 순위 결정
+    if by == "cosine":
+        order = np.lexsort((res["l1"], -np.round(res["cosine"], 10)), axis=-1)
+    else:
+        order = np.lexsort((-res["cosine"], np.round(res["l1"], 10)), axis=-1)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.arange(1, len(s_names) + 1)[None, :].repeat(len(f_names), 0), axis=1)
+    fi, si = np.meshgrid(np.arange(len(f_names)), np.arange(len(s_names)), indexing="ij")
+    out = pd.DataFrame({
+        "배합": np.asarray(f_names, dtype=object)[fi.ravel()],
+        "표준": np.asarray(s_names, dtype=object)[si.ravel()],
+        "순위": rank.ravel(),
+        "코사인유사도": np.round(res["cosine"].ravel(), 4),
+        "L1거리(%p)": np.round(res["l1"].ravel(), 3),
+        "공통원료": res["shared"].ravel(),
+    })
+    # 배합은 입력 순서 유지, 배합 안에서는 순위 순
+    out = out.iloc[np.lexsort((rank.ravel(), fi.ravel()))]
+    return out.reset_index(drop=True)
+
+
+def pair_table(df_mine, df_standard):
+    """한 쌍 비교표 (원료명 순: 원료명, 내 배합(%), 표준(%), 차이(%), 판정)"""
+    res = compare_formula_sets({"mine": df_mine}, {"std": df_standard})
+    names = np.asarray(res["space"]["ingredients"], dtype=object)
+    if not len(names):
+        return pd.DataFrame()
+    A, B = res["space"]["matrices"]
+    order = np.argsort(names.astype(str), kind="stable")
+    mine, std = A[0][order], B[0][order]
+    diff = mine - std
+    return pd.DataFrame({
+        "원료명": names[order],
+        "내 배합(%)": mine,
+        "표준(%)": std,
+        "차이(%)": np.round(diff, 3),
+        "판정": np.where(np.abs(diff) < SAME_TOLERANCE, "✅ 동일",
+                       np.where(diff > 0, "⬆️ 초과", "⬇️ 부족")),
+    })
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# CSV 배합비 파서 (작은 입력은 pandas 없이 한 번에 파싱·검증)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def csv_column_alias(column):
+    """CSV 헤더 → 표준 컬럼명 (원료명·함량·비율(%)·기능·등급, 해당 없으면 원래 이름)"""
+    cl = column.strip().lower()
+    if "원료" in cl or "name" in cl: return "원료명"
+    if "함량" in cl or "amount" in cl: return "함량"
+    if "비율" in cl or "%" in cl or "pct" in cl: return "비율(%)"
+    if "기능" in cl or "func" in cl: return "기능"
+    if "등급" in cl or "grade" in cl: return "등급"
+    return column
+
+def _header_names(header):
+    """헤더 행 → read_csv와 같은 컬럼명 (빈 칸은 'Unnamed: i', 중복은 '.1', '.2' …)"""
+    names, seen = [], {}
+    for i, h in enumerate(header):
+        name = h if h != "" else f"Unnamed: {i}"
+        base, k = name, seen.get(name, 0)
+        while name in seen:
+            k += 1
+            name = f"{base}.{k}"
+        seen[base] = k
+        seen[name] = 0
+        names.append(name)
+    return names
+
+def _number(cell):
+    """문자열 → int/float (숫자가 아니면 None)"""
+    if "_" in cell:
+        return None
+    try:
+        return int(cell)
+    except ValueError:
+        pass
+    try:
+        return float(cell)
+    except ValueError:
+        return None
+
+def _typed_column(cells):
+    """열 값 리스트 → read_csv와 같은 규칙으로 변환한 값 리스트 (전부 숫자/불리언일 때만 변환)"""
+    present = [c for c in cells if c not in _NA_VALUES]
+    if present and all(c in _TRUE_VALUES or c in _FALSE_VALUES for c in present):
+        return [np.nan if c in _NA_VALUES else c in _TRUE_VALUES for c in cells]
+    nums = [_number(c) for c in present]
+    if all(v is not None for v in nums):
+        it = iter(nums)
+        return [np.nan if c in _NA_VALUES else next(it) for c in cells]
+    return [np.nan if c in _NA_VALUES else c for c in cells]
+
+def _issue(line, column, message, level="warning"):
+    return {"line": line, "column": column, "level": level, "message": message}
+
+def _scan(text):
+    """CSV 텍스트 한 번 훑기 — 헤더 매핑, 열 값 수집, 행 단위 검증·합계를 같은 루프에서 처리"""
+    out = {"columns": [], "names": [], "cells": [], "lines": [], "issues": [], "error": None,
+           "summary": {"total": 0.0, "n_rows": 0, "has_water": False,
+                       "has_sweetener": None, "has_acid": None}}
+    reader = csv.reader(io.StringIO(text.lstrip("\ufeff")))
+    header, start = None, 0
+    try:
+        for row in reader:
+            if row and not (len(row) == 1 and not row[0].strip()):
+                header, start = row, reader.line_num
+                break
+        if header is None:
+            out["error"] = "빈 입력"
+            return out
+        names = _header_names(header)
+        columns = [csv_column_alias(c) for c in names]
+        n_cols = len(names)
+        i_name = columns.index("원료명") if "원료명" in columns else None
+        i_pct = columns.index("비율(%)") if "비율(%)" in columns else None
+        i_func = columns.index("기능") if "기능" in columns else None
+        cells = [[] for _ in range(n_cols)]
+        summary = out["summary"]
+        if i_func is not None:
+            summary["has_sweetener"] = summary["has_acid"] = False
+        seen_names = {}
+        for row in reader:
+            line = reader.line_num
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            if len(row) > n_cols:
+                # 값이 버려지므로 오류로 보고 (검증 실패 — 쉼표가 든 원료명은 따옴표로 감싸야 함)
+                out["issues"].append(_issue(line, None, f"필드 {len(row)}개 — 헤더({n_cols}개)보다 많아 초과분 "
+                                                        f"{', '.join(row[n_cols:])!r} 제외됨", level="error"))
+                row = row[:n_cols]
+            elif len(row) < n_cols:
+                row = row + [""] * (n_cols - len(row))
+            for j, c in enumerate(row):
+                cells[j].append(c)
+            out["lines"].append(line)
+            summary["n_rows"] += 1
+
+            if i_name is not None:
+                raw = row[i_name]
+                if raw in _NA_VALUES or not raw.strip():
+                    out["issues"].append(_issue(line, "원료명", "원료명이 비어 있음"))
+                else:
+                    low = raw.lower()
+                    if "정제수" in low or "물" in low:
+                        summary["has_water"] = True
+                    key = normalize_formula_name(raw)
+                    if key in seen_names:
+                        out["issues"].append(_issue(line, "원료명", f"'{raw.strip()}' 중복 ({seen_names[key]}행과 같은 원료)"))
+                    else:
+                        seen_names[key] = line
+            if i_pct is not None:
+                cell = row[i_pct]
+                v = None if cell in _NA_VALUES else _number(cell)
+                if v is None or v != v:
+                    if cell not in _NA_VALUES:
+                        out["issues"].append(_issue(line, "비율(%)", f"비율 '{cell}' — 숫자가 아니어서 0으로 처리"))
+                else:
+                    if v < 0:
+                        out["issues"].append(_issue(line, "비율(%)", f"비율 {v} — 음수", level="error"))
+                    summary["total"] += v
+            if i_func is not None:
+                f = row[i_func].lower()
+                if "감미" in f:
+                    summary["has_sweetener"] = True
+                if "산미" in f:
+                    summary["has_acid"] = True
+    except csv.Error as e:
+        out["error"] = f"{reader.line_num}행: {e}"
+        return out
+    out["columns"], out["names"], out["cells"] = columns, names, cells
+    out["header_line"] = start
+    return out
+
+def scan_formula_csv(text):
+    """
+    CSV 배합비 스캔 (입력 해시로 메모이즈 — 결과는 읽기 전용으로 사용)
+    returns: {"columns": 표준화 컬럼명, "names": 원래 컬럼명, "cells": 열별 문자열 값, "lines": 행별 줄 번호,
+              "issues": [{"line", "column", "level", "message"}], "summary": 합계·필수 원료 여부, "error"}
+    """
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    hit = _scan_cache.get(key)
+    if hit is not None:
+        _scan_cache.move_to_end(key)
+        return hit
+    result = _scan(text)
+    _scan_cache[key] = result
+    if len(_scan_cache) > _SCAN_CACHE_SIZE:
+        _scan_cache.popitem(last=False)
+    return result
+
+def scan_to_frame(scan):
+    """스캔 결과 → DataFrame (read_csv와 같은 컬럼명·자료형, 비율(%)은 숫자 변환·결측 0) — 호출마다 복사본"""
+    df = scan.get("frame")
+    if df is None:
+        df = pd.DataFrame({name: _typed_column(col) for name, col in zip(scan["names"], scan["cells"])},
+                          columns=scan["names"])
+        df.columns = scan["columns"]
+        if "비율(%)" in df.columns:
+            df["비율(%)"] = pd.to_numeric(df["비율(%)"], errors="coerce").fillna(0)
+        scan["frame"] = df
+    return df.copy()
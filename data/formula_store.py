@@ -0,0 +1,248 @@
+"""
+배합비 저장소 (SQLite 단일 파일, 표준 라이브러리 sqlite3)
+- saved/formulas.db 한 파일에 배합비 저장 — 학생·제품명·저장시각 인덱스
+- query_formulas: 조건 검색 + 페이지 단위 조회 (원료 목록 제외한 요약만 반환)
+- load_formula / load_ingredients: 원료 목록은 필요할 때 한 건씩 지연 로딩
+- 기존 saved/*.json 파일은 저장소를 처음 열 때 한 번 가져옴 (이후 디렉터리 스캔 없음)
+"""
+import os, json, sqlite3, threading
+from datetime import datetime
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+_APP_DIR = os.path.dirname(_THIS_DIR)
+STORE_DIR = os.path.join(_APP_DIR, "saved")
+STORE_PATH = os.path.join(STORE_DIR, "formulas.db")
+DEFAULT_PAGE_SIZE = 20
+_NAME_MAX_CHAR = "\U0010ffff"   # 앞부분 일치 상한 — name < 접두어 + 최대 코드포인트
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS formulas (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename    TEXT UNIQUE NOT NULL,
+    name        TEXT NOT NULL,
+    student     TEXT NOT NULL,
+    timestamp   TEXT NOT NULL,
+    n_ingredients INTEGER NOT NULL DEFAULT 0,
+    meta        TEXT,
+    ingredients TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_formulas_student ON formulas (student, timestamp);
+CREATE INDEX IF NOT EXISTS idx_formulas_name ON formulas (name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_formulas_timestamp ON formulas (timestamp);
+CREATE TABLE IF NOT EXISTS legacy_imports (filename TEXT PRIMARY KEY);
+"""
+_SUMMARY_COLUMNS = "id, filename, name, student, timestamp, n_ingredients, meta"
+
+_ready = set()                  # 스키마 생성 + 기존 JSON 가져오기를 마친 저장소 경로
+_ready_lock = threading.Lock()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 연결 / 초기화 / 기존 JSON 가져오기
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _connect(path=None):
+    """저장소 연결 (Streamlit 스레드마다 새 연결 — 처음 열 때만 스키마·가져오기 수행)"""
+    path = path or STORE_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    con = sqlite3.connect(path, timeout=10)
+    con.row_factory = sqlite3.Row
+    if path not in _ready:
+        with _ready_lock:
+            if path not in _ready:
+                con.executescript(_SCHEMA)
+                import_legacy_json(os.path.dirname(path), con)
+                _ready.add(path)
+    return con
+
+def _record_row(data, filename):
+    """배합비 dict → 테이블 행 값"""
+    ingredients = data.get("ingredients") or []
+    return (
+        filename,
+        str(data.get("name", "")),
+        str(data.get("student", "default")),
+        str(data.get("timestamp", "")),
+        len(ingredients),
+        json.dumps(data.get("meta") or {}, ensure_ascii=False),
+        json.dumps(ingredients, ensure_ascii=False),
+    )
+
+def import_legacy_json(directory, con):
+    """
+    saved/*.json (이전 형식) → 저장소로 가져오기 → 가져온 건수
+    가져온 파일명은 legacy_imports에 기록 — 저장소에서 삭제한 배합이 다시 들어오지 않음 (원본 파일은 그대로 둠)
+    """
+    try:
+        files = [fn for fn in os.listdir(directory) if fn.endswith(".json")]
+    except:
+        return 0
+    if not files:
+        return 0
+    known = {r[0] for r in con.execute("SELECT filename FROM legacy_imports")}
+    new = [fn for fn in files if fn not in known]
+    rows = []
+    for fn in new:
+        try:
+            with open(os.path.join(directory, fn), "r", encoding="utf-8") as f:
+                rows.append(_record_row(json.load(f), fn))
+        except:
+            pass
+    if new:
+        with con:
+            con.executemany(
+                "INSERT OR IGNORE INTO formulas (filename, name, student, timestamp, n_ingredients, meta, ingredients) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            con.executemany("INSERT OR IGNORE INTO legacy_imports (filename) VALUES (?)", [(fn,) for fn in new])
+    return len(rows)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 저장 / 조회
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def add_formula(name, ingredients, meta=None, student="default", timestamp=None, path=None):
+    """
+    배합비 1건 저장 → (id, filename)
+    ingredients: 원료 레코드 리스트 (DataFrame.to_dict(orient="records"))
+    filename은 이전 JSON 파일명과 같은 규칙의 고유 키 ({학생}_{이름}_{YYYYmmdd_HHMMSS}.json)
+    """
+    now = timestamp or datetime.now()
+    base = f"{student}_{name}_{now.strftime('%Y%m%d_%H%M%S')}"
+    data = {"name": name, "student": student, "meta": meta, "ingredients": ingredients,
+            "timestamp": now.isoformat()}
+    con = _connect(path)
+    try:
+        with con:
+            filename, n = f"{base}.json", 1
+            while con.execute("SELECT 1 FROM formulas WHERE filename = ?", (filename,)).fetchone():
+                n += 1
+                filename = f"{base}_{n}.json"
+            cur = con.execute(
+                "INSERT INTO formulas (filename, name, student, timestamp, n_ingredients, meta, ingredients) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", _record_row(data, filename))
+        return cur.lastrowid, filename
+    finally:
+        con.close()
+
+def _summary(row):
+    """테이블 행 → 요약 dict (원료 목록 제외)"""
+    try:
+        meta = json.loads(row["meta"]) if row["meta"] else {}
+    except:
+        meta = {}
+    return {"id": row["id"], "filename": row["filename"], "name": row["name"],
+            "student": row["student"], "timestamp": row["timestamp"],
+            "n_ingredients": row["n_ingredients"], "meta": meta}
+
+def _where(student=None, name=None, since=None, until=None):
+    """
+    검색 조건 → (WHERE 절, 인자) — since/until은 ISO 시각 문자열 또는 datetime
+    name은 앞부분 일치 (대소문자 구분) — 범위 조건이라 idx_formulas_name 사용, 입력의 %·_도 글자 그대로
+    """
+    clauses, args = [], []
+    if student:
+        clauses.append("student = ?")
+        args.append(student)
+    if name:
+        clauses.append("name >= ? AND name < ?")
+        args += [name, name + _NAME_MAX_CHAR]
+    if since:
+        clauses.append("timestamp >= ?")
+        args.append(since.isoformat() if hasattr(since, "isoformat") else str(since))
+    if until:
+        clauses.append("timestamp <= ?")
+        args.append(until.isoformat() if hasattr(until, "isoformat") else str(until))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+def query_formulas(student=None, name=None, since=None, until=None,
+                   limit=DEFAULT_PAGE_SIZE, offset=0, path=None):
+    """
+    저장된 배합비 요약 조회 (최근 저장 순) — 원료 목록은 load_ingredients로 따로 로딩
+    limit=None이면 전체
+    """
+    where, args = _where(student, name, since, until)
+    sql = f"SELECT {_SUMMARY_COLUMNS} FROM formulas{where} ORDER BY timestamp DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        args += [int(limit), int(offset)]
+    con = _connect(path)
+    try:
+        return [_summary(r) for r in con.execute(sql, args)]
+    finally:
+        con.close()
+
+def count_formulas(student=None, name=None, since=None, until=None, path=None):
+    """조건에 맞는 저장 배합비 수 (페이지 수 계산용)"""
+    where, args = _where(student, name, since, until)
+    con = _connect(path)
+    try:
+        return con.execute(f"SELECT COUNT(*) FROM formulas{where}", args).fetchone()[0]
+    finally:
+        con.close()
+
+def list_students(path=None):
+    """저장 기록이 있는 학생 목록 (가나다순)"""
+    con = _connect(path)
+    try:
+        return [r[0] for r in con.execute("SELECT DISTINCT student FROM formulas ORDER BY student")]
+    finally:
+        con.close()
+
+def load_ingredients(formula_id, path=None):
+    """배합비 1건의 원료 레코드 리스트 (없으면 빈 리스트)"""
+    con = _connect(path)
+    try:
+        row = con.execute("SELECT ingredients FROM formulas WHERE id = ?", (formula_id,)).fetchone()
+    finally:
+        con.close()
+    if row is None or not row[0]:
+        return []
+    try:
+        return json.loads(row[0])
+    except:
+        return []
+
+def load_formula(formula_id, path=None):
+    """배합비 1건 전체 (요약 + ingredients) — 없으면 None"""
+    con = _connect(path)
+    try:
+        row = con.execute("SELECT * FROM formulas WHERE id = ?", (formula_id,)).fetchone()
+    finally:
+        con.close()
+    if row is None:
+        return None
+    data = _summary(row)
+    try:
+        data["ingredients"] = json.loads(row["ingredients"]) if row["ingredients"] else []
+    except:
+        data["ingredients"] = []
+    return data
+
+def load_all_formulas(student=None, name=None, since=None, until=None, path=None):
+    """조건에 맞는 배합비 전체 (원료 목록 포함, 최근 저장 순) — 일괄 비교용"""
+    where, args = _where(student, name, since, until)
+    con = _connect(path)
+    try:
+        rows = con.execute(f"SELECT * FROM formulas{where} ORDER BY timestamp DESC, id DESC", args).fetchall()
+    finally:
+        con.close()
+    out = []
+    for row in rows:
+        data = _summary(row)
+        try:
+            data["ingredients"] = json.loads(row["ingredients"]) if row["ingredients"] else []
+        except:
+            data["ingredients"] = []
+        out.append(data)
+    return out
+
+def delete_formula(formula_id, path=None):
+    """배합비 1건 삭제 → 삭제 여부"""
+    con = _connect(path)
+    try:
+        with con:
+            cur = con.execute("DELETE FROM formulas WHERE id = ?", (formula_id,))
+        return cur.rowcount > 0
+    finally:
+        con.close()
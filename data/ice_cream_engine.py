@@ -0,0 +1,255 @@
+"""
+빙과 이화학 엔진 (ice_cream_db.json 기반, 오진양행 테스트배합 엑셀 수식)
+- build_ice_cream_index: 원료 DB → 정규화 이름 인덱스 + 계수 행렬 (TS/상대감미/유지방/MSNF/Fse)
+- calculate_ice_cream_batch: 배합 × 원료 비율 행렬 → 배합별 TS·비중·빙점·FPDF 등을 배열 연산으로 일괄 계산
+- ice_cream_sweep: 원료 비율 × 오버런 × 1회 중량 격자 → 빙점·경도·1회분 부피 곡선
+"""
+import os, json
+import numpy as np
+import pandas as pd
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ICE_CREAM_DB_PATH = os.path.join(_APP_DIR, "ice_cream_db.json")
+
+# 3차 매칭용 키워드 (입력에 키워드가 있으면 대상 원료로 매핑, 순서 = 우선순위)
+ICE_CREAM_KEYWORD_MAP = {
+    '설탕': '백설탕', '정백당': '백설탕',
+    '우유': '원유',
+    '크림': '생크림',
+    '시럽': '물엿(DE42)',
+    '요거트': '플레인요구르트',
+    '요구르트': '플레인요구르트',
+    '물': '정제수',
+    '소금': '정제염',
+    '바닐라': '바닐라빈',
+}
+
+# 계수 행렬 열 순서 (원료 1%당 기여)
+ICE_COEF_COLUMNS = ['ts', 'rel_sweet', 'milk_fat', 'msnf', 'fse']
+
+# 엑셀 상수
+FAT_SG = 0.93           # 지방 비중
+SOLIDS_SG = 1.58        # 기타 고형분 비중
+FSA_FACTOR = 2.37       # 유염 빙점강하 계수 (MSNF)
+FSE_FACTOR = 1.86 * 10  # 당류 빙점강하 계수 (Kf × 10 / 분자량)
+FPDF_FACTOR = 14.5
+
+
+def read_ice_cream_db(path=ICE_CREAM_DB_PATH):
+    """빙과 DB(JSON) 로드 — 파일이 없거나 깨졌으면 빈 DB"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except:
+        return {'ingredients': {}, 'spec_ranges': {}}
+
+
+def _norm(value):
+    return str(value).replace(' ', '').lower()
+
+
+def _coef_row(props):
+    """원료 속성 → 1%당 기여 [TS, 상대감미, 유지방, MSNF, Fse]"""
+    rel_frac = (props.get('rel_sweetness') or 0) / 100
+    mw = props.get('mw_sugar')
+    fse = FSE_FACTOR / mw * rel_frac if mw and mw > 0 and rel_frac > 0 else 0.0
+    return [(props.get('ts_pct') or 0) / 100, rel_frac,
+            (props.get('milk_fat_pct') or 0) / 100, (props.get('msnf_pct') or 0) / 100, fse]
+
+
+# ━━━ 원료 인덱스 ━━━
+
+def build_ice_cream_index(ice_cream_db):
+    """빙과 DB → 매칭 인덱스 + 계수 행렬 C (원료 수 × 5)"""
+    ing_db = (ice_cream_db or {}).get('ingredients', {}) or {}
+    names = list(ing_db)
+    norm = [_norm(n) for n in names]
+    exact = {}
+    for pos, n in enumerate(norm):
+        exact.setdefault(n, pos)
+    aliases = [(kw, names.index(mapped)) for kw, mapped in ICE_CREAM_KEYWORD_MAP.items() if mapped in ing_db]
+    coef = np.array([_coef_row(ing_db[n]) for n in names], dtype=float).reshape(len(names), len(ICE_COEF_COLUMNS))
+    return {
+        "names": names,
+        "props": [ing_db[n] for n in names],
+        "norm": norm,
+        "exact": exact,
+        "aliases": aliases,
+        "coef": coef,
+        "spec_ranges": (ice_cream_db or {}).get('spec_ranges', {}),
+        "memo": {},
+    }
+
+
+def ice_cream_index(ice_cream_db):
+    """
+    빙과 DB(또는 이미 만든 인덱스) → 인덱스 — 인덱스는 그대로, DB dict는 새로 만듦
+    반복 호출 시 재사용은 호출 측에서 (앱의 load_ice_cream_index, st.cache_resource)
+    """
+    if isinstance(ice_cream_db, dict) and "coef" in ice_cream_db:
+        return ice_cream_db
+    return build_ice_cream_index(ice_cream_db)
+
+
+def match_ice_cream_ingredient(index, name_query):
+    """
+    원료명 → DB 위치 또는 None (find_ice_cream_ingredient와 같은 우선순위)
+    1차 완전 일치 → 2차 부분 일치 (DB 순서) → 3차 키워드 매핑
+    """
+    if not name_query or not index["names"]:
+        return None
+    q = _norm(str(name_query).strip())
+    memo = index["memo"]
+    if q in memo:
+        return memo[q]
+    pos = index["exact"].get(q)
+    if pos is None:
+        pos = next((p for p, n in enumerate(index["norm"]) if q in n or n in q), None)
+    if pos is None:
+        pos = next((target for kw, target in index["aliases"] if kw in q), None)
+    memo[q] = pos
+    return pos
+
+
+def mixes_to_matrix(recipes, index):
+    """
+    배합 리스트 → (비율 행렬 R, 미매칭 원료 리스트)
+    recipes: [[{'ingredient': 원료명, 'ratio_pct': 비율}, ...], ...]
+    """
+    R = np.zeros((len(recipes), len(index["names"])), dtype=float)
+    unmatched = []
+    for i, recipe in enumerate(recipes):
+        missing = []
+        for item in recipe:
+            name = item.get('ingredient', '')
+            try:
+                ratio = float(item.get('ratio_pct', 0))
+            except (ValueError, TypeError):
+                continue
+            if ratio <= 0:
+                continue
+            pos = match_ice_cream_ingredient(index, name)
+            if pos is None:
+                missing.append(name)
+            else:
+                R[i, pos] += ratio
+        unmatched.append(missing)
+    return R, unmatched
+
+
+# ━━━ 일괄 계산 ━━━
+
+def hardness_score(freezing_point_c):
+    """예상빙점 → 경도 점수 (1~7, generate_ice_cream_qda와 같은 식)"""
+    fp = np.asarray(freezing_point_c, dtype=float)
+    return np.round(np.clip(3 + (np.abs(fp) - 2.0) * 3, 1, 7), 1)
+
+
+def calculate_ice_cream_batch(ratios, index, overrun_pct=70, serving_weight_g=120, unmatched=None):
+    """
+    비율 행렬 R (배합 수 × 원료 수, 단위 %) → 배합별 빙과 이화학값 DataFrame
+    overrun_pct, serving_weight_g: 스칼라 또는 배합 수 길이 배열
+    calculate_ice_cream_physical과 같은 수식·반올림 (유효 원료가 없는 배합은 error 컬럼에 사유)
+    """
+    R = np.atleast_2d(np.asarray(ratios, dtype=float))
+    m = len(R)
+    overrun = np.broadcast_to(np.asarray(overrun_pct, dtype=float), (m,))
+    weight = np.broadcast_to(np.asarray(serving_weight_g, dtype=float), (m,))
+
+    sums = R @ index["coef"]
+    ts, rel, fat, msnf, fse = sums.T
+    total = R.sum(axis=1)
+    has = total != 0
+
+    denom = fat * 0.01 / FAT_SG + (ts - fat) * 0.01 / SOLIDS_SG + (100 - ts) * 0.01
+    with np.errstate(divide='ignore', invalid='ignore'):
+        density = np.where(denom != 0, 1.0 / np.where(denom != 0, denom, 1.0), 1.0)
+        fsa = np.where(ts < 99, msnf * FSA_FACTOR / np.where(ts < 99, 100 - ts, 1.0), 0.0)
+    fp = -(fse + fsa)
+    volume = weight / density * (1 + overrun / 100)
+
+    def val(x):
+        return np.where(has, x, np.nan)
+
+    out = pd.DataFrame({
+        'ts_pct': val(np.round(ts, 2)),
+        'rel_sweetness': val(np.round(rel, 2)),
+        'milk_fat_pct': val(np.round(fat, 2)),
+        'msnf_pct': val(np.round(msnf, 2)),
+        'total_milk_solids_pct': val(np.round(fat + msnf, 2)),
+        'density_20c': val(np.round(density, 4)),
+        'overrun_pct': overrun,
+        'serving_weight_g': weight,
+        'serving_volume_ml': val(np.round(volume, 1)),
+        'fse_sugar': val(np.round(fse, 4)),
+        'fsa_salt': val(np.round(fsa, 4)),
+        'predicted_freezing_point_c': val(np.round(fp, 2)),
+        'fpdf': val(np.round(fse * FPDF_FACTOR, 2)),
+        'hardness': val(hardness_score(fp)),
+        'total_matched_ratio': np.round(total, 1),
+        'confidence': np.select([total >= 90, total >= 70], ['high', 'medium'], default='low'),
+        'error': np.where(has, None, '유효한 원료 없음'),
+    })
+    if unmatched is not None:
+        out['unmatched_ingredients'] = unmatched
+    return out
+
+
+def ice_cream_spec_check(frame, spec_ranges, sub_type='아이스크림'):
+    """일괄 결과 → 정상 범위 판정 DataFrame (컬럼: 지표별 '✓ 적정' / '⚠ 낮음' / '⚠ 높음')"""
+    ranges = spec_ranges.get(sub_type, spec_ranges.get('아이스크림', {}))
+    columns = {'predicted_fp_c': 'predicted_freezing_point_c'}
+    out = pd.DataFrame(index=frame.index)
+    for key, (low, high, _desc) in ranges.items():
+        col = columns.get(key, key)
+        if col not in frame:
+            continue
+        v = frame[col].to_numpy(dtype=float)
+        out[key] = np.where(np.isnan(v), None,
+                            np.where(v < low, '⚠ 낮음', np.where(v > high, '⚠ 높음', '✓ 적정')))
+    return out
+
+
+def calculate_ice_cream_mixes(recipes, index, overrun_pct=70, serving_weight_g=120):
+    """배합 리스트 → 빙과 이화학값 DataFrame (mixes_to_matrix + calculate_ice_cream_batch)"""
+    index = ice_cream_index(index)
+    R, unmatched = mixes_to_matrix(recipes, index)
+    return calculate_ice_cream_batch(R, index, overrun_pct, serving_weight_g, unmatched)
+
+
+# ━━━ 스윕 ━━━
+
+def ice_cream_sweep(recipe, index, ingredient=None, values=None, overrun_pct=(70,),
+                    serving_weight_g=(120,), balance='정제수'):
+    """
+    R&D 튜닝용 격자 계산: (ingredient 비율 values) × 오버런 × 1회 중량
+    ingredient 비율을 바꾸면 balance 원료(있을 때)로 총합을 보정
+    index: ice_cream_index 결과 또는 빙과 DB dict
+    returns: DataFrame (ratio_pct, overrun_pct, serving_weight_g + 일괄 계산 컬럼)
+    """
+    index = ice_cream_index(index)
+    R, _ = mixes_to_matrix([recipe], index)
+    if ingredient is not None and values is not None:
+        j = match_ice_cream_ingredient(index, ingredient)
+        if j is None:
+            raise KeyError(f"빙과 DB에 없는 원료: {ingredient}")
+        values = np.asarray(values, dtype=float)
+        variants = np.repeat(R, len(values), axis=0)
+        delta = values - variants[:, j]
+        variants[:, j] = values
+        k = match_ice_cream_ingredient(index, balance) if balance else None
+        if k is not None and k != j:
+            variants[:, k] = np.maximum(variants[:, k] - delta, 0.0)
+    else:
+        values = np.array([np.nan])
+        variants = R
+
+    overrun = np.asarray(overrun_pct, dtype=float).ravel()
+    weight = np.asarray(serving_weight_g, dtype=float).ravel()
+    # 격자 (변형 × 오버런 × 중량) 을 한 번에 펼쳐서 계산
+    vi, oi, wi = np.meshgrid(np.arange(len(variants)), np.arange(len(overrun)),
+                             np.arange(len(weight)), indexing='ij')
+    vi, oi, wi = vi.ravel(), oi.ravel(), wi.ravel()
+    out = calculate_ice_cream_batch(variants[vi], index, overrun[oi], weight[wi])
+    out.insert(0, 'ratio_pct', values[vi])
+    return out
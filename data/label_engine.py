@@ -2,8 +2,10 @@
 핵심 엔진: PDF 지식베이스 구축 · 적부 판정 · 법령 참조
 """
 import pandas as pd
-import os, json, re, io
+import os, json, re
 from datetime import datetime
+from time import perf_counter
+from data.pdf_ingest import extract_pdf_document
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 _APP_DIR = os.path.dirname(_THIS_DIR)
@@ -14,40 +16,9 @@ os.makedirs(KB_DIR, exist_ok=True)
 # 1. PDF 텍스트 추출
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def extract_pdf(uploaded_file):
-    """PDF → 텍스트 (다중 라이브러리 폴백)"""
-    try:
-        uploaded_file.seek(0)
-    except:
-        pass
-    try:
-        raw = uploaded_file.read()
-    except:
-        return None, "파일 읽기 실패"
-    if not raw or len(raw) < 100:
-        return None, "파일이 비어있거나 손상됨"
-
-    for lib_name, extractor in [
-        ("pypdf", _extract_pypdf),
-        ("pdfplumber", _extract_pdfplumber),
-    ]:
-        try:
-            text = extractor(raw)
-            if text and len(text.strip()) > 50:
-                return text, f"{lib_name}로 추출 완료 ({len(text):,}자)"
-        except:
-            continue
-    return None, "텍스트 추출 실패 — 스캔 PDF이거나 보안 설정된 파일"
-
-def _extract_pypdf(raw):
-    from pypdf import PdfReader
-    reader = PdfReader(io.BytesIO(raw))
-    return "\n".join(p.extract_text() or "" for p in reader.pages)
-
-def _extract_pdfplumber(raw):
-    import pdfplumber
-    with pdfplumber.open(io.BytesIO(raw)) as pdf:
-        return "\n".join(p.extract_text() or "" for p in pdf.pages)
+def extract_pdf(uploaded_file, pages=None, on_page=None):
+    """PDF → 텍스트 (data.pdf_ingest 공통 파이프라인 사용)"""
+    return extract_pdf_document(uploaded_file, pages=pages, on_page=on_page, min_chars=51)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -217,37 +188,132 @@ def load_all_knowledge():
             result[doc_key] = kb
     return result
 
-def _chunk_legal_text(text):
-    """법령 텍스트를 조항 단위로 분리"""
-    chunks = []
-    # 제N조, 제N항, 별표 등 패턴
-    patterns = [
-        r'(제\d+조(?:의\d+)?[\s\(].*?)(?=제\d+조|$)',
-        r'(별표\s*\d+.*?)(?=별표\s*\d+|$)',
-        r'(부칙.*?)(?=부칙|$)',
-    ]
-    # 기본: 500자 단위 청크
+# 조항 머리표 — 줄 머리에서만 인식 (본문 속 "제4조에 따라" 같은 인용은 무시)
+_LEGAL_HEAD_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'(?P<article>제\s*\d+\s*조(?:\s*의\s*\d+)?)(?=[\s\(\[]|$)'
+    r'|(?P<annex>\[?\s*별표\s*\d+(?:\s*의\s*\d+)?\s*\]?)'
+    r'|(?P<addenda>부\s*칙)(?=[\s<\(\[]|$)'
+    r'|(?P<para>[①-⑳])'
+    r'|(?P<item>\d{1,2})\.(?=\s)'
+    r')',
+    re.M,
+)
+_WS_RE = re.compile(r'\s+')
+
+CHUNK_MAX_CHARS = 2000     # 청크 최대 길이 (초과 시 겹침 분할)
+CHUNK_OVERLAP = 200        # 분할 청크 간 겹침
+CHUNK_MIN_CHARS = 50       # 이보다 짧은 조항(삭제 조문 등)은 제외
+
+
+def _chunk_legal_text(text, max_chars=CHUNK_MAX_CHARS, overlap=CHUNK_OVERLAP):
+    """법령 텍스트를 조항 단위로 분리 (단일 패스, 조 → 항 → 호 계층 + 문자 오프셋)"""
     if len(text) < 200:
-        return [{"idx": 0, "text": text}]
-
-    # 조항 패턴 매칭
-    found = []
-    for pat in patterns:
-        for m in re.finditer(pat, text, re.DOTALL):
-            found.append(m.group(1).strip())
-
-    if found:
-        for i, chunk in enumerate(found):
-            if len(chunk) > 50:
-                chunks.append({"idx": i, "text": chunk[:2000]})
-    else:
+        return [{"idx": 0, "text": text, "type": "전문", "label": "",
+                 "start": 0, "end": len(text)}]
+
+    units = _segment_legal_text(text)
+    if not units:
         # 패턴 없으면 고정 길이 청크
-        for i in range(0, len(text), 800):
-            chunk = text[i:i+800].strip()
-            if chunk:
-                chunks.append({"idx": len(chunks), "text": chunk})
+        units = [{"type": "본문", "label": "", "start": 0, "end": len(text), "sections": []}]
+        max_chars, overlap = 800, 0
 
-    return chunks if chunks else [{"idx": 0, "text": text[:2000]}]
+    chunks = []
+    for u in units:
+        for start, end, part, n_parts in _split_window(text, u["start"], u["end"], max_chars, overlap):
+            body = text[start:end].strip()
+            if not body or (n_parts == 1 and len(body) <= CHUNK_MIN_CHARS and u["type"] != "본문"):
+                continue
+            chunk = {
+                "idx": len(chunks), "text": body,
+                "type": u["type"], "label": u["label"],
+                "start": start, "end": end,
+            }
+            if n_parts > 1:
+                chunk["part"], chunk["parts"] = part, n_parts
+            sections = [s for s in u["sections"] if start <= s["start"] < end]
+            if sections:
+                chunk["sections"] = sections
+            chunks.append(chunk)
+
+    return chunks if chunks else [{"idx": 0, "text": text[:max_chars], "type": "전문",
+                                   "label": "", "start": 0, "end": min(len(text), max_chars)}]
+
+
+def _segment_legal_text(text):
+    """머리표를 한 번만 훑어 최상위 단위(조/별표/부칙)와 그 안의 항·호 오프셋을 만든다"""
+    units, unit, para = [], None, None
+    in_addenda = False
+
+    def _close_para(pos):
+        nonlocal para
+        if para is not None:
+            para["end"] = pos
+            if para["items"]:
+                para["items"][-1]["end"] = pos
+            para = None
+
+    def _close_unit(pos):
+        nonlocal unit
+        if unit is not None:
+            _close_para(pos)
+            unit["end"] = pos
+            units.append(unit)
+            unit = None
+
+    for m in _LEGAL_HEAD_RE.finditer(text):
+        kind = m.lastgroup
+        pos = m.start(kind)
+        if kind in ("article", "annex", "addenda"):
+            label = _WS_RE.sub("", m.group(kind))
+            if kind == "addenda":
+                in_addenda = True
+            elif kind == "annex":
+                in_addenda = False
+                label = label.strip("[]")
+            if not units and unit is None and pos > 0:
+                units.append({"type": "전문", "label": "", "start": 0, "end": pos, "sections": []})
+            _close_unit(pos)
+            utype = {"article": "조", "annex": "별표", "addenda": "부칙"}[kind]
+            if kind == "article" and in_addenda:
+                label = f"부칙 {label}"
+            unit = {"type": utype, "label": label, "start": pos, "end": len(text), "sections": []}
+        elif unit is None or unit["type"] != "조":
+            continue
+        elif kind == "para":
+            _close_para(pos)
+            para = {"type": "항", "label": m.group(kind), "start": pos, "end": len(text), "items": []}
+            unit["sections"].append(para)
+        else:  # item
+            if para is None:
+                # 항 없이 바로 호가 나오는 조문 → 암묵적 항으로 묶는다
+                para = {"type": "항", "label": "", "start": pos, "end": len(text), "items": []}
+                unit["sections"].append(para)
+            elif para["items"]:
+                para["items"][-1]["end"] = pos
+            para["items"].append({"type": "호", "label": f"{m.group('item')}.", "start": pos, "end": len(text)})
+
+    _close_unit(len(text))
+    return units
+
+
+def _split_window(text, start, end, max_chars, overlap):
+    """[start, end) 구간을 max_chars 이하의 겹치는 창으로 분할 (가능하면 줄바꿈에서 자름)"""
+    if end - start <= max_chars:
+        return [(start, end, 0, 1)]
+    spans = []
+    pos = start
+    while pos < end:
+        stop = min(pos + max_chars, end)
+        if stop < end:
+            cut = text.rfind("\n", pos + max_chars // 2, stop)
+            if cut > pos:
+                stop = cut
+        spans.append((pos, stop))
+        if stop >= end:
+            break
+        pos = max(stop - overlap, pos + 1)
+    return [(s, e, i, len(spans)) for i, (s, e) in enumerate(spans)]
 
 
 def search_knowledge(doc_key, keyword):
@@ -255,242 +321,382 @@ def search_knowledge(doc_key, keyword):
     kb = load_knowledge(doc_key)
     if not kb:
         return []
-    results = []
+    kw = keyword.lower()
+    exact, results = [], []
     for chunk in kb.get("chunks", []):
-        if keyword.lower() in chunk["text"].lower():
-            results.append(chunk["text"])
-    return results
+        if kw in chunk["text"].lower():
+            # 조항 머리표가 키워드와 같은 청크(예: "제4조")를 앞에 둔다
+            if chunk.get("label") and chunk["label"].lower() == _WS_RE.sub("", kw):
+                exact.append(chunk["text"])
+            else:
+                results.append(chunk["text"])
+    return exact + results
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 4. 적부 판정 엔진 (규칙 기반)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-def check_compliance(label_data):
-    """
-    표시사항 데이터 → 적부 판정
-    label_data: dict {"제품명": "...", "식품유형": "...", ...}
-    returns: list of dicts
-    """
-    results = []
+RESULT_COLUMNS = ["id", "법령", "항목", "입력값", "판정", "사유", "조항"]
+LABEL_FIELDS = [line.split(",", 1)[0] for line in CSV_TEMPLATE.strip().splitlines()[1:]]
+SKU_COLUMNS = ("SKU", "sku", "제품코드", "품목코드")
 
-    # ─── 식품등의 표시기준 ───
-    results += _check_labeling(label_data)
+NUTRIENTS_9 = ["열량", "탄수화물", "당류", "단백질", "지방", "포화지방", "트랜스지방", "콜레스테롤", "나트륨"]
+KNOWN_MATERIALS = ["PET","PP","PE","HDPE","LDPE","PS","유리","알루미늄","캔","종이팩","테트라팩"]
 
-    # ─── 원산지 표시요령 ───
-    results += _check_origin(label_data)
 
-    # ─── 기구용기 규격 ───
-    results += _check_packaging(label_data)
+def _any_of(words, flags=0):
+    """키워드 목록 → 한 번 컴파일된 OR 정규식"""
+    return re.compile("|".join(map(re.escape, words)), flags)
 
-    return results
 
+# ─── 판정 조건(fact) — 여러 규칙이 공유하는 파생값, 계획 수립 시 필요한 것만 계산 ───
+# {"이름": {"fields": [...], "matcher": 정규식, "fn": (값dict, matcher) → bool}}
+COMPLIANCE_FACTS = {
+    "카페인원료": {
+        "fields": ["원재료명"], "matcher": _any_of(["카페인", "커피", "과라나", "녹차추출"]),
+        "fn": lambda v, m: bool(m.search(v["원재료명"].lower())),
+    },
+    "원산지1기재": {
+        "fields": ["원산지(주원료1)"], "matcher": None,
+        "fn": lambda v, m: bool(v["원산지(주원료1)"]),
+    },
+}
 
-def _val(label_data, key):
-    """안전하게 값 가져오기"""
-    v = label_data.get(key, "")
-    return v.strip() if isinstance(v, str) else str(v).strip()
+# ─── 규칙 레지스트리 ───
+# 규칙 = {"id", "법령", "항목", "조항", "fields": 필요한 항목, "when": 선행 조건(fact 이름),
+#         "matcher": 미리 컴파일한 정규식, "judge": (값dict, matcher) → (입력값, 판정, 사유)}
+# 새 규칙은 register_rule()로 추가 — 평가 계획은 다음 판정 때 한 번만 다시 만든다
+COMPLIANCE_RULES = []
+_rule_plan = None
+
+
+def register_rule(rule_id, law, item, clause, fields, judge, matcher=None, when=None):
+    """판정 규칙 등록 (같은 id가 있으면 교체)"""
+    global _rule_plan
+    rule = {"id": rule_id, "법령": law, "항목": item, "조항": clause,
+            "fields": list(fields), "when": when, "matcher": matcher, "judge": judge}
+    for i, r in enumerate(COMPLIANCE_RULES):
+        if r["id"] == rule_id:
+            COMPLIANCE_RULES[i] = rule
+            break
+    else:
+        COMPLIANCE_RULES.append(rule)
+    _rule_plan = None
+    return rule
 
 
-def _check_labeling(ld):
-    """식품등의 표시기준 검토"""
-    results = []
+def _short(v, n):
+    return v[:n] + "..." if len(v) > n else v
 
-    # LBL-01 제품명
-    v = _val(ld, "제품명")
-    results.append({
-        "id": "LBL-01", "법령": "표시기준", "항목": "제품명",
-        "입력값": v,
-        "판정": "적합" if v else "부적합",
-        "사유": "제품명 기재됨" if v else "제품명 누락 — 제4조 위반",
-        "조항": "제3조, 제4조",
-    })
 
-    # LBL-02 식품유형
-    v = _val(ld, "식품유형")
-    results.append({
-        "id": "LBL-02", "법령": "표시기준", "항목": "식품유형",
-        "입력값": v,
-        "판정": "적합" if v else "부적합",
-        "사유": "식품유형 기재됨" if v else "식품유형 누락 — 식품공전상 분류명 필수 기재",
-        "조항": "제4조",
-    })
+def _present(v, ok_msg, missing_msg):
+    return v, ("적합" if v else "부적합"), (ok_msg if v else missing_msg)
+
+
+# ─── 식품등의 표시기준 ───
+register_rule("LBL-01", "표시기준", "제품명", "제3조, 제4조", ["제품명"],
+    lambda v, m: _present(v["제품명"], "제품명 기재됨", "제품명 누락 — 제4조 위반"))
+
+register_rule("LBL-02", "표시기준", "식품유형", "제4조", ["식품유형"],
+    lambda v, m: _present(v["식품유형"], "식품유형 기재됨", "식품유형 누락 — 식품공전상 분류명 필수 기재"))
 
-    # LBL-03 업소명/소재지
-    v1 = _val(ld, "업소명")
-    v2 = _val(ld, "소재지")
+
+def _judge_business(v, m):
+    v1, v2 = v["업소명"], v["소재지"]
     ok = bool(v1 and v2)
-    results.append({
-        "id": "LBL-03", "법령": "표시기준", "항목": "업소명·소재지",
-        "입력값": f"{v1} / {v2}",
-        "판정": "적합" if ok else "부적합",
-        "사유": "업소명·소재지 기재됨" if ok else f"{'업소명' if not v1 else ''} {'소재지' if not v2 else ''} 누락",
-        "조항": "제4조",
-    })
+    return (f"{v1} / {v2}", "적합" if ok else "부적합",
+            "업소명·소재지 기재됨" if ok else f"{'업소명' if not v1 else ''} {'소재지' if not v2 else ''} 누락")
 
-    # LBL-04 소비기한
-    v = _val(ld, "소비기한")
-    has_date = bool(v)
-    is_expiry = "소비" in v or "제조일로부터" in v or "까지" in v
-    is_old = "유통기한" in v
-    results.append({
-        "id": "LBL-04", "법령": "표시기준", "항목": "소비기한",
-        "입력값": v,
-        "판정": "적합" if has_date else "부적합",
-        "사유": ("소비기한 표시됨" + (" (⚠️ '유통기한' 용어 → 2023.1.1부터 '소비기한'으로 변경 필요)" if is_old else "")) if has_date else "소비기한 누락",
-        "조항": "제5조",
-    })
+register_rule("LBL-03", "표시기준", "업소명·소재지", "제4조", ["업소명", "소재지"], _judge_business)
 
-    # LBL-05 내용량
-    v = _val(ld, "내용량")
-    has_unit = bool(re.search(r'\d+\s*(ml|g|kg|L|개|매|EA)', v, re.I))
-    results.append({
-        "id": "LBL-05", "법령": "표시기준", "항목": "내용량",
-        "입력값": v,
-        "판정": "적합" if has_unit else ("주의" if v else "부적합"),
-        "사유": "내용량 단위 포함 표시됨" if has_unit else ("단위(ml, g 등) 확인 필요" if v else "내용량 누락"),
-        "조항": "제4조",
-    })
 
-    # LBL-06 원재료명
-    v = _val(ld, "원재료명")
-    ingr_count = len([x for x in v.split(",") if x.strip()]) if v else 0
-    results.append({
-        "id": "LBL-06", "법령": "표시기준", "항목": "원재료명",
-        "입력값": v[:80] + "..." if len(v) > 80 else v,
-        "판정": "적합" if ingr_count >= 2 else "부적합",
-        "사유": f"원재료 {ingr_count}종 표시 (함량순 배열 여부 확인 필요)" if ingr_count >= 2 else "원재료명 누락 또는 부족",
-        "조항": "제6조",
-    })
+def _judge_expiry(v, m):
+    x = v["소비기한"]
+    if not x:
+        return x, "부적합", "소비기한 누락"
+    note = " (⚠️ '유통기한' 용어 → 2023.1.1부터 '소비기한'으로 변경 필요)" if "유통기한" in x else ""
+    return x, "적합", "소비기한 표시됨" + note
 
-    # LBL-08 영양성분
-    v = _val(ld, "영양성분")
-    required_9 = ["열량", "탄수화물", "당류", "단백질", "지방", "포화지방", "트랜스지방", "콜레스테롤", "나트륨"]
-    found = [n for n in required_9 if n in v]
-    missing = [n for n in required_9 if n not in v]
-    results.append({
-        "id": "LBL-08", "법령": "표시기준", "항목": "영양성분",
-        "입력값": v[:80] + "..." if len(v) > 80 else v,
-        "판정": "적합" if len(found) >= 9 else ("주의" if len(found) >= 5 else "부적합"),
-        "사유": f"9종 중 {len(found)}종 표시" + (f" — 누락: {', '.join(missing)}" if missing else " (전체 충족)"),
-        "조항": "제7조",
-    })
+register_rule("LBL-04", "표시기준", "소비기한", "제5조", ["소비기한"], _judge_expiry)
 
-    # LBL-09 알레르기
-    v = _val(ld, "알레르기")
-    results.append({
-        "id": "LBL-09", "법령": "표시기준", "항목": "알레르기 유발물질",
-        "입력값": v,
-        "판정": "적합" if v else "부적합",
-        "사유": "알레르기 표시됨 (원재료 대비 정확성 확인 필요)" if v else "알레르기 유발물질 표시 누락 — 해당없음이라도 기재 권장",
-        "조항": "제8조",
-    })
 
-    # LBL-10 보관/주의
-    v1 = _val(ld, "보관방법")
-    v2 = _val(ld, "주의사항")
-    results.append({
-        "id": "LBL-10", "법령": "표시기준", "항목": "보관방법·주의사항",
-        "입력값": f"{v1} / {v2}",
-        "판정": "적합" if v1 and v2 else ("주의" if v1 or v2 else "부적합"),
-        "사유": "보관방법·주의사항 기재됨" if v1 and v2 else f"{'보관방법' if not v1 else ''} {'주의사항' if not v2 else ''} 누락",
-        "조항": "제4조, 제10조",
-    })
+def _judge_volume(v, m):
+    x = v["내용량"]
+    if m.search(x):
+        return x, "적합", "내용량 단위 포함 표시됨"
+    return x, ("주의" if x else "부적합"), ("단위(ml, g 등) 확인 필요" if x else "내용량 누락")
 
-    # LBL-11 카페인
-    raw_ingr = _val(ld, "원재료명").lower()
-    has_caffeine_ingr = any(k in raw_ingr for k in ["카페인", "커피", "과라나", "녹차추출"])
-    v = _val(ld, "카페인함량")
-    if has_caffeine_ingr:
-        results.append({
-            "id": "LBL-11", "법령": "표시기준", "항목": "카페인 함량",
-            "입력값": v,
-            "판정": "적합" if v and "해당없음" not in v else "부적합",
-            "사유": "카페인 함량 표시됨" if v and "해당없음" not in v else "카페인 함유 원료 사용 → 고카페인 표시 및 총카페인 함량 기재 필요",
-            "조항": "제11조",
-        })
+register_rule("LBL-05", "표시기준", "내용량", "제4조", ["내용량"], _judge_volume,
+              matcher=re.compile(r'\d+\s*(?:ml|g|kg|L|개|매|EA)', re.I))
 
-    return results
 
+def _judge_ingredients(v, m):
+    x = v["원재료명"]
+    n = len([s for s in x.split(",") if s.strip()]) if x else 0
+    if n >= 2:
+        return _short(x, 80), "적합", f"원재료 {n}종 표시 (함량순 배열 여부 확인 필요)"
+    return _short(x, 80), "부적합", "원재료명 누락 또는 부족"
 
-def _check_origin(ld):
-    """원산지 표시요령 검토"""
-    results = []
-    v1 = _val(ld, "원산지(주원료1)")
-    v2 = _val(ld, "원산지(주원료2)")
-
-    # ORI-01 표시대상
-    results.append({
-        "id": "ORI-01", "법령": "원산지", "항목": "원산지 표시",
-        "입력값": f"1순위: {v1} / 2순위: {v2}",
-        "판정": "적합" if v1 else "부적합",
-        "사유": "주원료 원산지 표시됨" if v1 else "주원료 원산지 미표시 — 배합비율 1순위 이상 원료의 원산지 표시 필수",
-        "조항": "시행령 제3조, 제4조",
-    })
+register_rule("LBL-06", "표시기준", "원재료명", "제6조", ["원재료명"], _judge_ingredients)
+
+
+def _judge_nutrition(v, m):
+    x = v["영양성분"]
+    missing = [n for n in NUTRIENTS_9 if n not in x]
+    found = len(NUTRIENTS_9) - len(missing)
+    verdict = "적합" if found >= 9 else ("주의" if found >= 5 else "부적합")
+    reason = f"9종 중 {found}종 표시" + (f" — 누락: {', '.join(missing)}" if missing else " (전체 충족)")
+    return _short(x, 80), verdict, reason
+
+register_rule("LBL-08", "표시기준", "영양성분", "제7조", ["영양성분"], _judge_nutrition)
+
+register_rule("LBL-09", "표시기준", "알레르기 유발물질", "제8조", ["알레르기"],
+    lambda v, m: _present(v["알레르기"], "알레르기 표시됨 (원재료 대비 정확성 확인 필요)",
+                          "알레르기 유발물질 표시 누락 — 해당없음이라도 기재 권장"))
+
+
+def _judge_storage(v, m):
+    v1, v2 = v["보관방법"], v["주의사항"]
+    verdict = "적합" if v1 and v2 else ("주의" if v1 or v2 else "부적합")
+    reason = "보관방법·주의사항 기재됨" if v1 and v2 else f"{'보관방법' if not v1 else ''} {'주의사항' if not v2 else ''} 누락"
+    return f"{v1} / {v2}", verdict, reason
+
+register_rule("LBL-10", "표시기준", "보관방법·주의사항", "제4조, 제10조", ["보관방법", "주의사항"], _judge_storage)
+
+
+def _judge_caffeine(v, m):
+    x = v["카페인함량"]
+    ok = bool(x) and "해당없음" not in x
+    return (x, "적합" if ok else "부적합",
+            "카페인 함량 표시됨" if ok else "카페인 함유 원료 사용 → 고카페인 표시 및 총카페인 함량 기재 필요")
+
+register_rule("LBL-11", "표시기준", "카페인 함량", "제11조", ["카페인함량"], _judge_caffeine, when="카페인원료")
+
+
+# ─── 원산지 표시요령 ───
+def _judge_origin_present(v, m):
+    v1, v2 = v["원산지(주원료1)"], v["원산지(주원료2)"]
+    return (f"1순위: {v1} / 2순위: {v2}", "적합" if v1 else "부적합",
+            "주원료 원산지 표시됨" if v1 else "주원료 원산지 미표시 — 배합비율 1순위 이상 원료의 원산지 표시 필수")
+
+register_rule("ORI-01", "원산지", "원산지 표시", "시행령 제3조, 제4조",
+              ["원산지(주원료1)", "원산지(주원료2)"], _judge_origin_present)
 
-    # 국산/수입 표기 확인
-    if v1:
-        has_origin = any(k in v1 for k in ["국산","수입","산)","국내산","외국산"])
+
+def _judge_origin_method(v, m):
+    x = v["원산지(주원료1)"]
+    ok = bool(m.search(x))
+    return (x, "적합" if ok else "주의",
+            "국가명/국산 표기 확인됨" if ok else "원산지 국가명 또는 '국산' 표기가 명확하지 않음")
+
+register_rule("ORI-02", "원산지", "원산지 표시방법", "시행령 제4조", ["원산지(주원료1)"], _judge_origin_method,
+              matcher=_any_of(["국산", "수입", "산)", "국내산", "외국산"]), when="원산지1기재")
+
+
+def _judge_origin_in_ingr(v, m):
+    x = v["원재료명"]
+    ok = bool(m.search(x))
+    return (_short(x, 60), "적합" if ok else "주의",
+            "원재료명에 원산지 괄호 표기 확인됨" if ok else "원재료명에 원산지(국산, OO산) 표기 확인 필요")
+
+register_rule("ORI-05", "원산지", "원재료명 내 원산지", "표시요령 제6조", ["원재료명"], _judge_origin_in_ingr,
+              matcher=re.compile(r'\(.*?산\)'))
+
+
+# ─── 기구용기 규격 ───
+def _judge_material(v, m):
+    x = v["용기재질"]
+    if m.search(x):
+        return x, "적합", f"재질 '{x}' 확인됨"
+    return x, ("주의" if x else "부적합"), ("재질 표기 확인 필요" if x else "용기 재질 미기재")
+
+register_rule("PKG-01", "용기규격", "용기 재질", "제2조", ["용기재질"], _judge_material,
+              matcher=_any_of(KNOWN_MATERIALS, re.I))
+
+
+def _judge_migration(v, m):
+    x = v["용기용출시험"]
+    if "적합" in x:
+        return x, "적합", "용출시험 적합 확인됨"
+    if x:
+        return x, "주의", "시험 결과 확인 필요"
+    return x, "미확인", "용출시험 결과 미기재 — 식품접촉 재질의 용출·침출시험 성적서 필요"
+
+register_rule("PKG-02", "용기규격", "용출시험", "제3조", ["용기용출시험"], _judge_migration)
+
+register_rule("PKG-04", "용기규격", "재활용 표시", "자원재활용법", ["재활용표시"],
+    lambda v, m: _present(v["재활용표시"], "재활용(분리배출) 표시 확인됨",
+                          "재활용 표시 누락 — 분리배출 표시(재질·구조 등급) 필수"))
+
+
+# ─── 평가 계획 ───
+
+def build_rule_plan(rules=None):
+    """
+    규칙 목록 → 평가 계획 (한 번 만들어 재사용)
+    - fields: 모든 규칙·조건이 읽는 항목 (중복 제거, 1회씩만 조회)
+    - facts: 규칙이 참조하는 선행 조건만, 계산 순서대로
+    - rules: 등록 순서 (결과 순서 = 기존 판정 순서)
+    """
+    rules = COMPLIANCE_RULES if rules is None else rules
+    facts = []
+    for r in rules:
+        w = r["when"]
+        if w is None or w in facts:
+            continue
+        if w not in COMPLIANCE_FACTS:
+            raise KeyError(f"규칙 {r['id']}: 알 수 없는 선행 조건 '{w}'")
+        facts.append(w)
+    fields = []
+    for name in facts:
+        fields += [f for f in COMPLIANCE_FACTS[name]["fields"] if f not in fields]
+    for r in rules:
+        fields += [f for f in r["fields"] if f not in fields]
+    return {
+        "fields": fields,
+        "facts": [(name, COMPLIANCE_FACTS[name]["fn"], COMPLIANCE_FACTS[name]["matcher"]) for name in facts],
+        "rules": [(r, r["judge"], r["matcher"], r["when"]) for r in rules],
+    }
+
+
+def _default_plan():
+    global _rule_plan
+    if _rule_plan is None:
+        _rule_plan = build_rule_plan()
+    return _rule_plan
+
+
+def check_compliance(label_data, timings=None, plan=None):
+    """
+    표시사항 데이터 → 적부 판정
+    label_data: dict {"제품명": "...", "식품유형": "...", ...}
+    timings: dict를 넘기면 규칙별 누적 실행시간(초)·호출수를 기록 → rule_timing_report()
+    returns: list of dicts
+    """
+    plan = plan or _default_plan()
+    return _evaluate_rules({k: _val(label_data, k) for k in plan["fields"]}, plan, timings)
+
+
+def _evaluate_rules(v, plan, timings=None):
+    """정규화된 항목값 dict에 평가 계획을 적용"""
+    facts = {name: fn(v, m) for name, fn, m in plan["facts"]}
+
+    results = []
+    for rule, judge, matcher, when in plan["rules"]:
+        if when is not None and not facts[when]:
+            continue
+        if timings is None:
+            shown, verdict, reason = judge(v, matcher)
+        else:
+            t0 = perf_counter()
+            shown, verdict, reason = judge(v, matcher)
+            stat = timings.setdefault(rule["id"], [0.0, 0])
+            stat[0] += perf_counter() - t0
+            stat[1] += 1
         results.append({
-            "id": "ORI-02", "법령": "원산지", "항목": "원산지 표시방법",
-            "입력값": v1,
-            "판정": "적합" if has_origin else "주의",
-            "사유": "국가명/국산 표기 확인됨" if has_origin else "원산지 국가명 또는 '국산' 표기가 명확하지 않음",
-            "조항": "시행령 제4조",
+            "id": rule["id"], "법령": rule["법령"], "항목": rule["항목"],
+            "입력값": shown, "판정": verdict, "사유": reason, "조항": rule["조항"],
         })
+    return results
 
-    # 원재료명 내 원산지 괄호 표기 확인
-    ingr = _val(ld, "원재료명")
-    origin_in_ingr = bool(re.search(r'\(.*?산\)', ingr))
-    results.append({
-        "id": "ORI-05", "법령": "원산지", "항목": "원재료명 내 원산지",
-        "입력값": ingr[:60] + "..." if len(ingr) > 60 else ingr,
-        "판정": "적합" if origin_in_ingr else "주의",
-        "사유": "원재료명에 원산지 괄호 표기 확인됨" if origin_in_ingr else "원재료명에 원산지(국산, OO산) 표기 확인 필요",
-        "조항": "표시요령 제6조",
-    })
 
-    return results
+def rule_timing_report(timings):
+    """check_compliance(timings=...) 로 모은 규칙별 실행시간 → DataFrame"""
+    rows = [{"id": rid, "호출수": n, "총시간(ms)": total * 1000,
+             "평균(µs)": total / n * 1e6 if n else 0.0}
+            for rid, (total, n) in timings.items()]
+    return pd.DataFrame(rows, columns=["id", "호출수", "총시간(ms)", "평균(µs)"]) \
+             .sort_values("총시간(ms)", ascending=False, ignore_index=True)
 
 
-def _check_packaging(ld):
-    """기구용기 규격 검토"""
-    results = []
+def check_compliance_batch(labels, sku_col=None, timings=None):
+    """
+    다수 SKU 일괄 판정
+    labels: DataFrame 또는 CSV 경로/파일 — 한 행이 한 SKU (컬럼 = CSV 양식의 항목명)
+            SKU·항목·내용 3열의 세로형 표도 허용
+    returns: 긴 형식 DataFrame [SKU, 제품명, id, 법령, 항목, 입력값, 판정, 사유, 조항]
+             SKU는 행마다 고유 (_sku_keys), 제품명은 표시용
+    """
+    df = labels if isinstance(labels, pd.DataFrame) else _read_label_csv(labels)
+    if sku_col is None:
+        sku_col = next((c for c in SKU_COLUMNS if c in df.columns), None)
+    df = _widen_label_table(df, sku_col)
+
+    plan = _default_plan()
+    fields = plan["fields"]
+    frame = _label_frame(df, fields)
+    skus = _sku_keys(df, sku_col)
+    names = frame["제품명"].tolist() if "제품명" in frame else [""] * len(df)
+    columns = [frame[k].tolist() for k in fields]
+    rows = []
+    for sku, name, values in zip(skus, names, zip(*columns)):
+        for r in _evaluate_rules(dict(zip(fields, values)), plan, timings):
+            r["SKU"], r["제품명"] = sku, name
+            rows.append(r)
+    return pd.DataFrame(rows, columns=["SKU", "제품명"] + RESULT_COLUMNS)
+
+
+def _sku_keys(df, sku_col=None):
+    """
+    행별 고유 SKU 키 — SKU 컬럼(없으면 제품명) 값을 쓰되
+    빈 칸은 SKU-{행번호}, 중복 값은 '{값} #{행번호}' (같은 이름의 다른 제품이 한 행으로 합쳐지지 않게)
+    """
+    src = sku_col if sku_col is not None and sku_col in df.columns else "제품명"
+    if src not in df.columns:
+        return [f"SKU-{i+1}" for i in range(len(df))]
+    base = df[src].fillna("").astype(str).str.strip()
+    dup = base.duplicated(keep=False).tolist()
+    return [f"SKU-{i+1}" if not b else (f"{b} #{i+1}" if d else b)
+            for i, (b, d) in enumerate(zip(base.tolist(), dup))]
+
+
+def _read_label_csv(src):
+    """CSV 경로/업로드 파일 → DataFrame (UTF-8 → CP949 순서로 시도)"""
+    for enc in ("utf-8-sig", "cp949"):
+        try:
+            if hasattr(src, "seek"):
+                src.seek(0)
+            return pd.read_csv(src, encoding=enc, dtype=str, keep_default_na=False)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("CSV 인코딩을 인식할 수 없습니다 (UTF-8 또는 CP949)")
 
-    v = _val(ld, "용기재질")
-    known_materials = ["PET","PP","PE","HDPE","LDPE","PS","유리","알루미늄","캔","종이팩","테트라팩"]
-    is_known = any(m.lower() in v.lower() for m in known_materials) if v else False
-    results.append({
-        "id": "PKG-01", "법령": "용기규격", "항목": "용기 재질",
-        "입력값": v,
-        "판정": "적합" if is_known else ("주의" if v else "부적합"),
-        "사유": f"재질 '{v}' 확인됨" if is_known else ("재질 표기 확인 필요" if v else "용기 재질 미기재"),
-        "조항": "제2조",
-    })
 
-    v = _val(ld, "용기용출시험")
-    results.append({
-        "id": "PKG-02", "법령": "용기규격", "항목": "용출시험",
-        "입력값": v,
-        "판정": "적합" if "적합" in v else ("주의" if v else "미확인"),
-        "사유": "용출시험 적합 확인됨" if "적합" in v else ("시험 결과 확인 필요" if v else "용출시험 결과 미기재 — 식품접촉 재질의 용출·침출시험 성적서 필요"),
-        "조항": "제3조",
-    })
+def _widen_label_table(df, sku_col=None):
+    """세로형(SKU, 항목, 내용) 표 → 가로형(한 행 = 한 SKU)"""
+    if "항목" not in df.columns or "내용" not in df.columns:
+        return df
+    if sku_col is None or sku_col not in df.columns:
+        return pd.DataFrame([dict(zip(df["항목"], df["내용"]))])
+    wide = df.pivot_table(index=sku_col, columns="항목", values="내용",
+                          aggfunc="first", sort=False).reset_index()
+    wide.columns.name = None
+    return wide
 
-    v = _val(ld, "재활용표시")
-    results.append({
-        "id": "PKG-04", "법령": "용기규격", "항목": "재활용 표시",
-        "입력값": v,
-        "판정": "적합" if v else "부적합",
-        "사유": "재활용(분리배출) 표시 확인됨" if v else "재활용 표시 누락 — 분리배출 표시(재질·구조 등급) 필수",
-        "조항": "자원재활용법",
-    })
 
-    return results
+def _label_frame(df, fields=LABEL_FIELDS):
+    """판정 항목 컬럼을 한 번에 문자열로 정규화 (없는 항목은 빈 문자열)"""
+    out = pd.DataFrame(index=df.index)
+    for k in fields:
+        out[k] = df[k].fillna("").astype(str).str.strip() if k in df.columns else ""
+    return out
+
+
+def _val(label_data, key):
+    """안전하게 값 가져오기"""
+    v = label_data.get(key, "")
+    return v.strip() if isinstance(v, str) else str(v).strip()
 
 
 def get_summary(results):
-    """판정 결과 요약"""
+    """
+    판정 결과 요약
+    - check_compliance 결과(list) → dict
+    - check_compliance_batch 결과(DataFrame) → SKU별 요약 DataFrame
+    """
+    if isinstance(results, pd.DataFrame):
+        return _summary_by_sku(results)
     total = len(results)
     ok = sum(1 for r in results if r["판정"] == "적합")
     warn = sum(1 for r in results if r["판정"] == "주의")
@@ -504,6 +710,27 @@ def get_summary(results):
     }
 
 
+def _summary_by_sku(df):
+    """긴 형식 판정 결과 → SKU별 건수·적합률·종합판정 (get_summary와 같은 기준)"""
+    counts = pd.crosstab(df["SKU"], df["판정"]).reindex(
+        index=pd.unique(df["SKU"]), columns=["적합", "주의", "부적합", "미확인"], fill_value=0)
+    out = pd.DataFrame({
+        "total": counts.sum(axis=1),
+        "ok": counts["적합"], "warn": counts["주의"],
+        "fail": counts["부적합"], "unknown": counts["미확인"],
+    })
+    out["rate"] = out["ok"] / out["total"].where(out["total"] > 0) * 100
+    out["rate"] = out["rate"].fillna(0)
+    out["overall"] = "❌ 부적합"
+    out.loc[out["fail"] <= 2, "overall"] = "⚠️ 조건부"
+    out.loc[(out["fail"] == 0) & (out["unknown"] == 0), "overall"] = "✅ 적합"
+    failed = df[df["판정"] == "부적합"].groupby("SKU", sort=False)["id"].agg(", ".join)
+    out["부적합항목"] = failed.reindex(out.index).fillna("")
+    if "제품명" in df.columns:
+        out.insert(0, "제품명", df.groupby("SKU", sort=False)["제품명"].first().reindex(out.index))
+    return out.rename_axis("SKU").reset_index()
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 5. OpenAI API 호출
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -0,0 +1,364 @@
+"""
+PDF 수집 파이프라인: 페이지 단위 지연 추출 · 병렬 처리 · 내용 해시 캐시
+- 페이지별 폴백 체인: pypdf → pdfplumber → PyPDF2 (앞 단계가 실패한 페이지만 다음 단계로)
+- iter_pdf_pages: 페이지 텍스트를 제너레이터로 차례로 반환 (페이지 범위·크기 상한 지원)
+- extract_pdf_document: 업로드 파일 → (텍스트, 메시지) — 모든 페이지가 공통으로 사용
+"""
+import os, io, re, json, hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+_THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+_APP_DIR = os.path.dirname(_THIS_DIR)
+PDF_CACHE_DIR = os.path.join(_APP_DIR, "cache", "pdf")   # 첫 캐시 저장 때 생성
+
+MAX_PDF_BYTES = 50 * 1024 * 1024            # 업로드 크기 상한 (50MB)
+MAX_TEXT_CHARS = 3_000_000                  # 추출 텍스트 상한 (초과분은 읽지 않음)
+PARALLEL_MIN_PAGES = 16                     # 이보다 적은 페이지는 단일 프로세스로 추출
+BATCH_PAGES = 8                             # 워커 1회 작업 단위 (스트리밍 간격)
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+_MEM_CACHE_SIZE = 8                         # 프로세스 메모리에 유지할 PDF 수
+
+_mem_cache = OrderedDict()                  # sha256 → {"n_pages": int, "pages": {페이지번호: {...}}}
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 업로드 파일 읽기 / 해시 / 페이지 범위
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def read_upload(uploaded_file, max_bytes=MAX_PDF_BYTES):
+    """업로드 파일 → (bytes, 오류메시지)"""
+    try:
+        uploaded_file.seek(0)
+    except:
+        pass
+    try:
+        raw = uploaded_file.read(max_bytes + 1) if max_bytes else uploaded_file.read()
+    except:
+        return None, "파일 읽기 실패"
+    if not raw or len(raw) < 100:
+        return None, "파일이 비어있거나 손상됨"
+    if max_bytes and len(raw) > max_bytes:
+        return None, f"파일이 너무 큽니다 (최대 {max_bytes // (1024 * 1024)}MB)"
+    return raw, None
+
+def pdf_digest(raw):
+    """PDF 내용 해시 (캐시 키)"""
+    return hashlib.sha256(raw).hexdigest()
+
+def parse_page_range(spec, n_pages):
+    """
+    페이지 범위 → 0부터 시작하는 페이지 인덱스 리스트
+    spec: None(전체) / "1-5, 8, 10-" / range / 1부터 시작하는 번호 리스트
+    """
+    if spec is None or spec == "":
+        return list(range(n_pages))
+    if isinstance(spec, str):
+        picked = []
+        for part in re.split(r"[,\s]+", spec.strip()):
+            if not part:
+                continue
+            m = re.fullmatch(r"(\d*)\s*-\s*(\d*)", part)
+            if m:
+                lo = int(m.group(1)) if m.group(1) else 1
+                hi = int(m.group(2)) if m.group(2) else n_pages
+                picked.extend(range(lo, hi + 1))
+            elif part.isdigit():
+                picked.append(int(part))
+        spec = picked
+    seen, out = set(), []
+    for p in spec:
+        idx = int(p) - 1
+        if 0 <= idx < n_pages and idx not in seen:
+            seen.add(idx)
+            out.append(idx)
+    return out
+
+def page_range_error(spec, n_pages):
+    """페이지 범위가 문서에서 한 페이지도 고르지 못하면 오류 메시지, 아니면 None"""
+    if not n_pages or spec is None or spec == "":
+        return None
+    if parse_page_range(spec, n_pages):
+        return None
+    shown = spec.strip(" ,") if isinstance(spec, str) else ", ".join(str(p) for p in spec)
+    return f"페이지 범위 1–{n_pages}을 벗어남 (입력: {shown or '없음'})"
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 페이지 단위 추출 (워커)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _count_pages(raw):
+    for opener in (_open_pypdf, _open_pypdf2):
+        try:
+            return len(opener(raw).pages)
+        except Exception:
+            continue
+    try:
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(raw)) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return 0
+
+def _open_pypdf(raw):
+    from pypdf import PdfReader
+    return PdfReader(io.BytesIO(raw))
+
+def _open_pypdf2(raw):
+    import PyPDF2
+    return PyPDF2.PdfReader(io.BytesIO(raw))
+
+def _open_cached(name, opener, raw, readers):
+    """리더를 문서당 한 번만 열기 — readers: 이름 → 리더 (열기 실패는 None으로 기억)"""
+    if readers is None:
+        try:
+            return opener(raw)
+        except Exception:
+            return None
+    if name not in readers:
+        try:
+            readers[name] = opener(raw)
+        except Exception:
+            readers[name] = None
+    return readers[name]
+
+def _extract_with_reader(reader, indices, texts, libs, lib_name):
+    if reader is None:
+        return
+    for i in indices:
+        try:
+            t = reader.pages[i].extract_text() or ""
+        except Exception:
+            continue
+        if t.strip():
+            texts[i], libs[i] = t, lib_name
+
+def _extract_pages_worker(raw, indices, readers=None):
+    """
+    지정 페이지 추출 — pypdf 우선, 실패·빈 페이지만 pdfplumber → PyPDF2 순으로 재시도
+    readers: 묶음 사이에 재사용할 리더 dict (같은 문서를 묶음마다 다시 파싱하지 않음)
+    """
+    texts = {i: "" for i in indices}
+    libs = {i: None for i in indices}
+    _extract_with_reader(_open_cached("pypdf", _open_pypdf, raw, readers), indices, texts, libs, "pypdf")
+
+    failed = [i for i in indices if libs[i] is None]
+    if failed:
+        try:
+            import pdfplumber
+            with pdfplumber.open(io.BytesIO(raw)) as pdf:
+                for i in failed:
+                    try:
+                        t = pdf.pages[i].extract_text() or ""
+                    except Exception:
+                        continue
+                    if t.strip():
+                        texts[i], libs[i] = t, "pdfplumber"
+        except Exception:
+            pass
+
+    failed = [i for i in indices if libs[i] is None]
+    if failed:
+        _extract_with_reader(_open_cached("PyPDF2", _open_pypdf2, raw, readers), failed, texts, libs, "PyPDF2")
+    return [(i, texts[i], libs[i]) for i in indices]
+
+# 워커 프로세스 상태: PDF bytes는 풀 생성 시 initializer로 워커마다 한 번만 받고,
+# 리더도 워커마다 한 번만 열어 이후 묶음은 페이지 번호만 주고받음
+_worker_doc = {}
+
+def _init_worker(raw):
+    _worker_doc.clear()
+    _worker_doc.update(raw=raw, readers={})
+
+def _extract_pooled(indices):
+    return _extract_pages_worker(_worker_doc["raw"], indices, _worker_doc["readers"])
+
+def _iter_extracted(raw, indices, max_workers):
+    """페이지 묶음을 순서대로 추출해 (인덱스, 텍스트, 라이브러리)를 yield — 큰 문서는 프로세스 풀 사용"""
+    batches = [indices[s:s + BATCH_PAGES] for s in range(0, len(indices), BATCH_PAGES)]
+    readers = {}
+    if len(indices) < PARALLEL_MIN_PAGES or max_workers <= 1:
+        for batch in batches:
+            yield from _extract_pages_worker(raw, batch, readers)
+        return
+
+    try:
+        ex = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(raw,))
+    except Exception:
+        ex = None  # 풀 생성 불가 환경 → 단일 프로세스
+    if ex is None:
+        for batch in batches:
+            yield from _extract_pages_worker(raw, batch, readers)
+        return
+
+    # 대기 중인 작업을 워커 수의 2배로 제한 → 소비가 늦어도 메모리 일정
+    pending = deque()
+    todo = iter(batches)
+    try:
+        for batch in todo:
+            pending.append(ex.submit(_extract_pooled, batch))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            rows = pending.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(ex.submit(_extract_pooled, nxt))
+            yield from rows
+    finally:
+        for fut in pending:
+            fut.cancel()
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. 캐시 (페이지 단위)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _cache_path(digest):
+    return os.path.join(PDF_CACHE_DIR, f"{digest}.json")
+
+def _cache_get(digest):
+    if digest in _mem_cache:
+        _mem_cache.move_to_end(digest)
+        return _mem_cache[digest]
+    path = _cache_path(digest)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entry = {"n_pages": data["n_pages"],
+                     "pages": {int(k): v for k, v in data["pages"].items()}}
+        except Exception:
+            return None
+        _cache_remember(digest, entry)
+        return entry
+    return None
+
+def _cache_remember(digest, entry):
+    _mem_cache[digest] = entry
+    _mem_cache.move_to_end(digest)
+    while len(_mem_cache) > _MEM_CACHE_SIZE:
+        _mem_cache.popitem(last=False)
+
+def _cache_save(digest, entry):
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        with open(_cache_path(digest), "w", encoding="utf-8") as f:
+            json.dump({"sha256": digest, "n_pages": entry["n_pages"], "pages": entry["pages"],
+                       "updated": datetime.now().isoformat()}, f, ensure_ascii=False)
+    except Exception:
+        pass
+
+def clear_pdf_cache():
+    """메모리·디스크 캐시 초기화"""
+    _mem_cache.clear()
+    if not os.path.isdir(PDF_CACHE_DIR):
+        return
+    for fn in os.listdir(PDF_CACHE_DIR):
+        if fn.endswith(".json"):
+            try:
+                os.remove(os.path.join(PDF_CACHE_DIR, fn))
+            except OSError:
+                pass
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 4. 공개 API
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def iter_pdf_pages(raw, pages=None, max_chars=MAX_TEXT_CHARS, use_cache=True, max_workers=MAX_WORKERS):
+    """
+    PDF bytes → 페이지를 하나씩 yield
+    {"page": 1, "total": 선택 페이지 수, "text": "...", "lib": "pypdf", "cached": False}
+    - pages: parse_page_range 형식의 페이지 범위 (None = 전체)
+    - max_chars: 누적 텍스트 상한 — 넘으면 해당 페이지를 잘라 반환하고 중단
+    캐시에 있는 페이지는 즉시, 없는 페이지만 추출
+    페이지 범위가 한 페이지도 고르지 못하면(빈·역순·범위 밖) ValueError
+    """
+    digest = pdf_digest(raw)
+    entry = _cache_get(digest) if use_cache else None
+    if entry is None:
+        entry = {"n_pages": _count_pages(raw), "pages": {}}
+    err = page_range_error(pages, entry["n_pages"])
+    if err:
+        raise ValueError(err)
+    indices = parse_page_range(pages, entry["n_pages"])
+    total = len(indices)
+    missing = [i for i in indices if (i + 1) not in entry["pages"]]
+
+    fresh = _iter_extracted(raw, missing, max_workers)
+    chars, dirty = 0, False
+    try:
+        for n, i in enumerate(indices, 1):
+            cached = (i + 1) in entry["pages"]
+            if not cached:
+                j, text, lib = next(fresh)
+                entry["pages"][j + 1] = {"text": text, "lib": lib}
+                dirty = True
+            page = entry["pages"][i + 1]
+            text = page["text"]
+            if max_chars and chars + len(text) > max_chars:
+                text = text[:max_chars - chars]
+            chars += len(text)
+            yield {"page": i + 1, "n": n, "total": total, "text": text,
+                   "lib": page["lib"], "cached": cached}
+            if max_chars and chars >= max_chars:
+                break
+    finally:
+        fresh.close()
+        if use_cache and entry["n_pages"]:
+            _cache_remember(digest, entry)
+            if dirty:
+                _cache_save(digest, entry)
+
+def extract_pages(raw, pages=None, max_chars=MAX_TEXT_CHARS, use_cache=True, max_workers=MAX_WORKERS):
+    """iter_pdf_pages 결과를 리스트로 수집"""
+    return list(iter_pdf_pages(raw, pages, max_chars, use_cache, max_workers))
+
+def describe_extraction(pages, truncated=False):
+    """추출 결과 요약 메시지"""
+    n_ok = sum(1 for p in pages if p["lib"])
+    total = pages[0]["total"] if pages else 0
+    chars = sum(len(p["text"]) for p in pages)
+    msg = f"{n_ok}/{total}페이지 추출 완료 ({chars:,}자)"
+    fallback = {}
+    for p in pages:
+        if p["lib"] and p["lib"] != "pypdf":
+            fallback[p["lib"]] = fallback.get(p["lib"], 0) + 1
+    if fallback:
+        msg += " — " + ", ".join(f"{lib} 보완 {n}페이지" for lib, n in fallback.items())
+    if truncated:
+        msg += f" (상한 {chars:,}자에서 중단)"
+    if pages and all(p["cached"] for p in pages):
+        msg += " [캐시]"
+    return msg
+
+def extract_pdf_document(uploaded_file, pages=None, max_chars=MAX_TEXT_CHARS,
+                         max_bytes=MAX_PDF_BYTES, on_page=None, min_chars=1):
+    """
+    업로드 PDF → (텍스트, 메시지) / 실패 시 (None, 오류메시지)
+    on_page(page_dict): 페이지가 추출될 때마다 호출 (진행률 표시·스트리밍 처리용)
+    """
+    raw, err = read_upload(uploaded_file, max_bytes)
+    if raw is None:
+        return None, err
+
+    got, parts, chars = [], [], 0
+    try:
+        for page in iter_pdf_pages(raw, pages, max_chars):
+            got.append(page)
+            if page["text"]:
+                parts.append(page["text"])
+            chars += len(page["text"])
+            if on_page:
+                on_page(page)
+    except ValueError as e:
+        return None, str(e)
+    text = "\n".join(parts)
+    if len(text.strip()) >= min_chars:
+        truncated = bool(max_chars) and chars >= max_chars
+        return text, describe_extraction(got, truncated)
+    return None, "텍스트 추출 실패 — 스캔 PDF이거나 보안 설정된 파일일 수 있습니다. OCR이 필요할 수 있습니다."
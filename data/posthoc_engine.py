@@ -0,0 +1,199 @@
+"""
+사후검정 엔진 (Tukey HSD · 동질군 문자 표시)
+- studentized_range_sf / studentized_range_ppf: 스튜던트화 범위 분포 — q 배열 전체를
+  가우스-르장드르 구적으로 한 번에 적분 (scipy 분포 함수의 q별 반복 적분 대신), (k, df)별 노드 메모이즈
+- tukey_hsd: 시료 평균·관측 수·MSE로 모든 쌍의 q·p-adj·신뢰구간을 한 번에 계산
+  (pairwise_tukeyhsd와 같은 표 형식 — 20~50개 시료도 즉시 계산)
+- compact_letters: 유의차 행렬 → 동질군 문자 (a, b, ab …) — 정렬 순서 한 번 훑기로 최대 비유의 구간 계산
+  Friedman 순위합 차이 검정과 ANOVA Tukey 결과가 같은 구현을 사용
+"""
+from functools import lru_cache
+from string import ascii_lowercase, ascii_uppercase
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq
+from scipy.special import ndtr
+from scipy.stats import chi
+
+TUKEY_COLUMNS = ["group1", "group2", "meandiff", "p-adj", "lower", "upper", "reject"]
+_Z_NODES = 96                        # 정규 적분 노드 수 (z ∈ [-8.5, 8.5])
+_S_NODES = 64                        # s = χ/√df 적분 노드 수
+_BLOCK = 64                          # 한 번에 적분하는 q 개수 (메모리 제한)
+_LETTERS = ascii_lowercase + ascii_uppercase
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 스튜던트화 범위 분포
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _legendre(n, a, b):
+    x, w = np.polynomial.legendre.leggauss(n)
+    return (b - a) / 2 * x + (a + b) / 2, (b - a) / 2 * w
+
+
+@lru_cache(maxsize=1)
+def _z_nodes():
+    """정규 밀도 가중 z 노드 → (z, Φ(z), φ(z)·가중치)"""
+    z, w = _legendre(_Z_NODES, -8.5, 8.5)
+    return z, ndtr(z), np.exp(-z ** 2 / 2) / np.sqrt(2 * np.pi) * w
+
+
+@lru_cache(maxsize=64)
+def _s_nodes(df):
+    """s = χ_df/√df 밀도 가중 노드 → (s, f(s)·가중치) — 유효 범위는 χ 분위수 1e-14 ~ 1-1e-14"""
+    if not np.isfinite(df):                         # df = ∞ → s = 1
+        return np.ones(1), np.ones(1)
+    root = np.sqrt(df)
+    lo, hi = chi.ppf(1e-14, df) / root, chi.ppf(1 - 1e-14, df) / root
+    s, w = _legendre(_S_NODES, lo, hi)
+    return s, w * chi.pdf(s * root, df) * root
+
+
+def studentized_range_sf(q, k, df):
+    """
+    P(Q > q) — Q: k개 평균, 오차 자유도 df의 스튜던트화 범위
+    P(Q ≤ q) = ∫ f(s) · k∫ φ(z)[Φ(z) − Φ(z − qs)]^(k−1) dz ds 를 (q × s × z) 배열로 한 번에 계산
+    """
+    q = np.asarray(q, dtype=float)
+    flat = q.ravel()
+    out = np.full(flat.shape, np.nan)
+    ok = np.isfinite(flat)
+    out[np.isposinf(flat)] = 0.0
+    z, cdf_z, wz = _z_nodes()
+    s, ws = _s_nodes(float(df))
+    vals, inverse = np.unique(np.maximum(flat[ok], 0.0), return_inverse=True)   # 같은 q는 한 번만 적분
+    res = np.empty(len(vals))
+    for i in range(0, len(vals), _BLOCK):
+        w = vals[i:i + _BLOCK, None, None] * s[None, :, None]
+        inner = (cdf_z - ndtr(z - w)) ** (k - 1)
+        cdf = k * (inner @ wz) @ ws
+        res[i:i + _BLOCK] = 1 - cdf
+    out[ok] = np.clip(res, 0.0, 1.0)[inverse]
+    return out.reshape(q.shape) if q.ndim else float(out[0])
+
+
+@lru_cache(maxsize=256)
+def studentized_range_ppf(p, k, df):
+    """하측 확률 p의 분위수 (Tukey 임계 q) — 위 분포 함수로 근 찾기"""
+    target = 1 - p
+    hi = 10.0
+    while studentized_range_sf(hi, k, df) > target:
+        hi *= 2
+    return brentq(lambda x: studentized_range_sf(x, k, df) - target, 0.0, hi, xtol=1e-12)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. Tukey HSD
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def tukey_from_stats(labels, means, counts, mse, df, alpha=0.05):
+    """
+    시료 평균·관측 수·합동 분산(MSE)·오차 자유도 → Tukey-Kramer 쌍별 비교
+    returns: {"table": DataFrame(TUKEY_COLUMNS, pairwise_tukeyhsd와 같은 반올림),
+              "reject": 시료 × 시료 bool 행렬, "q_crit", "mse", "df"}
+    """
+    labels = list(labels)
+    means = np.asarray(means, dtype=float)
+    counts = np.asarray(counts, dtype=float)
+    m = len(labels)
+    i1, i2 = np.triu_indices(m, 1)
+    diff = means[i2] - means[i1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.sqrt(mse / 2 * (1 / counts[i1] + 1 / counts[i2]))
+        q = np.abs(diff) / se
+    valid = m >= 2 and df > 0 and np.isfinite(mse)
+    q_crit = studentized_range_ppf(1 - alpha, m, float(df)) if valid else np.nan
+    pvals = studentized_range_sf(q, m, float(df)) if valid else np.full(len(q), np.nan)
+    reject = q > q_crit
+    half = se * q_crit
+    table = pd.DataFrame({
+        "group1": pd.Series([labels[i] for i in i1], dtype=object),
+        "group2": pd.Series([labels[i] for i in i2], dtype=object),
+        "meandiff": np.round(diff, 4),
+        "p-adj": np.round(pvals, 4),
+        "lower": np.round(diff - half, 4),
+        "upper": np.round(diff + half, 4),
+        "reject": reject,
+    }, columns=TUKEY_COLUMNS)
+    matrix = np.zeros((m, m), dtype=bool)
+    matrix[i1, i2] = reject
+    matrix[i2, i1] = reject
+    return {"table": table, "reject": matrix, "q_crit": q_crit, "mse": mse, "df": df}
+
+
+def tukey_hsd(values, groups, alpha=0.05):
+    """
+    원자료(점수, 시료) → Tukey HSD (일원 MSE 사용 — pairwise_tukeyhsd와 같은 값)
+    returns: tukey_from_stats 결과 + {"labels", "means", "counts", "letters"}
+    """
+    data = pd.DataFrame({"y": pd.to_numeric(pd.Series(values).reset_index(drop=True), errors="coerce"),
+                         "g": pd.Series(groups).reset_index(drop=True)}).dropna()
+    codes, labels = pd.factorize(data["g"], sort=True)
+    y = data["y"].to_numpy(dtype=float)
+    m = len(labels)
+    counts = np.bincount(codes, minlength=m).astype(float)
+    means = np.bincount(codes, weights=y, minlength=m) / counts
+    df = len(y) - m
+    ssw = ((y - means[codes]) ** 2).sum()
+    mse = ssw / df if df > 0 else np.nan
+    labels = list(labels)
+    out = tukey_from_stats(labels, means, counts, mse, df, alpha)
+    out.update({"labels": labels, "means": pd.Series(means, index=labels), "counts": counts,
+                "letters": compact_letters(labels, means, out["reject"])})
+    return out
+
+
+def letters_table(result, label="시료"):
+    """tukey_hsd 결과 → 평균 내림차순 표 (시료, 평균, n, 동질군)"""
+    table = pd.DataFrame({
+        label: result["labels"],
+        "평균": result["means"].to_numpy(),
+        "n": result["counts"].astype(int),
+        "동질군": [result["letters"][s] for s in result["labels"]],
+    })
+    return table.sort_values("평균", ascending=False, kind="stable").reset_index(drop=True)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. 동질군 문자 표시
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _letter(idx):
+    """0 → a, 25 → z, 26 → A, 51 → Z, 52 → aa …"""
+    n = len(_LETTERS)
+    s = _LETTERS[idx % n]
+    while idx >= n:
+        idx = idx // n - 1
+        s = _LETTERS[idx % n] + s
+    return s
+
+
+def compact_letters(labels, values, significant):
+    """
+    동질군 문자 (최대 비유의 구간) — 값 오름차순 정렬 후
+    1) 각 시료 k의 하한 lo[k] = (k보다 앞에서 k와 유의차인 마지막 시료) + 1
+    2) 시작점 i의 구간 끝 = i 뒤에서 lo > i가 처음 나오는 위치 − 1 (끝은 i에 대해 단조 증가)
+    3) 끝이 바로 앞 시작점과 같으면 포함 구간이므로 제외 → 남은 구간에 a, b, c … 부여
+    significant: labels 순서의 시료 × 시료 bool 행렬
+    returns: {시료: 문자열}
+    """
+    labels = list(labels)
+    m = len(labels)
+    if m == 0:
+        return {}
+    order = np.argsort(np.asarray(values, dtype=float), kind="stable")
+    sig = np.asarray(significant, dtype=bool)[np.ix_(order, order)]
+    idx = np.arange(m)
+    upper = np.triu(sig, 1)
+    lo = np.where(upper.any(axis=0), m - np.argmax(upper[::-1], axis=0), 0)
+    breaks = (lo[None, :] > idx[:, None]) & (idx[None, :] > idx[:, None])
+    end = np.where(breaks.any(axis=1), np.argmax(breaks, axis=1) - 1, m - 1)
+    starts = idx[np.r_[True, end[1:] > end[:-1]]]
+    groups = [[] for _ in range(m)]
+    for n, i in enumerate(starts):
+        for pos in range(i, end[i] + 1):
+            groups[pos].append(_letter(n))
+    result = {}
+    for pos, i in enumerate(order):
+        result[labels[i]] = "".join(groups[pos]) or "a"
+    return {s: result[s] for s in labels}
@@ -0,0 +1,322 @@
+"""
+관능 검사 설계 검정력 · 필요 패널 수 엔진
+- 닫힌 식: 차이식별(이항 — discrimination_engine), ANOVA(비중심 F), 평점법 합격선 단측 t(비중심 t)
+  (패널 수 × 효과 크기 × α 격자 전체를 배열 한 번으로 계산)
+- 몬테카를로: simulation_engine 시뮬레이터로 가상 연구를 배열 단위로 만들고 검정 통계량을 한 번에 계산
+  순위법(Friedman)은 닫힌 식이 없어 항상 시뮬레이션, 나머지도 method="simulation"이면 리커트 반올림까지 반영
+- 격자 칸(패널 수, 효과 크기) 단위로 프로세스 풀에 분산, 칸별 p-value 배열을 메모이즈
+  (α만 바꾸면 재계산 없음 — 같은 seed면 같은 결과, 칸마다 독립 난수열)
+- required_panels: 검정력 곡선에서 목표 검정력을 처음 달성하는 패널 수
+"""
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import binom, chi2, f as f_dist, ncf, nct, t as t_dist
+
+from data.discrimination_engine import P0_TRIANGLE, discrimination_power
+from data.simulation_engine import (ANOVA_NOISE_SD, ANOVA_PANEL_SD, SCALING_NOISE_SD, SCALING_PANEL_SD,
+                                    simulate_correct, simulate_ranks, simulate_scores)
+
+DESIGNS = ("anova", "discrimination", "ranking", "scaling")
+CLOSED_FORM = ("anova", "discrimination", "scaling")
+N_SIMS = 2000                        # 칸별 가상 연구 수
+SEED = 0
+SCALING_THRESHOLD = 5.0              # 평점법 합격선 (7점 척도)
+DEFAULT_SCALE = {"anova": 9, "scaling": 7}
+PARALLEL_MIN_CELLS = 4               # 이보다 적은 격자 칸은 단일 프로세스로 계산
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+_SIM_CHUNK_CELLS = 4_000_000         # 시뮬레이션 한 묶음의 (연구 × 패널 × 시료 × 반복) 상한
+_CACHE_SIZE = 512
+_power_cache = OrderedDict()         # (설계, 패널 수, 효과, 옵션, 연구 수, seed) → p-value 배열
+
+
+def default_sd(design):
+    """효과 크기 단위가 되는 오차 표준편차 (ANOVA: 측정 오차, 평점법: 패널 편향 + 오차)"""
+    if design == "scaling":
+        return float(np.hypot(SCALING_PANEL_SD, SCALING_NOISE_SD))
+    return ANOVA_NOISE_SD
+
+
+def effect_error(design, effects):
+    """효과 크기 범위 확인 → 오류 메시지 (정상이면 None)
+    ANOVA f·순위법 선호 차이는 0 이상, 차이식별 pd는 0~1, 평점법은 음수 허용 (평균 < 합격선 → 오합격률)
+    """
+    effects = np.asarray(effects, dtype=float)
+    if not np.all(np.isfinite(effects)):
+        return "효과 크기는 유한한 숫자여야 합니다"
+    if design in ("anova", "ranking") and (effects < 0).any():
+        return "효과 크기는 0 이상이어야 합니다" if design == "ranking" else "Cohen f는 0 이상이어야 합니다"
+    if design == "discrimination" and ((effects < 0) | (effects > 1)).any():
+        return "구별자 비율 pd는 0~1 사이여야 합니다"
+    return None
+
+
+def _spaced(k):
+    """평균 0, 모표준편차 1인 등간격 k개 (효과 크기 f → 시료 평균 = 중앙 + f·σ·값)"""
+    z = np.linspace(-1, 1, int(k))
+    return z / z.std() if k > 1 else z
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 닫힌 식
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def anova_power(n, effect_f, alpha=0.05, n_samples=3, n_reps=1):
+    """
+    패널 블록 이원 ANOVA(시료 + 패널) 시료 효과 검정력 — 비중심 F
+    effect_f: Cohen f = 시료 평균 표준편차 / 오차 표준편차, λ = f² · 패널 · 시료 · 반복
+    n·effect_f·alpha는 서로 브로드캐스트되는 배열
+    """
+    n = np.asarray(n, dtype=float)
+    k, r = int(n_samples), int(n_reps)
+    df1 = k - 1
+    df2 = n * k * r - n - k + 1
+    lam = np.asarray(effect_f, dtype=float) ** 2 * n * k * r
+    with np.errstate(invalid="ignore"):
+        crit = f_dist.isf(alpha, df1, df2)
+        power = ncf.sf(crit, df1, df2, lam)
+    return np.where(df2 > 0, power, np.nan)
+
+
+def scaling_power(n, effect, alpha=0.05, sd=None):
+    """
+    평점법 합격선 단측 t 검정(H0: 평균 ≤ 합격선) 검정력 — 비중심 t
+    effect: 실제 평균 − 합격선 (척도 점수), sd: 패널 간 점수 표준편차
+    """
+    n = np.asarray(n, dtype=float)
+    sd = default_sd("scaling") if sd is None else sd
+    with np.errstate(invalid="ignore"):
+        crit = t_dist.isf(alpha, n - 1)
+        power = nct.sf(crit, n - 1, np.asarray(effect, dtype=float) / sd * np.sqrt(n))
+    return np.where(n > 1, power, np.nan)
+
+
+def _closed_grid(design, ns, effects, alphas, n_samples, n_reps, p0, sd):
+    """(패널 수 × 효과 × α) 검정력 배열"""
+    n = np.asarray(ns)[:, None, None]
+    e = np.asarray(effects, dtype=float)[None, :, None]
+    a = np.asarray(alphas, dtype=float)[None, None, :]
+    if design == "anova":
+        return anova_power(n, e, a, n_samples, n_reps)
+    if design == "scaling":
+        return scaling_power(n, e, a, sd)
+    out = np.empty((len(ns), len(effects), len(alphas)))
+    for j, pd_prop in enumerate(effects):
+        for m, alpha in enumerate(alphas):
+            out[:, j, m] = discrimination_power(np.asarray(ns), p0, float(pd_prop), float(alpha))
+    return out
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 몬테카를로 (격자 칸 하나 = 워커 작업 하나)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _anova_pvalues(scores):
+    """(연구, 패널, 시료, 반복) 점수 → 이원(시료 + 패널) ANOVA 시료 효과 p-value (anova_engine 균형 설계와 같은 식)"""
+    _, n, k, r = scores.shape
+    grand = scores.mean(axis=(1, 2, 3))
+    sample_mean = scores.mean(axis=(1, 3))
+    panel_mean = scores.mean(axis=(2, 3))
+    ss_total = ((scores - grand[:, None, None, None]) ** 2).sum(axis=(1, 2, 3))
+    ss_a = n * r * ((sample_mean - grand[:, None]) ** 2).sum(axis=1)
+    ss_b = k * r * ((panel_mean - grand[:, None]) ** 2).sum(axis=1)
+    df2 = n * k * r - n - k + 1
+    ss_res = np.maximum(ss_total - ss_a - ss_b, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        F = (ss_a / (k - 1)) / (ss_res / df2)
+    # 모든 점수가 같으면(잔차 0) 검정 불가 → p = 1
+    return np.where(np.isfinite(F), f_dist.sf(F, k - 1, df2), 1.0)
+
+
+def _friedman_pvalues(ranks):
+    """(연구, 패널, 시료) 동점 없는 순위 → Friedman χ² 점근 p-value (friedmanchisquare와 같은 값)"""
+    _, n, k = ranks.shape
+    R = ranks.sum(axis=1)
+    stat = 12 / (n * k * (k + 1)) * (R ** 2).sum(axis=1) - 3 * n * (k + 1)
+    return chi2.sf(stat, k - 1)
+
+
+def _scaling_pvalues(scores, threshold):
+    """(연구, 패널) 점수 → 단측 t 검정(H0: 평균 ≤ 합격선) p-value"""
+    n = scores.shape[1]
+    sd = scores.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (scores.mean(axis=1) - threshold) / (sd / np.sqrt(n))
+    t = np.where(sd > 0, t, np.where(scores.mean(axis=1) > threshold, np.inf, -np.inf))
+    return t_dist.sf(t, n - 1)
+
+
+def _simulate_chunk(design, rng, n, effect, size, opts):
+    n_samples, n_reps, p0, sd, scale = opts
+    if design == "anova":
+        mid = (scale + 1) / 2 if scale else 0.0
+        means = mid + effect * sd * _spaced(n_samples)
+        scores = simulate_scores(rng, n, means, n_reps, ANOVA_PANEL_SD, sd, scale, size)
+        return _anova_pvalues(scores)
+    if design == "ranking":
+        ranks = simulate_ranks(rng, n, effect * np.linspace(1, 0, int(n_samples)), 1.0, size)
+        return _friedman_pvalues(ranks)
+    if design == "scaling":
+        # 패널 편향 + 오차의 합 표준편차가 sd가 되도록 기본 비율로 나눔
+        ratio = sd / default_sd("scaling")
+        scores = simulate_scores(rng, n, [SCALING_THRESHOLD + effect], 1, SCALING_PANEL_SD * ratio,
+                                 SCALING_NOISE_SD * ratio, scale, size)
+        return _scaling_pvalues(scores[..., 0, 0], SCALING_THRESHOLD)
+    correct = simulate_correct(rng, n, effect + (1 - effect) * p0, size)
+    return binom.sf(correct - 1, n, p0)
+
+
+def simulate_pvalues(design, n, effect, n_samples=3, n_reps=1, p0=P0_TRIANGLE, sd=None, scale=None,
+                     n_sims=N_SIMS, seed=SEED):
+    """
+    격자 칸 하나: 가상 연구 n_sims개의 p-value 배열 (검정력 = (p < α) 비율)
+    seed는 (seed, 패널 수, 효과) 조합으로 칸마다 독립 난수열 — 계산 순서·프로세스와 무관하게 같은 결과
+    """
+    sd = default_sd(design) if sd is None else float(sd)
+    opts = (int(n_samples), int(n_reps), float(p0), sd, scale)
+    # 음수 효과(평점법 평균 < 합격선 → 오합격률)도 되도록 float 비트 패턴을 부호 없는 정수로 사용
+    rng = np.random.default_rng([int(seed), int(n), int(np.float64(effect).view(np.uint64))])
+    per_sim = max(int(n) * int(n_samples) * int(n_reps), 1)
+    chunk = max(1, _SIM_CHUNK_CELLS // per_sim)
+    parts = [_simulate_chunk(design, rng, int(n), float(effect), min(chunk, n_sims - i), opts)
+             for i in range(0, int(n_sims), chunk)]
+    return np.concatenate(parts)
+
+
+def _worker(payload):
+    return simulate_pvalues(*payload)
+
+
+def _iter_results(payloads, max_workers):
+    """(칸 인덱스, p-value 배열)을 완료되는 대로 yield — 칸이 많으면 프로세스 풀 사용"""
+    if len(payloads) < PARALLEL_MIN_CELLS or max_workers <= 1:
+        for i, p in enumerate(payloads):
+            yield i, _worker(p)
+        return
+    try:
+        ex = ProcessPoolExecutor(max_workers=max_workers)
+    except Exception:
+        ex = None  # 풀 생성 불가 환경 → 단일 프로세스
+    if ex is None:
+        for i, p in enumerate(payloads):
+            yield i, _worker(p)
+        return
+
+    # 대기 중인 작업을 워커 수의 2배로 제한
+    pending = deque()
+    todo = iter(enumerate(payloads))
+    try:
+        for i, p in todo:
+            pending.append((i, ex.submit(_worker, p)))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            i, fut = pending.popleft()
+            result = fut.result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append((nxt[0], ex.submit(_worker, nxt[1])))
+            yield i, result
+    finally:
+        for _, fut in pending:
+            fut.cancel()
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. 검정력 격자 · 필요 패널 수
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def power_grid(design, ns, effects, alphas=(0.05,), n_samples=3, n_reps=1, p0=P0_TRIANGLE, sd=None,
+               scale=None, method="auto", n_sims=N_SIMS, seed=SEED, max_workers=MAX_WORKERS,
+               on_progress=None, use_cache=True):
+    """
+    검정력 격자 (패널 수 × 효과 크기 × α)
+    design: "anova"(효과 = Cohen f), "discrimination"(효과 = 구별자 비율 pd, p0 = 우연 정답 확률),
+            "ranking"(효과 = 최고·최저 시료 선호 차이, 잡음 표준편차 단위), "scaling"(효과 = 평균 − 합격선)
+    method: "auto"(닫힌 식이 있으면 닫힌 식) / "closed" / "simulation"
+    scale: 시뮬레이션 점수 척도 (None이면 ANOVA 9점·평점법 7점, 0이면 반올림 없는 연속 점수)
+    on_progress(완료 칸 수, 전체 칸 수): 시뮬레이션 칸 결과가 나올 때마다 호출 (캐시 적중 포함)
+    returns: DataFrame (패널수, 효과크기, α, 검정력, 표준오차, 방법) — 닫힌 식은 표준오차 0
+    """
+    if design not in DESIGNS:
+        raise ValueError(f"지원하지 않는 설계: {design}")
+    ns = [int(n) for n in ns]
+    effects = [float(e) for e in effects]
+    alphas = [float(a) for a in alphas]
+    err = effect_error(design, effects)
+    if err:
+        raise ValueError(err)
+    closed = design in CLOSED_FORM and method != "simulation"
+    if method == "closed" and not closed:
+        raise ValueError(f"{design} 설계는 닫힌 식이 없습니다 (method='simulation')")
+
+    if closed:
+        power = _closed_grid(design, ns, effects, alphas, n_samples, n_reps, p0,
+                             default_sd(design) if sd is None else sd)
+        se = np.zeros_like(power)
+        label = "닫힌 식"
+    else:
+        scale = DEFAULT_SCALE.get(design) if scale is None else (int(scale) or None)
+        sd_used = default_sd(design) if sd is None else float(sd)
+        cells = [(n, e) for n in ns for e in effects]
+        total = len(cells)
+        pvals, payloads, keys, missing = {}, [], [], []
+        done = 0
+        for cell in cells:
+            key = (design, cell[0], cell[1], int(n_samples), int(n_reps), float(p0), sd_used, scale,
+                   int(n_sims), seed)
+            hit = _power_cache.get(key) if use_cache else None
+            if hit is not None:
+                _power_cache.move_to_end(key)
+                pvals[cell] = hit
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+            else:
+                payloads.append((design, cell[0], cell[1], n_samples, n_reps, p0, sd_used, scale,
+                                 n_sims, seed))
+                keys.append(key)
+                missing.append(cell)
+
+        for i, res in _iter_results(payloads, max_workers):
+            pvals[missing[i]] = res
+            _power_cache[keys[i]] = res
+            if len(_power_cache) > _CACHE_SIZE:
+                _power_cache.popitem(last=False)
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+
+        stacked = np.stack([pvals[c] for c in cells]).reshape(len(ns), len(effects), -1)
+        power = (stacked[..., None] < np.asarray(alphas)).mean(axis=2)
+        se = np.sqrt(power * (1 - power) / stacked.shape[2])
+        label = "시뮬레이션"
+
+    n_idx, e_idx, a_idx = np.meshgrid(np.arange(len(ns)), np.arange(len(effects)), np.arange(len(alphas)),
+                                      indexing="ij")
+    return pd.DataFrame({
+        "패널수": np.asarray(ns)[n_idx.ravel()],
+        "효과크기": np.asarray(effects)[e_idx.ravel()],
+        "α": np.asarray(alphas)[a_idx.ravel()],
+        "검정력": power.ravel(),
+        "표준오차": se.ravel(),
+        "방법": label,
+    })
+
+
+def required_panels(grid, target=0.8):
+    """
+    검정력 격자 → (효과크기, α)별 목표 검정력을 처음 달성하는 패널 수
+    returns: DataFrame (효과크기, α, 필요 패널수 — 격자 안에서 못 찾으면 결측)
+    """
+    rows = []
+    for (effect, alpha), g in grid.sort_values("패널수").groupby(["효과크기", "α"], sort=True):
+        ok = g["검정력"].to_numpy() >= target
+        rows.append({"효과크기": effect, "α": alpha,
+                     "필요 패널수": int(g["패널수"].to_numpy()[np.argmax(ok)]) if ok.any() else None})
+    table = pd.DataFrame(rows, columns=["효과크기", "α", "필요 패널수"])
+    table["필요 패널수"] = table["필요 패널수"].astype("Int64")
+    return table
@@ -0,0 +1,249 @@
+"""
+순위법(Friedman) 정확·순열 검정 엔진
+- rank_rows: 행(패널)별 평균 순위 — argsort 한 번으로 동점 평균까지 전 행 동시 계산
+- friedman_statistic: 동점 보정 Friedman χ² (행 안 순위 분산 기준, 동점 없으면 교재 공식과 같음)
+- friedman_exact: 귀무분포 p-value — 순위합 벡터 분포를 행 단위 합성곱(정렬 상태로 대칭 축약)으로 정확히 계산,
+  상태가 너무 많으면 몬테카를로 순열(배치 단위, α 판정이 확실해지면 조기 종료)
+- rank_range_exact / rank_difference_exact: 순위합 범위·순위합 차이 검정의 정확 분포 버전 (1차원 합성곱)
+- 동점(1.5, 2.5 …)은 행 안에서 값 그대로 순열 — 동점 구조를 유지한 조건부 검정
+"""
+from itertools import permutations
+from math import factorial
+import numpy as np
+import pandas as pd
+from scipy.stats import beta, chi2
+
+from data.posthoc_engine import compact_letters
+
+N_PERMUTATIONS = 20000               # 몬테카를로 순열 최대 횟수
+PERM_BATCH = 2000                    # 한 번에 생성하는 순열 수
+EARLY_STOP_CONFIDENCE = 0.99         # p-value 신뢰구간이 α를 벗어나면 조기 종료
+EXACT_MAX_STATES = 200_000           # 정확 분포 상태(정렬된 순위합 벡터) 수 상한
+EXACT_MAX_WORK = 5_000_000           # 행 하나 합성곱의 (상태 × 순열) 상한
+EXACT_MAX_K = 6                      # 정확 분포는 시료 6개 이하만 (행 순열 k! 개)
+_BATCH_CELLS = 4_000_000             # 순열 배치 배열 크기 상한 (배치 × 패널 × 시료)
+_EPS = 1e-9
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 순위 · 통계량
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def rank_rows(matrix):
+    """행별 오름차순 평균 순위 (동점은 평균 순위, scipy rankdata(axis=1)와 같은 값)"""
+    x = np.asarray(matrix, dtype=float)
+    n, k = x.shape
+    order = np.argsort(x, axis=1, kind="stable")
+    s = np.take_along_axis(x, order, axis=1)
+    pos = np.broadcast_to(np.arange(k), (n, k))
+    new = np.ones((n, k), dtype=bool)
+    new[:, 1:] = s[:, 1:] != s[:, :-1]
+    last = np.ones((n, k), dtype=bool)
+    last[:, :-1] = new[:, 1:]
+    start = np.maximum.accumulate(np.where(new, pos, 0), axis=1)
+    end = np.minimum.accumulate(np.where(last, pos, k - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty((n, k))
+    np.put_along_axis(ranks, order, (start + end) / 2 + 1, axis=1)
+    return ranks
+
+
+def _spread(rank_sums):
+    """Σ(Rj − R̄)² — 순열 검정 통계량 (행 안 순열에서 분모가 일정하므로 χ²와 순서가 같음)"""
+    R = np.asarray(rank_sums, dtype=float)
+    return ((R - R.mean(axis=-1, keepdims=True)) ** 2).sum(axis=-1)
+
+
+def friedman_statistic(ranks):
+    """
+    동점 보정 Friedman χ² = (k−1)·Σ(Rj − R̄)² / Σ(rij − r̄i)²
+    returns: {"chi2", "df", "p_asymptotic", "rank_sums", "tie_correction"}
+    """
+    r = np.asarray(ranks, dtype=float)
+    n, k = r.shape
+    R = r.sum(axis=0)
+    denom = ((r - r.mean(axis=1, keepdims=True)) ** 2).sum()
+    untied = n * k * (k * k - 1) / 12
+    stat = (k - 1) * _spread(R) / denom if denom > 0 else np.nan
+    return {"chi2": float(stat), "df": k - 1,
+            "p_asymptotic": float(chi2.sf(stat, k - 1)) if np.isfinite(stat) else np.nan,
+            "rank_sums": R, "tie_correction": float(denom / untied) if untied > 0 else np.nan}
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 정확 분포 (행 단위 합성곱)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _half_units(ranks):
+    """순위 × 2 정수 배열 (0.5 단위가 아니면 None)"""
+    doubled = np.asarray(ranks, dtype=float) * 2
+    ints = np.rint(doubled)
+    return ints.astype(np.int64) if np.allclose(doubled, ints) else None
+
+
+def _exact_spread_distribution(units):
+    """
+    Σ(Rj − R̄)² 귀무분포 (값, 확률) — 상태는 정렬된 순위합 벡터(열 교환 대칭)로 축약
+    상태·연산량이 상한을 넘으면 None
+    """
+    n, k = units.shape
+    if k > EXACT_MAX_K or units.min() < 0:
+        return None
+    # 정렬 상태 수 어림 (좌표 범위^(k−1) / k!) — 명백히 넘치면 합성곱을 시작하지 않음
+    span = int((units.max(axis=1) - units.min(axis=1)).sum()) + 1
+    if span ** (k - 1) / factorial(k) > 4 * EXACT_MAX_STATES:
+        return None
+    radix = int(units.max()) * n + 1
+    if radix ** k >= 2 ** 62:
+        return None
+    weights = radix ** np.arange(k, dtype=np.int64)
+    states, probs = np.zeros((1, k), dtype=np.int64), np.ones(1)
+    perm_cache = {}
+    for row in units:
+        key = tuple(sorted(row))
+        perms = perm_cache.get(key)
+        if perms is None:
+            perms = np.unique(np.array(list(permutations(key)), dtype=np.int64), axis=0)
+            perm_cache[key] = perms
+        if len(states) * len(perms) > EXACT_MAX_WORK:
+            return None
+        nxt = np.sort((states[:, None, :] + perms[None, :, :]).reshape(-1, k), axis=1)
+        codes, first, inverse = np.unique(nxt @ weights, return_index=True, return_inverse=True)
+        probs = np.bincount(inverse, weights=np.repeat(probs / len(perms), len(perms)))
+        states = nxt[first]
+        if len(states) > EXACT_MAX_STATES:
+            return None
+    return _spread(states / 2.0), probs
+
+
+def _convolve_rows(pmfs):
+    """행별 정수 격자 pmf [(최솟값, 확률 배열)] → 합의 (최솟값, 확률 배열)"""
+    lo, total = 0, np.ones(1)
+    for m, p in pmfs:
+        lo += m
+        total = np.convolve(total, p)
+    return lo, total
+
+
+def _row_pmf(values):
+    """정수 값 목록 → (최솟값, 격자 확률) — 값마다 같은 확률"""
+    values = np.asarray(values, dtype=np.int64)
+    m = int(values.min())
+    p = np.bincount(values - m).astype(float)
+    return m, p / p.sum()
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. Friedman 정확 · 순열 검정
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _permutation_batch(ranks, size, rng):
+    """행 안 무작위 순열 size개 → 각 순열의 Σ(Rj − R̄)² (size,)"""
+    n, k = ranks.shape
+    order = np.argsort(rng.random((size, n, k)), axis=2)
+    permuted = np.take_along_axis(np.broadcast_to(ranks, (size, n, k)), order, axis=2)
+    return _spread(permuted.sum(axis=1))
+
+
+def _clopper_pearson(hits, m, confidence=EARLY_STOP_CONFIDENCE):
+    a = (1 - confidence) / 2
+    lo = beta.ppf(a, hits, m - hits + 1) if hits > 0 else 0.0
+    hi = beta.ppf(1 - a, hits + 1, m - hits) if hits < m else 1.0
+    return float(lo), float(hi)
+
+
+def friedman_exact(ranks, alpha=0.05, n_perm=N_PERMUTATIONS, batch=PERM_BATCH, seed=None,
+                   early_stop=True):
+    """
+    Friedman 검정 정확 p-value (패널 × 시료 순위 행렬)
+    1) 0.5 단위 순위·시료 6개 이하·상태 수 상한 이내 → 정확 분포 ("exact")
+    2) 그 밖 → 몬테카를로 순열 ("monte-carlo"): batch개씩 생성, p̂ = (초과 수 + 1)/(순열 수 + 1)
+       early_stop이면 p̂의 99% Clopper-Pearson 구간이 α를 완전히 벗어나는 즉시 중단
+    returns: friedman_statistic 결과 + {"p_value", "method", "n_perm", "early_stop", "ci"}
+    """
+    r = np.asarray(ranks, dtype=float)
+    out = friedman_statistic(r)
+    observed = _spread(out["rank_sums"])
+    units = _half_units(r)
+    dist = _exact_spread_distribution(units) if units is not None else None
+    if dist is not None:
+        values, probs = dist
+        p = float(min(1.0, probs[values >= observed - _EPS].sum()))
+        out.update({"p_value": p, "method": "exact", "n_perm": 0, "early_stop": False, "ci": (p, p)})
+        return out
+
+    rng = np.random.default_rng(seed)
+    n, k = r.shape
+    batch = max(1, min(int(batch), _BATCH_CELLS // max(n * k, 1)))
+    hits = done = 0
+    stopped = False
+    while done < n_perm:
+        size = min(batch, n_perm - done)
+        hits += int((_permutation_batch(r, size, rng) >= observed - _EPS).sum())
+        done += size
+        if early_stop and done < n_perm:
+            lo, hi = _clopper_pearson(hits, done)
+            if lo > alpha or hi < alpha:
+                stopped = True
+                break
+    out.update({"p_value": (hits + 1) / (done + 1), "method": "monte-carlo", "n_perm": done,
+                "early_stop": stopped, "ci": _clopper_pearson(hits, done)})
+    return out
+
+
+def rank_range_exact(ranks, samples, alpha=0.05):
+    """
+    순위합 범위 검정 정확판 — 귀무가설에서 한 시료의 순위합 분포 (행마다 그 행 값 중 하나를 균등 추출)
+    returns: (DataFrame: 시료, 순위합, 정확 p, 유의 / {"R_lower", "R_upper"}) — 0.5 단위가 아니면 (None, None)
+    """
+    units = _half_units(ranks)
+    if units is None:
+        return None, None
+    lo, pmf = _convolve_rows([_row_pmf(row) for row in units])
+    support = (lo + np.arange(len(pmf))) / 2
+    cdf = np.cumsum(pmf)
+    sf = np.cumsum(pmf[::-1])[::-1]
+    lower_ok = np.flatnonzero(cdf <= alpha / 2 + _EPS)
+    upper_ok = np.flatnonzero(sf <= alpha / 2 + _EPS)
+    R_lower = float(support[lower_ok[-1]]) if len(lower_ok) else None
+    R_upper = float(support[upper_ok[0]]) if len(upper_ok) else None
+    R = units.sum(axis=0)
+    idx = R - lo
+    p = np.minimum(1.0, 2 * np.minimum(cdf[idx], sf[idx]))
+    table = pd.DataFrame({"시료": list(samples), "순위합": R / 2, "정확 p": p,
+                          "유의": np.where(p <= alpha + _EPS, "✓ 특이값", "✗ 범위 내")})
+    return table, {"R_lower": R_lower, "R_upper": R_upper}
+
+
+def rank_difference_exact(ranks, samples, alpha=0.05):
+    """
+    순위합 차이 검정 정확판 — 귀무가설에서 두 시료 순위합 차 D의 분포
+    (행마다 서로 다른 두 위치를 무작위로 골라 값의 차이를 더함)
+    returns: (DataFrame: 시료1, 시료2, |R1-R2|, 정확 p, 유의차 / {"threshold", "homogeneous_groups"})
+             — 0.5 단위가 아니면 (None, None)
+    """
+    units = _half_units(ranks)
+    if units is None:
+        return None, None
+    k = units.shape[1]
+    a, b = np.where(~np.eye(k, dtype=bool))
+    lo, pmf = _convolve_rows([_row_pmf(row[a] - row[b]) for row in units])
+    support = lo + np.arange(len(pmf))
+    # P(|D| ≥ d) — |D| 격자별 꼬리 확률
+    abs_pmf = np.bincount(np.abs(support), weights=pmf)
+    tail = np.cumsum(abs_pmf[::-1])[::-1]
+    sig_d = np.flatnonzero((tail <= alpha + _EPS) & (np.arange(len(tail)) > 0))
+    threshold = sig_d[0] / 2 if len(sig_d) else None
+
+    samples = list(samples)
+    R = units.sum(axis=0)
+    i1, i2 = np.triu_indices(k, 1)
+    diff = np.abs(R[i1] - R[i2])
+    p = np.minimum(1.0, tail[np.minimum(diff, len(tail) - 1)])
+    sig = p <= alpha + _EPS
+    matrix = np.zeros((k, k), dtype=bool)
+    matrix[i1, i2] = sig
+    matrix[i2, i1] = sig
+    table = pd.DataFrame({"시료1": [samples[i] for i in i1], "시료2": [samples[i] for i in i2],
+                          "|R1-R2|": diff / 2, "정확 p": p, "유의차": np.where(sig, "✓", "✗")})
+    return table, {"threshold": threshold,
+                   "homogeneous_groups": compact_letters(samples, R / 2, matrix)}
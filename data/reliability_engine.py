@@ -0,0 +1,203 @@
+"""
+패널 신뢰도 엔진 (반복측정 관능 데이터)
+- panel_cube: 긴 형식 데이터(패널·시료·반복·점수) → groupby 한 번으로 패널 × 시료 × 반복 배열 (빈 칸은 NaN)
+- panel_discrimination: 패널별 일원배치 F·p (f_oneway와 같은 값, 전 패널 한 번에)
+- panel_cv: 패널별 평균 CV(%) / icc: 패널 평균 기반 ICC (기존 탭 공식)
+- panel_repeatability: 반복성 표준편차·반복성 한계(2.77·sr)·합의 상관·Cronbach α(패널 제외 시)
+- analyze_reliability: 위 지표 일괄 계산
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import f as f_dist
+
+SIGNIFICANCE = 0.05
+REPEATABILITY_FACTOR = 2.77          # ISO 5725 반복성 한계 r = 2.77 × sr (≈ 1.96 × √2)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 패널 × 시료 × 반복 배열
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def panel_cube(df, panel="패널", sample="시료", score="점수"):
+    """
+    긴 형식 DataFrame → {"panels", "samples", "cube": (패널 × 시료 × 반복) float 배열}
+    반복 축은 패널·시료 칸 안의 입력 순서 (반복 수가 칸마다 달라도 NaN으로 채움)
+    """
+    data = df[[panel, sample, score]].copy()
+    data[score] = pd.to_numeric(data[score], errors="coerce")
+    data = data[data[score].notna()]
+    p_codes, panels = pd.factorize(data[panel], sort=True)
+    s_codes, samples = pd.factorize(data[sample], sort=True)
+    rep = data.groupby([p_codes, s_codes], sort=False).cumcount().to_numpy()
+    n_rep = int(rep.max()) + 1 if len(rep) else 0
+    cube = np.full((len(panels), len(samples), n_rep), np.nan)
+    cube[p_codes, s_codes, rep] = data[score].to_numpy(dtype=float)
+    return {"panels": list(panels), "samples": list(samples), "cube": cube}
+
+
+def _cell_stats(cube):
+    """칸별 관측 수·평균·제곱편차합 (빈 칸은 n=0, 평균 NaN)"""
+    n = np.sum(~np.isnan(cube), axis=2)
+    total = np.nansum(cube, axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, total / np.maximum(n, 1), np.nan)
+    ss = np.nansum((cube - mean[..., None]) ** 2, axis=2)
+    return n, mean, ss
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 식별력 · 일관성 · ICC
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def panel_discrimination(cube_info, alpha=SIGNIFICANCE):
+    """
+    패널별 일원배치 ANOVA (시료 효과) — 관측 시료가 2개 이상인 패널만
+    columns: 패널, F, p-value, 판정
+    """
+    cube = cube_info["cube"]
+    n, mean, ss = _cell_stats(cube)
+    n_total = n.sum(axis=1)
+    k = (n > 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        grand = np.nansum(mean * n, axis=1) / n_total
+        ssb = np.nansum(n * (mean - grand[:, None]) ** 2, axis=1)
+        ssw = ss.sum(axis=1)
+        dfb, dfw = k - 1, n_total - k
+        msb, msw = ssb / dfb, ssw / dfw
+        F = np.where(msw > 0, msb / msw, np.where(msb > 0, np.inf, np.nan))
+        F = np.where(dfw > 0, F, np.nan)
+        p = np.where(np.isinf(F), 0.0, f_dist.sf(F, dfb, np.maximum(dfw, 1)))
+    p = np.where(np.isnan(F), np.nan, p)
+    keep = k >= 2
+    return pd.DataFrame({
+        "패널": np.asarray(cube_info["panels"], dtype=object)[keep],
+        "F": F[keep],
+        "p-value": p[keep],
+        "판정": np.where(p[keep] < alpha, "우수", "보통"),
+    })
+
+
+def panel_cv(cube_info):
+    """
+    패널별 평균 CV(%) — 평균 > 0이고 반복이 2회 이상인 시료만 평균
+    columns: 패널, 평균 CV(%), 판정
+    """
+    n, mean, ss = _cell_stats(cube_info["cube"])
+    valid = (n > 1) & (mean > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(valid, np.sqrt(ss / np.maximum(n - 1, 1)) / mean * 100, 0.0)
+        avg = cv.sum(axis=1) / valid.sum(axis=1)
+    keep = valid.any(axis=1)
+    avg = avg[keep]
+    return pd.DataFrame({
+        "패널": np.asarray(cube_info["panels"], dtype=object)[keep],
+        "평균 CV(%)": avg,
+        "판정": np.where(avg < 10, "매우 일관", np.where(avg < 20, "일관", "편차 큼")),
+    })
+
+
+def _nan_var(x, axis):
+    """결측 제외 표본분산 (관측 2개 미만은 NaN) — pandas var(ddof=1)와 같은 규칙"""
+    cnt = np.sum(~np.isnan(x), axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m = np.nansum(x, axis=axis) / cnt
+        dev = np.nansum((x - np.expand_dims(m, axis)) ** 2, axis=axis)
+        return np.where(cnt > 1, dev / (cnt - 1), np.nan)
+
+
+def icc(cube_info):
+    """패널 × 시료 평균 행렬 기반 ICC — (MSB − MSW) / (MSB + (k−1)·MSW), 계산 불가면 0"""
+    _, mean, _ = _cell_stats(cube_info["cube"])
+    wide = mean.T                                   # 시료 × 패널
+    n_samples, k_panels = wide.shape
+    if n_samples == 0 or k_panels == 0:
+        return 0
+    with np.errstate(invalid="ignore"):
+        col_means = np.nanmean(wide, axis=0)
+    msb = n_samples * _nan_var(col_means[None, :], axis=1)[0]
+    row_var = _nan_var(wide, axis=1)
+    msw = np.nanmean(row_var) if np.any(~np.isnan(row_var)) else np.nan
+    if msw > 0 and (msb + (k_panels - 1) * msw) > 0:
+        return float((msb - msw) / (msb + (k_panels - 1) * msw))
+    return 0
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 3. 반복성 · 합의도 · Cronbach α
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def cronbach_alpha(matrix):
+    """
+    Cronbach α — matrix: (사례 × 항목), 여기서는 시료 × 패널 평균 (결측 있는 시료 행 제외)
+    returns: (전체 α, 항목별 '제외 시 α' 배열)
+    """
+    X = np.asarray(matrix, dtype=float)
+    X = X[~np.isnan(X).any(axis=1)]
+    k = X.shape[1]
+    if X.shape[0] < 2 or k < 2:
+        return np.nan, np.full(k, np.nan)
+    item_var = X.var(axis=0, ddof=1)
+    total = X.sum(axis=1)
+    total_var = total.var(ddof=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        alpha = k / (k - 1) * (1 - item_var.sum() / total_var)
+        # 항목 하나를 뺀 합의 분산 = Var(T) + Var(x) − 2·Cov(T, x)
+        cov_tx = ((total - total.mean())[:, None] * (X - X.mean(axis=0))).sum(axis=0) / (X.shape[0] - 1)
+        rest_var = total_var + item_var - 2 * cov_tx
+        if k > 2:
+            dropped = (k - 1) / (k - 2) * (1 - (item_var.sum() - item_var) / rest_var)
+        else:
+            dropped = np.full(k, np.nan)
+    return float(alpha), dropped
+
+
+def panel_repeatability(cube_info):
+    """
+    패널별 반복성·합의도
+    columns: 패널, 반복성 SD, 반복성 한계, 합의 상관 r, 제외 시 α
+    - 반복성 SD: 칸 안 편차 제곱합을 합쳐 구한 합동 표준편차 sr
+    - 합의 상관: 패널의 시료 평균 vs 나머지 패널 평균의 피어슨 r
+    """
+    n, mean, ss = _cell_stats(cube_info["cube"])
+    dfw = np.maximum(n - 1, 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sr = np.where(dfw > 0, np.sqrt(ss.sum(axis=1) / dfw), np.nan)
+        # 나머지 패널 평균 (자기 제외)
+        cnt = (~np.isnan(mean)).sum(axis=0)
+        tot = np.nansum(mean, axis=0)
+        others = (tot[None, :] - np.nan_to_num(mean)) / (cnt[None, :] - (~np.isnan(mean)))
+        both = ~np.isnan(mean) & np.isfinite(others)
+        a = np.where(both, mean, 0.0)
+        b = np.where(both, others, 0.0)
+        m = both.sum(axis=1)
+        am = a.sum(axis=1) / m
+        bm = b.sum(axis=1) / m
+        da = np.where(both, a - am[:, None], 0.0)
+        db = np.where(both, b - bm[:, None], 0.0)
+        r = (da * db).sum(axis=1) / np.sqrt((da ** 2).sum(axis=1) * (db ** 2).sum(axis=1))
+    r = np.where(m >= 3, r, np.nan)
+    _, dropped = cronbach_alpha(mean.T)
+    return pd.DataFrame({
+        "패널": cube_info["panels"],
+        "반복성 SD": sr,
+        "반복성 한계": REPEATABILITY_FACTOR * sr,
+        "합의 상관 r": r,
+        "제외 시 α": dropped,
+    })
+
+
+def analyze_reliability(df, alpha=SIGNIFICANCE):
+    """
+    패널 신뢰도 일괄 분석
+    returns: {"cube", "discrim_df", "cv_df", "icc", "repeat_df", "cronbach_alpha"}
+    """
+    cube_info = panel_cube(df)
+    _, mean, _ = _cell_stats(cube_info["cube"])
+    return {
+        "cube": cube_info,
+        "discrim_df": panel_discrimination(cube_info, alpha),
+        "cv_df": panel_cv(cube_info),
+        "icc": icc(cube_info),
+        "repeat_df": panel_repeatability(cube_info),
+        "cronbach_alpha": cronbach_alpha(mean.T)[0],
+    }
@@ -0,0 +1,290 @@
+"""
+세션 분석 결과 저장소 (st.session_state.results / interpretations 대체)
+- 세션마다 임시 디렉터리 하나 — DataFrame은 Parquet(pyarrow, 열 단위 압축, 손실 없는 표만), 그 밖의 큰 값은 pickle 파일
+- 메모리에는 요약(숫자·짧은 문자열·작은 dict/list)과 파일 위치만 유지
+- 조회는 지연 로딩: results['anova']['tukey']처럼 필드를 꺼낼 때만 파일을 읽음 (읽은 값은 보관하지 않음)
+- dict 인터페이스 그대로 (in · get · [] · keys) — 리포트 생성 등 기존 코드 변경 없이 사용
+- 세션 객체가 사라지면 디렉터리 삭제, 프로세스 비정상 종료로 남은 디렉터리는 새 세션이 열릴 때 정리
+  (읽기·쓰기마다 수정 시각 갱신 — 그래도 STALE_HOURS 넘게 쓰지 않아 정리된 값은 ResultExpiredError)
+- 표 왕복은 손실 없음: object 열은 문자열만 든 경우 Parquet 후 object로 복원, 아니면 pickle
+"""
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import weakref
+from collections.abc import Mapping, MutableMapping
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 — Parquet 엔진 (Streamlit 의존성으로 보통 설치됨)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+STORE_ROOT = os.path.join(tempfile.gettempdir(), "sensory_results")
+INLINE_BYTES = 2048                  # 이 크기 이하(pickle 기준)의 값은 메모리에 그대로 보관
+STALE_HOURS = 24                     # 이보다 오래 수정되지 않은 세션 디렉터리는 정리
+PARQUET_COMPRESSION = "zstd"
+
+
+class ResultExpiredError(FileNotFoundError):
+    """세션 디렉터리가 정리되어(STALE_HOURS 동안 사용 없음) 저장된 값을 읽을 수 없음"""
+
+
+class _Ref:
+    """
+    디스크에 내린 값 위치 (kind: parquet / pickle / text)
+    object_columns / object_index: Parquet이 str 자료형으로 읽어 오는 object 열·인덱스 — 읽은 뒤 object로 되돌림
+    """
+    __slots__ = ("kind", "path", "nbytes", "object_columns", "object_index")
+
+    def __init__(self, kind, path, nbytes, object_columns=(), object_index=False):
+        self.kind, self.path, self.nbytes = kind, path, nbytes
+        self.object_columns, self.object_index = list(object_columns), object_index
+
+    def load(self):
+        try:
+            return self._load()
+        except FileNotFoundError as e:
+            raise ResultExpiredError(f"저장된 분석 결과가 만료되었습니다 — 분석을 다시 실행하세요 ({e.filename})") from e
+
+    def _load(self):
+        if self.kind == "parquet":
+            df = pd.read_parquet(self.path)
+            if self.object_columns:
+                df[self.object_columns] = df[self.object_columns].astype(object)
+            if self.object_index:
+                df.index = df.index.astype(object)
+            return df
+        if self.kind == "text":
+            with open(self.path, encoding="utf-8") as f:
+                return f.read()
+        with open(self.path, "rb") as f:
+            return pickle.load(f)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 값 저장 (메모리 유지 / 디스크로 내리기)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def _all_str(values):
+    """object 값이 전부 문자열인지 (결측·숫자 섞임 → Parquet 왕복 시 값이 바뀌므로 pickle)"""
+    return all(isinstance(v, str) for v in values)
+
+
+def _parquet_ok(df):
+    """
+    Parquet 왕복이 손실 없는 표인지 — 문자열 단일 수준 열 이름(중복 없음),
+    object 열·인덱스는 값이 전부 문자열일 때만 (읽은 뒤 object 자료형으로 되돌림)
+    """
+    cols = df.columns
+    if not (HAS_PARQUET and not isinstance(cols, pd.MultiIndex) and cols.is_unique
+            and all(isinstance(c, str) for c in cols)):
+        return False
+    if isinstance(df.index, pd.MultiIndex):
+        return False
+    if df.index.dtype == object and not _all_str(df.index):
+        return False
+    return all(_all_str(df[c]) for c in cols if df[c].dtype == object)
+
+
+def _write_frame(path, df):
+    if _parquet_ok(df):
+        try:
+            df.to_parquet(path + ".parquet", compression=PARQUET_COMPRESSION)
+            return _Ref("parquet", path + ".parquet", os.path.getsize(path + ".parquet"),
+                        [c for c in df.columns if df[c].dtype == object], df.index.dtype == object)
+        except (TypeError, ValueError, NotImplementedError, OSError, pyarrow.ArrowException):
+            pass  # 혼합 타입 열 등 Arrow로 못 바꾸는 표 → pickle
+    return _write_blob(path, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _write_blob(path, blob):
+    with open(path + ".pkl", "wb") as f:
+        f.write(blob)
+    return _Ref("pickle", path + ".pkl", len(blob))
+
+
+def _store_value(path, value):
+    """
+    값 하나 → (메모리에 둘 값 또는 _Ref 또는 StoredResult)
+    DataFrame은 Parquet(왕복 손실이 있으면 pickle), 긴 문자열은 텍스트 파일, 큰 dict(문자열 키)는 하위 레코드로 필드별 저장
+    """
+    if isinstance(value, pd.DataFrame):
+        return _write_frame(path, value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        if len(data) <= INLINE_BYTES:
+            return value
+        with open(path + ".txt", "wb") as f:
+            f.write(data)
+        return _Ref("text", path + ".txt", len(data))
+    try:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return value  # pickle 불가 객체(그림 등)는 메모리에 그대로
+    if len(blob) <= INLINE_BYTES:
+        return value
+    if isinstance(value, dict) and value and all(isinstance(k, str) for k in value):
+        return StoredResult(path, value)
+    return _write_blob(path, blob)
+
+
+def _remove(entry):
+    if isinstance(entry, _Ref):
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    elif isinstance(entry, StoredResult):
+        shutil.rmtree(entry._dir, ignore_errors=True)
+
+
+def _disk_bytes(entry):
+    if isinstance(entry, _Ref):
+        return entry.nbytes
+    if isinstance(entry, StoredResult):
+        return entry.disk_bytes()
+    return 0
+
+
+class StoredResult(Mapping):
+    """
+    분석 결과 dict 하나 (읽기 전용) — 필드별로 메모리 요약 또는 파일 위치를 들고 있다가 조회할 때 로딩
+    """
+
+    def __init__(self, directory, record):
+        os.makedirs(directory, exist_ok=True)
+        self._dir = directory
+        self._fields = {}
+        for i, (name, value) in enumerate(record.items()):
+            self._fields[name] = _store_value(os.path.join(directory, f"f{i:03d}"), value)
+
+    def __getitem__(self, name):
+        entry = self._fields[name]
+        return entry.load() if isinstance(entry, _Ref) else entry
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, name):
+        return name in self._fields
+
+    def summary(self):
+        """메모리에 있는 필드만 (파일 로딩 없음)"""
+        return {k: v for k, v in self._fields.items() if not isinstance(v, (_Ref, StoredResult))}
+
+    def to_dict(self):
+        """모든 필드를 읽어 일반 dict로 (하위 레코드 포함)"""
+        return {k: v.to_dict() if isinstance(v, StoredResult) else v for k, v in self.items()}
+
+    def disk_bytes(self):
+        return sum(_disk_bytes(e) for e in self._fields.values())
+
+    def __repr__(self):
+        return f"StoredResult({list(self._fields)})"
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 세션 저장소
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def sweep_stale(root=STORE_ROOT, max_age_hours=STALE_HOURS):
+    """오래된 세션 디렉터리 삭제 (비정상 종료로 남은 것) → 삭제 수"""
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    for e in entries:
+        try:
+            if e.is_dir() and e.stat().st_mtime < cutoff:
+                shutil.rmtree(e.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+class ResultStore(MutableMapping):
+    """
+    세션 결과 저장소 — store['anova'] = {...} 로 저장하면 표·큰 값은 세션 디렉터리로 내리고 요약만 메모리에
+    dict 값이면 StoredResult(필드별 지연 로딩), 그 밖의 값(AI 해석 문자열 등)은 크기에 따라 메모리 또는 파일
+    """
+
+    def __init__(self, root=STORE_ROOT):
+        self._root = root
+        self._dir = None
+        self._entries = {}
+        self._seq = 0
+        self._finalizer = None
+
+    def _session_dir(self):
+        if self._dir is None:
+            os.makedirs(self._root, exist_ok=True)
+            sweep_stale(self._root)
+            self._dir = tempfile.mkdtemp(prefix="session_", dir=self._root)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+        return self._dir
+
+    def __setitem__(self, key, value):
+        self._seq += 1
+        path = os.path.join(self._session_dir(), f"r{self._seq:04d}")
+        if isinstance(value, StoredResult):
+            value = value.to_dict()
+        entry = StoredResult(path, value) if isinstance(value, dict) else _store_value(path, value)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            _remove(old)
+        self._entries[key] = entry
+        self._touch()
+
+    def __getitem__(self, key):
+        entry = self._entries[key]
+        self._touch()
+        return entry.load() if isinstance(entry, _Ref) else entry
+
+    def _touch(self):
+        """세션 디렉터리 수정 시각 갱신 — 읽기·쓰기 중인 세션은 sweep_stale 대상에서 제외"""
+        if self._dir is not None:
+            try:
+                os.utime(self._dir)
+            except OSError:
+                pass
+
+    def __delitem__(self, key):
+        _remove(self._entries.pop(key))
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        for entry in self._entries.values():
+            _remove(entry)
+        self._entries.clear()
+
+    def summary(self, key):
+        """결과 하나의 메모리 요약 (파일 로딩 없음)"""
+        entry = self._entries[key]
+        if isinstance(entry, StoredResult):
+            return entry.summary()
+        return None if isinstance(entry, _Ref) else entry
+
+    def disk_bytes(self):
+        """세션 디렉터리에 내린 데이터 크기 (bytes)"""
+        return sum(_disk_bytes(e) for e in self._entries.values())
+
+    def __repr__(self):
+        return f"ResultStore({list(self._entries)}, dir={self._dir})"
@@ -0,0 +1,178 @@
+"""
+관능 조사지 가상 응답 생성 엔진 (numpy.random.Generator)
+- gen_*_form: 빈 양식 / 랜덤 응답 조사지 DataFrame — 호출마다 독립 Generator (전역 np.random 상태 불변)
+  패널 × 시료 × 반복 점수 배열을 한 번에 뽑아 배열에서 바로 DataFrame 구성 (수천 명 규모도 즉시)
+- simulate_*: 배열 단위 시뮬레이터 — size로 앞쪽 반복 축(가상 연구 수)을 붙여 검정력 계산에 사용
+- 점수는 반올림 후 척도 범위로 자르기 (기존 조사지 생성 규칙과 같은 분포)
+"""
+import numpy as np
+import pandas as pd
+
+ANOVA_PANEL_SD = 0.3                 # ANOVA 패널 편향 표준편차
+ANOVA_NOISE_SD = 0.7                 # ANOVA 측정 오차 표준편차
+RANKING_NOISE_SD = 1.2               # 순위법 선호 잡음 표준편차
+RELIABILITY_PANEL_SD = 0.5
+SCALING_PANEL_SD = 0.4
+SCALING_NOISE_SD = 0.8
+UNRELIABLE_SHARE = 0.2               # 신뢰도 조사에서 잡음이 큰 패널 비율
+
+
+def _rng(seed):
+    """seed(None·정수·Generator) → 이번 호출 전용 Generator"""
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _size(size):
+    """앞쪽 반복 축 → 튜플 (None·() → 없음, 정수 → (정수,))"""
+    if size is None or size == ():
+        return ()
+    return (int(size),) if np.ndim(size) == 0 else tuple(int(x) for x in size)
+
+
+def panel_ids(n_panels):
+    """P01, P02, … 패널 번호"""
+    return [f"P{p + 1:02d}" for p in range(int(n_panels))]
+
+
+def _likert(scores, low, high):
+    """연속 점수 → 반올림 정수 점수 (척도 범위로 자르기)"""
+    return np.clip(np.round(scores), low, high).astype(int)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 1. 배열 단위 시뮬레이터
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def simulate_scores(rng, n_panels, means, n_reps=1, panel_sd=ANOVA_PANEL_SD, noise_sd=ANOVA_NOISE_SD,
+                    scale=None, size=()):
+    """
+    평점 배열 (*size, 패널, 시료, 반복) — 점수 = 시료 평균 + 패널 편향 + 오차
+    noise_sd: 스칼라 또는 (*size, 패널) 배열 (패널별 잡음), scale 지정 시 1~scale 정수 점수
+    """
+    size = _size(size)
+    means = np.asarray(means, dtype=float)
+    n_panels = int(n_panels)
+    bias = rng.normal(0, panel_sd, size + (n_panels, 1, 1))
+    sd = np.asarray(noise_sd, dtype=float)
+    if sd.ndim:
+        sd = sd[..., None, None]
+    scores = means[:, None] + bias + rng.normal(0, 1, size + (n_panels, len(means), int(n_reps))) * sd
+    return _likert(scores, 1, scale) if scale else scores
+
+
+def simulate_ranks(rng, n_panels, preferences, noise_sd=RANKING_NOISE_SD, size=()):
+    """
+    순위 배열 (*size, 패널, 시료) — 선호도 + 잡음이 클수록 1위 (동점 없음, 먼저 나온 시료 우선)
+    """
+    size = _size(size)
+    pref = np.asarray(preferences, dtype=float)
+    noisy = pref + rng.normal(0, noise_sd, size + (int(n_panels), len(pref)))
+    order = np.argsort(-noisy, axis=-1, kind="stable")
+    ranks = np.empty(order.shape, dtype=int)
+    np.put_along_axis(ranks, order, np.arange(1, len(pref) + 1), axis=-1)
+    return ranks
+
+
+def simulate_correct(rng, n_panels, p_correct, size=()):
+    """차이식별 정답 수 (*size,) — 이항분포"""
+    return rng.binomial(int(n_panels), p_correct, size=_size(size) or None)
+
+
+def separated_means(rng, n_samples, low, high, min_gap, gap_range=None, lo_clip=None, hi_clip=None):
+    """
+    시료 평균: U(low, high) 정렬 후 인접 간격이 min_gap보다 작으면 벌림
+    gap_range=(a, b)면 U(a, b)만큼, 없으면 정확히 1.0 — 잘라낸 뒤 무작위 순서로 섞을지는 호출 쪽에서 결정
+    """
+    base = np.sort(rng.uniform(low, high, n_samples))
+    for i in range(1, len(base)):
+        if base[i] - base[i - 1] < min_gap:
+            base[i] = base[i - 1] + (rng.uniform(*gap_range) if gap_range else 1.0)
+    if lo_clip is not None or hi_clip is not None:
+        base = np.clip(base, lo_clip, hi_clip)
+    return base
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 2. 조사지 생성
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+def gen_anova_form(n_panels, samples, scale=9, random_fill=False, seed=None):
+    """ANOVA Long format (패널 × 시료)
+    scale: 9 또는 7 (척도 점수)
+    """
+    samples = list(samples)
+    n, k = int(n_panels), len(samples)
+    data = {"패널": np.repeat(panel_ids(n), k), "시료": np.tile(np.array(samples, dtype=object), n)}
+    if random_fill:
+        rng = _rng(seed)
+        mid = (scale + 1) / 2
+        means = separated_means(rng, k, mid - 1, mid + 1.5, 0.8, (0.8, 1.5), 2, scale - 0.5)
+        rng.shuffle(means)
+        data["점수"] = simulate_scores(rng, n, means, scale=scale).reshape(-1)
+    else:
+        data["점수"] = [""] * (n * k)
+    return pd.DataFrame(data)
+
+
+def gen_discrimination_form(n_panels, test_type, random_fill=False, p_true=0.55, seed=None):
+    """차이식별 조사지 (패널, 정답여부)"""
+    n = int(n_panels)
+    p0 = 1 / 3 if "삼점" in test_type else 1 / 2
+    actual_p = p_true if p_true > p0 else p0
+    data = {"패널": panel_ids(n)}
+    if random_fill:
+        data["정답여부"] = (_rng(seed).random(n) < actual_p).astype(int)
+    else:
+        data["정답여부"] = [""] * n
+    return pd.DataFrame(data)
+
+
+def gen_ranking_form(n_panels, samples, random_fill=False, seed=None):
+    """순위법 조사지 (패널 × 시료 순위, 1 = 가장 선호)"""
+    samples = list(samples)
+    n = int(n_panels)
+    frame = pd.DataFrame({"패널": panel_ids(n)})
+    if random_fill:
+        rng = _rng(seed)
+        ranks = simulate_ranks(rng, n, rng.uniform(3, 8, len(samples)))
+        values = pd.DataFrame(ranks, columns=samples)
+    else:
+        values = pd.DataFrame("", index=range(n), columns=samples)
+    return pd.concat([frame, values], axis=1)
+
+
+def gen_reliability_form(n_panels, samples, n_reps, random_fill=False, seed=None):
+    """패널 신뢰도 조사지 (패널 × 시료 × 반복, 9점) — 약 20%는 잡음이 큰 패널"""
+    samples = list(samples)
+    n, k, r = int(n_panels), len(samples), int(n_reps)
+    data = {"패널": np.repeat(panel_ids(n), k * r),
+            "시료": np.tile(np.repeat(np.array(samples, dtype=object), r), n),
+            "반복": np.tile(np.arange(1, r + 1), n * k)}
+    if random_fill:
+        rng = _rng(seed)
+        means = separated_means(rng, k, 5, 8, 0.8)
+        noisy = rng.random(n) >= 1 - UNRELIABLE_SHARE
+        noise = np.where(noisy, rng.uniform(1.0, 1.8, n), rng.uniform(0.3, 0.7, n))
+        data["점수"] = simulate_scores(rng, n, means, r, RELIABILITY_PANEL_SD, noise, scale=9).reshape(-1)
+    else:
+        data["점수"] = [""] * (n * k * r)
+    return pd.DataFrame(data)
+
+
+def gen_scaling_form(n_panels, product_name="시료A", random_fill=False, pass_scenario=True, seed=None,
+                     attributes=()):
+    """평점법 (Scaling) 조사지 - 패널 × 평가 항목 (리커트 7점)
+    pass_scenario: True=합격 시나리오 생성, False=불합격
+    """
+    attributes = list(attributes)
+    n = int(n_panels)
+    frame = pd.DataFrame({"패널": panel_ids(n), "시료": [product_name] * n})
+    if random_fill:
+        rng = _rng(seed)
+        low, high = (5.2, 6.3) if pass_scenario else (3.5, 4.8)
+        base = rng.uniform(low, high, len(attributes))
+        scores = simulate_scores(rng, n, base, 1, SCALING_PANEL_SD, SCALING_NOISE_SD, scale=7)[..., 0]
+        values = pd.DataFrame(scores, columns=attributes)
+    else:
+        values = pd.DataFrame("", index=range(n), columns=attributes)
+    return pd.concat([frame, values], axis=1)
@@ -8,6 +8,7 @@ import pandas as pd
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.common import *
+from data.formula_engine import rank_similarity
 st.markdown("# ⚗️ 배합비 설계 & 표준 비교")
 st.markdown("배합비 100% 기준 설계 · 표준배합비 대비 비교분석 · 원가 연동")
 st.markdown("---")
@@ -211,6 +212,40 @@ with tab_compare:
             csv_cmp = cmp_df.to_csv(index=False).encode("utf-8-sig")
             st.download_button("📥 비교표 CSV", csv_cmp, "표준비교분석.csv", "text/csv")
 
+        # ━━━ 전체 표준 유사도 순위 ━━━
+        st.markdown("---")
+        st.markdown("#### 🏆 전체 표준배합비 유사도 순위")
+        std_frames = {k: pd.DataFrame(v["ingredients"]) for k, v in STANDARD_FORMULATIONS.items()}
+        rank_by = st.radio("정렬 기준", ["코사인 유사도", "L1 거리"], horizontal=True, key="cmp_rank_by")
+        by = "cosine" if rank_by == "코사인 유사도" else "l1"
+        rank_df = rank_similarity({"내 배합": df_mine}, std_frames, by=by)
+        st.dataframe(rank_df.drop(columns=["배합"]).style.format({
+            "코사인유사도": "{:.4f}", "L1거리(%p)": "{:.3f}",
+        }), use_container_width=True, hide_index=True)
+
+        with st.expander("📚 저장된 배합비 전체 × 표준배합비 비교"):
+            saved = load_saved_formulas()
+            library = {f"{s['name']} ({s.get('student', '?')}, {s.get('timestamp', '')[:19].replace('T', ' ')})":
+                       pd.DataFrame(s.get("ingredients", [])) for s in saved}
+            if not library:
+                st.caption("저장된 배합비 없음")
+            else:
+                lib_rank = rank_similarity(library, std_frames, by=by)
+                best = lib_rank[lib_rank["순위"] == 1].drop(columns=["순위"])
+                st.markdown(f"**배합별 가장 가까운 표준** ({len(library)}건)")
+                st.dataframe(best.style.format({"코사인유사도": "{:.4f}", "L1거리(%p)": "{:.3f}"}),
+                             use_container_width=True, hide_index=True)
+                heat = lib_rank.pivot(index="배합", columns="표준",
+                                      values="코사인유사도" if by == "cosine" else "L1거리(%p)")
+                heat = heat.reindex(list(library))
+                fig_h = px.imshow(heat, text_auto=".2f", aspect="auto",
+                                  color_continuous_scale="Blues" if by == "cosine" else "Reds_r",
+                                  title="저장 배합 × 표준 " + rank_by)
+                fig_h.update_layout(height=160 + 28 * len(heat))
+                st.plotly_chart(fig_h, use_container_width=True)
+                st.download_button("📥 유사도 순위 CSV", lib_rank.to_csv(index=False).encode("utf-8-sig"),
+                                   "표준유사도순위.csv", "text/csv")
+
 # ━━━━━ TAB 3: 원가 연동 ━━━━━
 with tab_cost:
     st.markdown("### 💰 배합비 기반 원가 계산")
@@ -9,6 +9,12 @@ import io
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.common import *
+from data.beverage_engine import read_beverage_db, ingredient_index, spec_targets, find_spec, optimize_recipe
+from data.formula_store import query_formulas, count_formulas, load_ingredients
+from data.formula_engine import FAST_CSV_MAX_CHARS, scan_formula_csv
+
+SAVED_PAGE_SIZE = 10
+
 st.markdown("# ✏️ 배합비 작성 연습")
 st.markdown("CSV 작성 → 실시간 검증 → 표준배합비 비교 → 원가 계산 → 저장")
 st.markdown("---")
@@ -35,12 +41,18 @@ with st.sidebar:
 
     st.markdown("---")
     st.markdown("### 💾 저장된 배합비")
-    saved = load_saved_formulas()
-    if saved:
-        for s in saved[:10]:
+    only_mine = st.checkbox("내 배합비만", value=bool(student), disabled=not student, key="saved_only_mine")
+    saved_query = st.text_input("제품명 검색 (앞부분 일치)", key="saved_query", placeholder="예: 레몬")
+    saved_filter = {"student": student if (only_mine and student) else None, "name": saved_query.strip() or None}
+    n_saved = count_formulas(**saved_filter)
+    if n_saved:
+        n_pages = (n_saved - 1) // SAVED_PAGE_SIZE + 1
+        page = st.number_input(f"페이지 (총 {n_saved}건)", 1, n_pages, 1, key="saved_page") if n_pages > 1 else 1
+        # 요약만 조회 — 원료 목록은 불러오기 버튼을 누를 때 로딩
+        for s in query_formulas(**saved_filter, limit=SAVED_PAGE_SIZE, offset=(page - 1) * SAVED_PAGE_SIZE):
             label = f"{s['name']} ({s.get('student','?')}) {s['timestamp'][:10]}"
             if st.button(f"📂 {label}", key=f"load_{s['filename']}", use_container_width=True):
-                df_s = pd.DataFrame(s["ingredients"])
+                df_s = pd.DataFrame(load_ingredients(s["id"]))
                 st.session_state.csv_input = df_s.to_csv(index=False)
                 st.session_state.formula_name = s["name"]
                 st.rerun()
@@ -130,7 +142,9 @@ with right:
             try:
                 if pH_val: meta["pH"] = float(pH_val)
             except: pass
-            result = validate_formula(df_parsed, meta)
+            # 큰 입력은 parse_csv_formula가 read_csv로 읽었으므로 다시 스캔하지 않음 (작은 입력은 스캔 캐시 적중)
+            scan = scan_formula_csv(csv_text) if len(csv_text) <= FAST_CSV_MAX_CHARS else None
+            result = validate_formula(df_parsed, meta, scan=scan)
             if result["passed"]:
                 st.success("✅ 검증 통과!")
             else:
@@ -146,8 +160,8 @@ with right:
                 st.warning("⚠️ 메인 페이지에서 이름을 먼저 입력하세요")
             else:
                 meta = {"brix": brix, "pH": pH_val, "volume": volume, "shelfLife": shelf}
-                filepath = save_formula(formula_name, df_parsed, meta, student)
-                st.success(f"✅ 저장 완료! ({os.path.basename(filepath)})")
+                saved_key = save_formula(formula_name, df_parsed, meta, student)
+                st.success(f"✅ 저장 완료! ({saved_key})")
 
         # 다운로드
         st.markdown("---")
@@ -220,6 +234,72 @@ with right:
         ```
         """)
 
+# ━━━ 목표 규격 최적화 ━━━
+@st.cache_resource
+def _beverage_index():
+    db = read_beverage_db()
+    return db, ingredient_index(db.get("ingredients", []))
+
+
+st.markdown("---")
+with st.expander("🎯 목표 규격 최적화 (최소 원가 배합 탐색)", expanded=False):
+    bev_db, bev_index = _beverage_index()
+    spec_types = [s["type"] for s in bev_db.get("beverage_specs", [])]
+    if not spec_types:
+        st.info("beverage_db.json이 없어 최적화를 사용할 수 없습니다")
+    else:
+        oc1, oc2 = st.columns([1, 2])
+        spec_type = oc1.selectbox("음료 유형 (규격)", spec_types, key="opt_spec")
+        targets = spec_targets(find_spec(bev_db, spec_type))
+        oc2.caption("목표 범위: " + " / ".join(
+            f"{k} {lo:g}~{hi:g}" for k, (lo, hi) in targets.items()) if targets else "수치 규격 없음")
+
+        default_names = (list(df_parsed["원료명"]) if df_parsed is not None and "원료명" in df_parsed.columns
+                         else ["정제수", "백설탕", "구연산"])
+        opt_df = st.data_editor(
+            pd.DataFrame({"원료명": default_names, "하한(%)": 0.0, "상한(%)": 100.0}),
+            num_rows="dynamic", use_container_width=True, hide_index=True, key="opt_shortlist",
+        )
+        hard = st.checkbox("규격 범위를 반드시 만족", value=True, key="opt_hard")
+
+        if st.button("🎯 최적 배합 계산", type="primary", key="opt_run"):
+            # data_editor의 빈 칸은 NaN/None — 원료명이 빈 행은 건너뛰고 빈 한계는 기본값(0 / 100)
+            shortlist = {}
+            for _, r in opt_df.iterrows():
+                name = str(r["원료명"]).strip() if pd.notna(r["원료명"]) else ""
+                if not name:
+                    continue
+                lo = float(r["하한(%)"]) if pd.notna(r["하한(%)"]) else 0.0
+                hi = float(r["상한(%)"]) if pd.notna(r["상한(%)"]) else 100.0
+                shortlist[name] = (lo, hi)
+            vol_ml = int(volume) if volume.isdigit() else 500
+            opt, opt_msg = optimize_recipe(bev_index, shortlist, targets, cost_table=INGREDIENT_COSTS,
+                                           volume_ml=vol_ml, hard_ranges=hard)
+            st.session_state.opt_result = (opt, opt_msg)
+
+        if "opt_result" in st.session_state:
+            opt, opt_msg = st.session_state.opt_result
+            if opt is None:
+                st.error(f"❌ {opt_msg}")
+            else:
+                st.success(f"✅ {opt_msg}")
+                pts = opt["points"]
+                fig = px.line(pts, x="편차", y="원가(원)", markers=True,
+                              hover_data=["Brix", "pH", "산도(%)"], title="원가 vs 규격 중앙값 편차 (파레토)")
+                fig.update_layout(height=320)
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(pts, use_container_width=True, hide_index=True)
+
+                pick = st.selectbox("배합표로 가져올 해", range(len(pts)), key="opt_pick",
+                                    format_func=lambda i: f"#{i} — {pts.loc[i, '원가(원)']:.1f}원 / 편차 {pts.loc[i, '편차']:.3f}")
+                if st.button("📋 CSV 입력란으로 가져오기", key="opt_apply"):
+                    row = pts.loc[pick]
+                    df_opt = pd.DataFrame({"원료명": opt["ingredients"],
+                                           "비율(%)": [row[n] for n in opt["ingredients"]]})
+                    st.session_state.csv_input = df_opt[df_opt["비율(%)"] > 0].to_csv(index=False)
+                    st.session_state.pop("csv_editor", None)
+                    st.rerun()
+
 # ━━━ 챗봇 ━━━
 render_chatbot("배합연습",
     page_context="CSV 배합비 작성 연습 + 검증 + 표준비교 + 저장 페이지.",
@@ -8,11 +8,12 @@ import pandas as pd
 import sys, os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data.common import *
+from data.cost_engine import formula_cost_matrix, price_of, simulate_cost, cost_tornado, PRICE_DISTRIBUTIONS
 st.markdown("# 💰 원재료 원가 분석")
 st.markdown("배합비 기반 원가 자동 계산 · 원재료 단가표 · 원가 구성 시각화")
 st.markdown("---")
 
-tab1, tab2, tab3 = st.tabs(["📊 배합비 원가 계산", "📋 원재료 단가표", "🔧 단가 수정"])
+tab1, tab2, tab3, tab4 = st.tabs(["📊 배합비 원가 계산", "📋 원재료 단가표", "🔧 단가 수정", "📦 배치 시나리오"])
 
 # ━━━ TAB 1: 배합비 원가 계산 ━━━
 with tab1:
@@ -96,6 +97,57 @@ with tab1:
             if len(unmatched) > 0:
                 st.warning(f"⚠️ 단가DB에 없는 원료 {len(unmatched)}건: {', '.join(unmatched['원료명'].tolist())} → 0원 처리됨. [🔧 단가 수정] 탭에서 추가 가능")
 
+            # ━━━ 단가 변동 리스크 ━━━
+            st.markdown("---")
+            st.markdown("### 🎲 원재료 단가 변동 리스크")
+            r1, r2, r3, r4 = st.columns(4)
+            vol_pct = r1.slider("단가 변동폭 (±%)", 0, 100, 15, 5)
+            dist = r2.selectbox("분포", PRICE_DISTRIBUTIONS)
+            n_sim = r3.select_slider("시나리오 수", [1000, 5000, 10000, 50000], value=10000)
+            seed = r4.number_input("난수 시드", 0, 99999, 42)
+            hist_file = st.file_uploader("단가 이력 CSV (선택: 원료명, 단가 — 해당 원료는 이력에서 추출)",
+                                         type=["csv"], key="price_hist")
+            history = {}
+            if hist_file is not None:
+                try:
+                    hist_df = pd.read_csv(hist_file, encoding="utf-8-sig")
+                    for hname, grp in hist_df.groupby(hist_df.columns[0]):
+                        _, hkey = price_of(hname)
+                        if hkey:
+                            history.setdefault(hkey, []).extend(
+                                pd.to_numeric(grp.iloc[:, 1], errors="coerce").dropna().tolist())
+                    st.caption(f"이력 반영 원료: {', '.join(history) or '없음'}")
+                except Exception as e:
+                    st.error(f"이력 CSV 오류: {e}")
+
+            sim = simulate_cost(cost_df, n_sim, vol_pct / 100, dist, history=history, seed=int(seed))
+            pct = sim["percentiles"]
+            k1, k2, k3, k4 = st.columns(4)
+            k1.metric("기준 원가", f"{sim['base']:,.1f}원")
+            k2.metric("중앙값 (P50)", f"{pct[50]:,.1f}원", f"{pct[50] - sim['base']:+,.1f}원")
+            k3.metric("P5 ~ P95", f"{pct[5]:,.1f} ~ {pct[95]:,.1f}원")
+            k4.metric(f"{batch:,}병 P95 원가", f"{pct[95] * batch:,.0f}원",
+                      f"{(pct[95] - sim['base']) * batch:+,.0f}원", delta_color="inverse")
+
+            h1, h2 = st.columns(2)
+            with h1:
+                fig_h = px.histogram(x=sim["costs"], nbins=60, title="1병 원가 분포 (몬테카를로)",
+                                     labels={"x": "1병 원재료비 (원)"}, color_discrete_sequence=[COLORS[0]])
+                for p, dash in [(5, "dot"), (50, "dash"), (95, "dot")]:
+                    fig_h.add_vline(x=pct[p], line_dash=dash, line_color="gray", annotation_text=f"P{p}")
+                fig_h.update_layout(height=380, showlegend=False, yaxis_title="시나리오 수")
+                st.plotly_chart(fig_h, use_container_width=True)
+            with h2:
+                tor = cost_tornado(cost_df, vol_pct / 100).head(10).iloc[::-1]
+                fig_t = go.Figure()
+                fig_t.add_trace(go.Bar(y=tor["원료명"], x=tor["하한원가"] - sim["base"], orientation="h",
+                                       name=f"단가 -{vol_pct}%", marker_color=COLORS[2]))
+                fig_t.add_trace(go.Bar(y=tor["원료명"], x=tor["상한원가"] - sim["base"], orientation="h",
+                                       name=f"단가 +{vol_pct}%", marker_color=COLORS[3]))
+                fig_t.update_layout(barmode="overlay", height=380, title="토네이도 민감도 (원가 변화, 원)",
+                                    xaxis_title="기준 대비 원가 변화 (원)")
+                st.plotly_chart(fig_t, use_container_width=True)
+
             # 다운로드
             st.markdown("---")
             csv_dl = display_df.to_csv(index=False).encode("utf-8-sig")
@@ -147,6 +199,62 @@ with tab3:
         for k, v in st.session_state.custom_costs.items():
             st.write(f"- {k}: {v:,}원/kg")
 
+# ━━━ TAB 4: 배치 시나리오 (여러 배합 × 여러 용량) ━━━
+with tab4:
+    st.markdown("### 📦 배합 × 충전용량 원가 시나리오")
+    st.caption("여러 배합비와 충전 용량 조합의 1개당 원재료비를 한 번에 계산합니다")
+
+    scenario_src = {f"🏷️ {k}": pd.DataFrame(v["ingredients"]) for k, v in STANDARD_FORMULATIONS.items()}
+    for k, v in SAMPLE_FORMULATIONS.items():
+        df_smp, _ = parse_csv_formula(v)
+        if df_smp is not None and "비율(%)" in df_smp.columns:
+            scenario_src[f"📋 {k}"] = df_smp
+    cur_csv, _ = get_current_formula_csv()
+    if cur_csv.strip():
+        df_cur, _ = parse_csv_formula(cur_csv)
+        if df_cur is not None and "비율(%)" in df_cur.columns:
+            scenario_src["📎 현재 배합비"] = df_cur
+
+    picked = st.multiselect("배합비 선택", list(scenario_src), default=list(scenario_src)[:3])
+    sc1, sc2 = st.columns(2)
+    vol_text = sc1.text_input("충전 용량 (ml, 쉼표 구분)", "250, 350, 500, 1000, 1500")
+    batch_qty = sc2.number_input("배치 수량 (개)", 1, 10000000, 10000, 1000, key="scn_batch")
+
+    volumes = []
+    for v in vol_text.split(","):
+        try:
+            if float(v) > 0:
+                volumes.append(float(v))
+        except ValueError:
+            pass
+
+    if picked and volumes:
+        unit_mat, scn_summary = formula_cost_matrix({k: scenario_src[k] for k in picked}, volumes)
+        unit_mat.columns = [f"{v:g}ml" for v in volumes]
+
+        st.markdown("#### 1개당 원재료비 (원)")
+        st.dataframe(unit_mat.style.format("{:,.1f}"), use_container_width=True)
+
+        st.markdown(f"#### {batch_qty:,}개 배치 원재료비 (원)")
+        batch_mat = unit_mat * batch_qty
+        st.dataframe(batch_mat.style.format("{:,.0f}"), use_container_width=True)
+
+        fig = px.imshow(unit_mat, text_auto=".0f", aspect="auto", color_continuous_scale="YlOrRd",
+                        labels={"x": "충전 용량", "y": "배합", "color": "원/개"},
+                        title="배합 × 용량 1개당 원재료비")
+        fig.update_layout(height=120 + 60 * len(unit_mat))
+        st.plotly_chart(fig, use_container_width=True)
+
+        missing = scn_summary[scn_summary["미매칭원료"] != ""]
+        if len(missing) > 0:
+            st.warning("⚠️ 단가DB에 없는 원료 (0원 처리): " +
+                       " / ".join(f"{k}: {v}" for k, v in missing["미매칭원료"].items()))
+
+        st.download_button("📥 시나리오 CSV", batch_mat.to_csv().encode("utf-8-sig"),
+                           "원가시나리오.csv", "text/csv")
+    else:
+        st.info("배합비와 충전 용량을 하나 이상 입력하세요")
+
 # ━━━ 챗봇 ━━━
 render_chatbot("원가분석",
     page_context="원재료 단가 DB(36종) + 배합비 기반 원가 자동 계산 페이지.",
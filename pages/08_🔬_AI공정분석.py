@@ -25,20 +25,23 @@ with st.sidebar:
         accept_multiple_files=True, key="process_pdfs"
     )
 
+    page_range = st.text_input("페이지 범위 (선택)", placeholder="예: 1-20, 35  (비우면 전체)",
+                               key="process_pdf_pages")
+
     if uploaded_files:
         for uf in uploaded_files:
             if uf.name not in st.session_state.pdf_texts:
-                with st.spinner(f"📄 {uf.name} 텍스트 추출 중..."):
-                    result = extract_pdf_text(uf)
-                    if isinstance(result, tuple):
-                        text, msg = result
-                    else:
-                        text, msg = result, ""
-                    if text:
-                        st.session_state.pdf_texts[uf.name] = text
-                        st.success(f"✅ {uf.name} ({len(text):,}자) — {msg}")
-                    else:
-                        st.error(f"❌ {uf.name}: {msg}")
+                prog = st.progress(0.0, text=f"📄 {uf.name} 텍스트 추출 중...")
+                text, msg = extract_pdf_text(
+                    uf, pages=page_range or None,
+                    on_page=lambda p: prog.progress(p["n"] / p["total"], text=f"📄 {uf.name} — {p['n']}/{p['total']}페이지"),
+                )
+                prog.empty()
+                if text:
+                    st.session_state.pdf_texts[uf.name] = text
+                    st.success(f"✅ {uf.name} ({len(text):,}자) — {msg}")
+                else:
+                    st.error(f"❌ {uf.name}: {msg}")
 
     if st.session_state.pdf_texts:
         st.markdown("---")
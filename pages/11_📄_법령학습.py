@@ -35,9 +35,16 @@ for doc_key, schema in REGULATION_SCHEMA.items():
                 help=f"{schema['법령명']} 원문 PDF를 업로드하세요"
             )
 
+            page_range = st.text_input("페이지 범위 (선택)", key=f"pages_{doc_key}",
+                                       placeholder="예: 1-120  (비우면 전체)")
+
             if uploaded:
-                with st.spinner(f"📄 {uploaded.name} 처리 중..."):
-                    text, msg = extract_pdf(uploaded)
+                prog = st.progress(0.0, text=f"📄 {uploaded.name} 처리 중...")
+                text, msg = extract_pdf(
+                    uploaded, pages=page_range or None,
+                    on_page=lambda p: prog.progress(p["n"] / p["total"], text=f"📄 {uploaded.name} — {p['n']}/{p['total']}페이지"),
+                )
+                prog.empty()
 
                 if text:
                     n_chunks = save_knowledge(doc_key, text, uploaded.name)
@@ -16,6 +16,7 @@ input_method = st.radio("입력 방법", [
     "✍️ 직접 입력/붙여넣기",
     "📄 CSV 업로드",
     "📎 샘플 데이터",
+    "📦 일괄 판정 (다수 SKU)",
 ], horizontal=True)
 
 label_data = {}
@@ -124,6 +125,77 @@ elif input_method == "📎 샘플 데이터":
                 use_container_width=True, hide_index=True)
     submitted = st.button("🔍 적부 판정 실행", type="primary", use_container_width=True)
 
+# ━━━ 방법 4: 일괄 판정 ━━━
+elif input_method == "📦 일괄 판정 (다수 SKU)":
+    st.markdown("### 📦 다수 SKU 일괄 판정")
+    st.caption("한 행에 한 SKU — 컬럼은 CSV 양식의 항목명과 같게 작성 (SKU·항목·내용 3열 세로형도 가능)")
+    submitted = False
+
+    batch_template = pd.DataFrame(
+        [{"SKU": f"SKU-{i+1:03d}", **lbl} for i, lbl in enumerate(SAMPLE_LABELS.values())],
+        columns=["SKU"] + LABEL_FIELDS,
+    )
+    st.download_button(
+        "📥 일괄 판정 CSV 양식 다운로드",
+        batch_template.to_csv(index=False).encode("utf-8-sig"),
+        "표시사항_일괄판정_양식.csv", "text/csv",
+    )
+
+    uploaded_batch = st.file_uploader("CSV / Excel 업로드", type=["csv", "xlsx"], key="batch_upload")
+    if uploaded_batch:
+        try:
+            if uploaded_batch.name.lower().endswith(".xlsx"):
+                batch_src = pd.read_excel(uploaded_batch, dtype=str).fillna("")
+            else:
+                batch_src = uploaded_batch
+            if st.button("🔍 일괄 판정 실행", type="primary", use_container_width=True):
+                with st.spinner("일괄 판정 중..."):
+                    timings = {}
+                    st.session_state.batch_results = check_compliance_batch(batch_src, timings=timings)
+                    st.session_state.batch_timings = rule_timing_report(timings)
+        except Exception as e:
+            st.error(f"파일 파싱 오류: {e}")
+
+    batch_results = st.session_state.get("batch_results")
+    if batch_results is not None and len(batch_results):
+        sku_summary = get_summary(batch_results)
+
+        st.markdown("---")
+        st.markdown("## 📊 일괄 판정 결과")
+        mc1, mc2, mc3, mc4 = st.columns(4)
+        mc1.metric("SKU 수", f"{len(sku_summary)}개")
+        mc2.metric("✅ 적합", f"{(sku_summary['overall'] == '✅ 적합').sum()}개")
+        mc3.metric("⚠️ 조건부", f"{(sku_summary['overall'] == '⚠️ 조건부').sum()}개")
+        mc4.metric("❌ 부적합", f"{(sku_summary['overall'] == '❌ 부적합').sum()}개")
+
+        st.markdown("**SKU별 요약**")
+        st.dataframe(
+            sku_summary.rename(columns={"total": "검토항목", "ok": "적합", "warn": "주의",
+                                        "fail": "부적합", "unknown": "미확인",
+                                        "rate": "적합률(%)", "overall": "종합 판정"}),
+            use_container_width=True, hide_index=True,
+            column_config={"적합률(%)": st.column_config.NumberColumn(format="%.0f")},
+        )
+
+        with st.expander("📋 항목별 상세 결과 (긴 형식)", expanded=False):
+            only_issues = st.checkbox("부적합·주의·미확인만 보기", value=True, key="batch_only_issues")
+            view = batch_results[batch_results["판정"] != "적합"] if only_issues else batch_results
+            st.dataframe(view, use_container_width=True, hide_index=True)
+
+        if st.session_state.get("batch_timings") is not None:
+            with st.expander("⏱️ 규칙별 실행시간", expanded=False):
+                st.dataframe(st.session_state.batch_timings, use_container_width=True, hide_index=True,
+                             column_config={"총시간(ms)": st.column_config.NumberColumn(format="%.2f"),
+                                            "평균(µs)": st.column_config.NumberColumn(format="%.1f")})
+
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("📥 상세 결과 CSV", batch_results.to_csv(index=False).encode("utf-8-sig"),
+                               "일괄판정_상세.csv", "text/csv", use_container_width=True)
+        with c2:
+            st.download_button("📥 SKU 요약 CSV", sku_summary.to_csv(index=False).encode("utf-8-sig"),
+                               "일괄판정_요약.csv", "text/csv", use_container_width=True)
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 적부 판정 결과
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -132,7 +204,7 @@ if submitted and label_data:
     st.session_state.last_label = label_data
     st.session_state.last_results = check_compliance(label_data)
 
-if st.session_state.get("last_results"):
+if input_method != "📦 일괄 판정 (다수 SKU)" and st.session_state.get("last_results"):
     results = st.session_state.last_results
     summary = get_summary(results)
     label_data = st.session_state.get("last_label", {})
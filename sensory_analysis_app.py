@@ -20,14 +20,27 @@ import random
 import datetime
 import requests
 from scipy import stats
-from scipy.stats import f_oneway, binomtest, friedmanchisquare, wilcoxon, binom, chi2
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-from statsmodels.formula.api import ols
-from statsmodels.stats.anova import anova_lm
+from scipy.stats import friedmanchisquare, wilcoxon, binom, chi2
 import matplotlib.pyplot as plt
 import matplotlib
 import plotly.express as px
 import plotly.graph_objects as go
+from data.beverage_engine import (build_ingredient_index, ingredient_index, match_ingredient,
+                                  build_market_index, market_index, nearest_market_products)
+from data.ice_cream_engine import build_ice_cream_index, ice_cream_index, match_ice_cream_ingredient, ice_cream_sweep
+from data.discrimination_engine import (critical_count, critical_table, discrimination_pvalue,
+                                        sample_size, power_curve)
+from data.reliability_engine import analyze_reliability
+from data.anova_engine import anova_table as run_anova
+from data.batch_engine import attribute_columns, analyze_attributes, sample_means
+from data.posthoc_engine import tukey_hsd, compact_letters, letters_table
+from data.ranking_engine import friedman_exact, rank_range_exact, rank_difference_exact
+from data.bootstrap_engine import N_BOOT, bootstrap_stat, cluster_means, rank_sum_ci, jar_deviation_ci
+from data.simulation_engine import (gen_anova_form, gen_discrimination_form, gen_ranking_form,
+                                    gen_reliability_form, gen_scaling_form)
+from data.power_engine import (CLOSED_FORM as POWER_CLOSED_FORM, SCALING_THRESHOLD, power_grid,
+                               required_panels, effect_error as power_effect_error)
+from data.result_store import ResultStore
 
 # ============================================================================
 # 초기 설정
@@ -49,9 +62,9 @@ st.set_page_config(
 # ============================================================================
 
 for key, default in [
-    ('results', {}), ('api_key', ''),
+    ('results', ResultStore()), ('api_key', ''),
     ('claude_model', 'claude-sonnet-4-5'),
-    ('interpretations', {}),
+    ('interpretations', ResultStore()),
     ('teaching_mode', False),
     ('ai_sessions', []),  # AI 평가 세션 리스트 (최대 5개)
     ('current_recipe_parse', None),
@@ -1089,105 +1102,11 @@ AI 도구를 올바로 활용하려면 "무엇이 가능하고, 무엇이 불가
 
 
 # ============================================================================
-# 조사지 생성 함수 (기존 유지)
+# 조사지 생성 함수
 # ============================================================================
 
-def gen_anova_form(n_panels, samples, scale=9, random_fill=False, seed=None):
-    """ANOVA Long format (패널 × 시료)
-    scale: 9 또는 7 (척도 점수)
-    """
-    if seed is not None:
-        np.random.seed(seed)
-    rows = []
-    if random_fill:
-        mid = (scale + 1) / 2
-        base_means = np.random.uniform(mid - 1, mid + 1.5, len(samples))
-        base_means = np.sort(base_means)
-        for i in range(1, len(base_means)):
-            if base_means[i] - base_means[i-1] < 0.8:
-                base_means[i] = base_means[i-1] + np.random.uniform(0.8, 1.5)
-        base_means = np.clip(base_means, 2, scale - 0.5)
-        np.random.shuffle(base_means)
-        sample_means = dict(zip(samples, base_means))
-    
-    for p in range(n_panels):
-        panel_bias = np.random.normal(0, 0.3) if random_fill else 0
-        for s in samples:
-            row = {'패널': f'P{p+1:02d}', '시료': s}
-            if random_fill:
-                score = np.random.normal(sample_means[s] + panel_bias, 0.7)
-                row['점수'] = int(np.clip(round(score), 1, scale))
-            else:
-                row['점수'] = ''
-            rows.append(row)
-    return pd.DataFrame(rows)
-
-
-def gen_discrimination_form(n_panels, test_type, random_fill=False,
-                             p_true=0.55, seed=None):
-    if seed is not None:
-        np.random.seed(seed)
-    p0 = 1/3 if "삼점" in test_type else 1/2
-    actual_p = p_true if p_true > p0 else p0
-    rows = []
-    for p in range(n_panels):
-        row = {'패널': f'P{p+1:02d}'}
-        if random_fill:
-            row['정답여부'] = int(np.random.random() < actual_p)
-        else:
-            row['정답여부'] = ''
-        rows.append(row)
-    return pd.DataFrame(rows)
-
-
-def gen_ranking_form(n_panels, samples, random_fill=False, seed=None):
-    if seed is not None:
-        np.random.seed(seed)
-    n_samples = len(samples)
-    true_pref = np.random.uniform(3, 8, n_samples) if random_fill else None
-    rows = []
-    for p in range(n_panels):
-        row = {'패널': f'P{p+1:02d}'}
-        if random_fill:
-            noisy_pref = true_pref + np.random.normal(0, 1.2, n_samples)
-            ranks = pd.Series(noisy_pref).rank(ascending=False, method='first').astype(int).tolist()
-            for s, r in zip(samples, ranks):
-                row[s] = r
-        else:
-            for s in samples:
-                row[s] = ''
-        rows.append(row)
-    return pd.DataFrame(rows)
-
-
-def gen_reliability_form(n_panels, samples, n_reps, random_fill=False, seed=None):
-    if seed is not None:
-        np.random.seed(seed)
-    rows = []
-    sample_means = {}
-    if random_fill:
-        base = np.random.uniform(5, 8, len(samples))
-        base = np.sort(base)
-        for i in range(1, len(base)):
-            if base[i] - base[i-1] < 0.8:
-                base[i] = base[i-1] + 1.0
-        sample_means = dict(zip(samples, base))
-    for p in range(n_panels):
-        panel_bias = np.random.normal(0, 0.5) if random_fill else 0
-        if random_fill:
-            panel_noise = np.random.uniform(0.3, 0.7) if np.random.random() < 0.8 else np.random.uniform(1.0, 1.8)
-        else:
-            panel_noise = 1.0
-        for s in samples:
-            for r in range(n_reps):
-                row = {'패널': f'P{p+1:02d}', '시료': s, '반복': r+1}
-                if random_fill:
-                    score = np.random.normal(sample_means[s] + panel_bias, panel_noise)
-                    row['점수'] = int(np.clip(round(score), 1, 9))
-                else:
-                    row['점수'] = ''
-                rows.append(row)
-    return pd.DataFrame(rows)
+# gen_anova_form / gen_discrimination_form / gen_ranking_form / gen_reliability_form /
+# gen_scaling_form → data.simulation_engine (Generator 기반 배열 생성)
 
 
 # 평점법 12항목 정의 (하위 호환용 리스트)
@@ -1452,6 +1371,18 @@ def load_beverage_db():
     return {'ingredients': [], 'market_products': [], 'beverage_specs': []}
 
 
+@st.cache_resource
+def load_ingredient_index():
+    """원료 매칭 인덱스 (load_beverage_db 결과로 1회 생성, 세션 간 공유)"""
+    return build_ingredient_index(load_beverage_db().get('ingredients', []))
+
+
+@st.cache_resource
+def load_market_index():
+    """시장제품 특성 행렬 + KD-tree 인덱스 (load_beverage_db 결과로 1회 생성, 세션 간 공유)"""
+    return build_market_index(load_beverage_db().get('market_products', []))
+
+
 def find_ingredient(name_query, ingredients_db):
     """원료 이름으로 DB에서 매칭 (퍼지 검색)
     
@@ -1461,48 +1392,13 @@ def find_ingredient(name_query, ingredients_db):
     
     Returns:
         매칭된 원료 dict 또는 None
+    
+    ingredients_db 대신 load_ingredient_index() 인덱스를 넘겨도 된다.
     """
     if not name_query or not ingredients_db:
         return None
-    
-    q = str(name_query).strip().replace(' ', '').lower()
-    if not q:
-        return None
-    
-    # 1차: 완전 일치 또는 부분 일치 (원료명)
-    for ing in ingredients_db:
-        ing_name = str(ing.get('name', '')).replace(' ', '').lower()
-        if not ing_name:
-            continue
-        if q == ing_name or q in ing_name or ing_name in q:
-            return ing
-    
-    # 2차: 소분류·대분류 매칭
-    for ing in ingredients_db:
-        sub = str(ing.get('category_sub', '')).replace(' ', '').lower()
-        main = str(ing.get('category_main', '')).replace(' ', '').lower()
-        if sub and (q in sub or sub in q):
-            return ing
-        if main and (q in main or main in q):
-            return ing
-    
-    # 3차: 키워드 기반 매핑 (자주 쓰는 용어)
-    keyword_map = {
-        '설탕': '백설탕', '사탕무당': '백설탕',
-        '과당': '고과당', 'hfcs': '고과당',
-        '물': '정제수', '정제수': '정제수',
-        '산미료': '구연산', '시트르산': '구연산',
-        '탄산': '정제수', 'co2': '정제수',
-        '우유': '전지유',
-        '소금': '정제염',
-    }
-    for kw, mapped in keyword_map.items():
-        if kw in q:
-            for ing in ingredients_db:
-                if mapped in str(ing.get('name', '')):
-                    return ing
-    
-    return None
+    # 1차 원료명 → 2차 소분류·대분류 → 3차 키워드 별칭 순 (인덱스는 DB 리스트당 1회 생성)
+    return match_ingredient(ingredient_index(ingredients_db), name_query)
 
 
 def calculate_physical_from_recipe(recipe_ingredients, db=None):
@@ -1527,6 +1423,9 @@ def calculate_physical_from_recipe(recipe_ingredients, db=None):
     """
     if db is None:
         db = load_beverage_db()
+        index = load_ingredient_index()
+    else:
+        index = ingredient_index(db.get('ingredients', []))
     ingredients_db = db.get('ingredients', [])
     
     if not ingredients_db:
@@ -1562,7 +1461,7 @@ def calculate_physical_from_recipe(recipe_ingredients, db=None):
         if ratio <= 0:
             continue
         
-        found = find_ingredient(name, ingredients_db)
+        found = match_ingredient(index, name)
         if found:
             brix_per = found.get('brix_per_1pct') or 0
             ph_delta = found.get('ph_delta_per_1pct') or 0
@@ -1654,44 +1553,20 @@ def load_ice_cream_db():
     return {'ingredients': {}, 'spec_ranges': {}}
 
 
+@st.cache_resource
+def load_ice_cream_index():
+    """빙과 원료 매칭 인덱스 + 계수 행렬 (load_ice_cream_db 결과로 1회 생성, 세션 간 공유)"""
+    return build_ice_cream_index(load_ice_cream_db())
+
+
 def find_ice_cream_ingredient(name_query, ice_cream_db):
-    """빙과 원료 퍼지 검색"""
-    if not name_query:
-        return None, None
-    ing_db = ice_cream_db.get('ingredients', {})
-    if not ing_db:
+    """빙과 원료 퍼지 검색 (완전 일치 → 부분 일치 → 키워드 매핑, 인덱스 기반)
+    ice_cream_db 대신 load_ice_cream_index() 인덱스를 넘기면 인덱스를 다시 만들지 않는다."""
+    index = ice_cream_index(ice_cream_db)
+    pos = match_ice_cream_ingredient(index, name_query)
+    if pos is None:
         return None, None
-    
-    q = str(name_query).strip().replace(' ', '').lower()
-    
-    # 1차: 완전 일치
-    for name, props in ing_db.items():
-        if q == name.replace(' ', '').lower():
-            return name, props
-    
-    # 2차: 부분 일치
-    for name, props in ing_db.items():
-        ing_name = name.replace(' ', '').lower()
-        if q in ing_name or ing_name in q:
-            return name, props
-    
-    # 3차: 키워드 매핑
-    keyword_map = {
-        '설탕': '백설탕', '정백당': '백설탕',
-        '우유': '원유',
-        '크림': '생크림',
-        '시럽': '물엿(DE42)',
-        '요거트': '플레인요구르트',
-        '요구르트': '플레인요구르트',
-        '물': '정제수',
-        '소금': '정제염',
-        '바닐라': '바닐라빈',
-    }
-    for kw, mapped in keyword_map.items():
-        if kw in q and mapped in ing_db:
-            return mapped, ing_db[mapped]
-    
-    return None, None
+    return index["names"][pos], index["props"][pos]
 
 
 def calculate_ice_cream_physical(recipe_ingredients, sub_type='아이스크림',
@@ -1709,6 +1584,7 @@ def calculate_ice_cream_physical(recipe_ingredients, sub_type='아이스크림',
         dict: TS, 상대감미, 유지방, MSNF, 비중, 예상빙점 등 15+ 항목
     """
     db = load_ice_cream_db()
+    index = load_ice_cream_index()
     ing_db = db.get('ingredients', {})
     spec_ranges = db.get('spec_ranges', {}).get(sub_type, 
                            db.get('spec_ranges', {}).get('아이스크림', {}))
@@ -1736,7 +1612,7 @@ def calculate_ice_cream_physical(recipe_ingredients, sub_type='아이스크림',
         if ratio <= 0:
             continue
         
-        found_name, props = find_ice_cream_ingredient(name, db)
+        found_name, props = find_ice_cream_ingredient(name, index)
         if not props:
             unmatched.append(name)
             continue
@@ -2169,52 +2045,10 @@ def format_qda_profile_for_prompt(qda):
 def find_similar_market_products(physical, category, db=None, top_n=3):
     """시장제품DB에서 유사 제품 찾기
     
-    이화학값(Brix, pH, 산도) 거리 기반 매칭
+    이화학값(Brix, pH, 산도) 가중 L1 거리 기반 매칭 (KD-tree 인덱스, 결측값은 거리에서 제외)
     """
-    if db is None:
-        db = load_beverage_db()
-    products = db.get('market_products', [])
-    if not products:
-        return []
-    
-    target_brix = physical.get('calculated_brix')
-    target_ph = physical.get('calculated_ph')
-    target_acidity = physical.get('calculated_acidity_pct')
-    
-    if target_brix is None:
-        return []
-    
-    # 카테고리 매칭 후보
-    candidates = []
-    for p in products:
-        p_main = str(p.get('category_main', ''))
-        p_sub = str(p.get('category_sub', ''))
-        # 카테고리 대분류 매칭 (완화)
-        if category == '음료' and '음료' not in p_main and '음료' not in p_sub:
-            if '과일' not in p_main and '탄산' not in p_main and '차' not in p_main:
-                continue
-        
-        p_brix = p.get('brix')
-        p_ph = p.get('ph')
-        p_acidity = p.get('acidity_pct')
-        if p_brix is None:
-            continue
-        
-        # 거리 계산 (Brix 비중 높게)
-        try:
-            p_brix = float(p_brix)
-            dist = abs(target_brix - p_brix) * 2.0
-            if target_ph and p_ph:
-                dist += abs(target_ph - float(p_ph)) * 3.0
-            if target_acidity and p_acidity:
-                dist += abs(target_acidity - float(p_acidity)) * 5.0
-            candidates.append((dist, p))
-        except (ValueError, TypeError):
-            continue
-    
-    # 거리 정렬 → 상위 N개
-    candidates.sort(key=lambda x: x[0])
-    return [c[1] for c in candidates[:top_n]]
+    mindex = load_market_index() if db is None else market_index(db.get('market_products', []))
+    return nearest_market_products(mindex, [physical], category, top_n=top_n)[0]
 
 
 def get_category_standard(category):
@@ -2421,32 +2255,6 @@ def evaluate_scaling_pass_status(mean_scores, category='기타', jar_optimal_ove
     }
 
 
-def gen_scaling_form(n_panels, product_name="시료A", random_fill=False, 
-                      pass_scenario=True, seed=None):
-    """평점법 (Scaling) 조사지 - 패널 × 12항목 (리커트 7점)
-    pass_scenario: True=합격 시나리오 생성, False=불합격
-    """
-    if seed is not None:
-        np.random.seed(seed)
-    rows = []
-    if random_fill:
-        # 항목별 기본 평균 (합격/불합격 시나리오)
-        if pass_scenario:
-            base_mean = {attr: np.random.uniform(5.2, 6.3) for attr in SCALING_ATTRIBUTES}
-        else:
-            base_mean = {attr: np.random.uniform(3.5, 4.8) for attr in SCALING_ATTRIBUTES}
-    
-    for p in range(n_panels):
-        panel_bias = np.random.normal(0, 0.4) if random_fill else 0
-        row = {'패널': f'P{p+1:02d}', '시료': product_name}
-        for attr in SCALING_ATTRIBUTES:
-            if random_fill:
-                score = np.random.normal(base_mean[attr] + panel_bias, 0.8)
-                row[attr] = int(np.clip(round(score), 1, 7))
-            else:
-                row[attr] = ''
-        rows.append(row)
-    return pd.DataFrame(rows)
 # ============================================================================
 # 페르소나 20명 (고정 프로필) — 한국 인구 분포 반영
 # ============================================================================
@@ -3560,58 +3368,13 @@ def friedman_rank_difference_test(rank_sums, n, k, alpha=0.05):
 
 def compute_homogeneous_groups(samples, rank_sums, pair_matrix):
     """동질군 a, b, ab 자동 계산 (Maximal Non-significant Intervals)
-    알고리즘: 
-    1. 순위합 오름차순 정렬
-    2. 각 시작점에서 가능한 최대 비유의 구간 찾기
-    3. 중복(포함) 구간 제거
-    4. 남은 최대 구간들에 letter 부여
+    순위합 오름차순 정렬 → 최대 비유의 구간마다 letter 부여
+    (ANOVA Tukey 동질군과 같은 구현: data.posthoc_engine.compact_letters)
     """
-    sorted_samples = sorted(samples, key=lambda s: rank_sums[s])
-    n = len(sorted_samples)
-    
-    # 1. 모든 최대 비유의 구간 [i, j]
-    maximal_intervals = []
-    for i in range(n):
-        j = i
-        for k in range(i + 1, n):
-            all_nonsig = True
-            for a in range(i, k):
-                if pair_matrix.get((sorted_samples[a], sorted_samples[k]), False):
-                    all_nonsig = False
-                    break
-            if all_nonsig:
-                j = k
-            else:
-                break
-        maximal_intervals.append((i, j))
-    
-    # 2. 다른 구간에 완전히 포함되는 것 제거
-    filtered = []
-    for a, b in maximal_intervals:
-        is_subset = False
-        for c, d in maximal_intervals:
-            if (c, d) != (a, b) and c <= a and b <= d:
-                is_subset = True
-                break
-        if not is_subset:
-            filtered.append((a, b))
-    filtered = list(set(filtered))
-    filtered.sort()
-    
-    # 3. 각 최대 구간에 letter 부여
-    groups = {s: set() for s in sorted_samples}
-    letters = 'abcdefghijk'
-    for idx, (a, b) in enumerate(filtered):
-        letter = letters[idx]
-        for k in range(a, b + 1):
-            groups[sorted_samples[k]].add(letter)
-    
-    # 4. 결과
-    result = {}
-    for s in samples:
-        sorted_letters = sorted(list(groups[s]))
-        result[s] = ''.join(sorted_letters) if sorted_letters else 'a'
-    return result
+    samples = list(samples)
+    sig = np.array([[pair_matrix.get((a, b), False) if a != b else False for b in samples]
+                    for a in samples], dtype=bool)
+    return compact_letters(samples, [rank_sums[s] for s in samples], sig)
 
 
 def friedman_chi_square_full(rank_sums, n, k, alpha=0.05):
@@ -4626,9 +4389,11 @@ def form_manager_ui(tab_key, form_type, scale=9):
                     key=f"{tab_key}_scn", horizontal=True)
                 seed = st.number_input("난수 시드", value=42, key=f"{tab_key}_seed")
             
-            blank = gen_scaling_form(n, prod_name, random_fill=False)
+            blank = gen_scaling_form(n, prod_name, random_fill=False,
+                attributes=SCALING_ATTRIBUTES)
             rand = gen_scaling_form(n, prod_name, random_fill=True,
-                pass_scenario=(pass_scenario == "합격 데이터"), seed=int(seed))
+                pass_scenario=(pass_scenario == "합격 데이터"), seed=int(seed),
+                attributes=SCALING_ATTRIBUTES)
             d1, d2 = st.columns(2)
             with d1:
                 df_to_csv_download(blank, f"평점법_조사지양식_{n}명.csv",
@@ -4678,6 +4443,101 @@ def form_manager_ui(tab_key, form_type, scale=9):
                 
                 st.markdown("**미리보기**:")
                 st.dataframe(rand.head(8), use_container_width=True)
+
+
+POWER_PLANNER = {
+    'anova': {'effects': "0.25, 0.4", 'max_n': 60, 'samples': True, 'reps': True,
+              'help': "Cohen f = 시료 평균 표준편차 ÷ 측정 오차 표준편차 (0.1 작음 · 0.25 중간 · 0.4 큼)"},
+    'ranking': {'effects': "0.5, 1.0", 'max_n': 60, 'samples': True, 'reps': False,
+                'help': "가장 선호·가장 비선호 시료의 선호도 차이 (패널 잡음 표준편차 단위, 시료는 등간격)"},
+    'scaling': {'effects': "0.3, 0.5", 'max_n': 80, 'samples': False, 'reps': False,
+                'help': f"실제 평균 − 합격선 {SCALING_THRESHOLD} (7점 척도 점수) — 단측 t 검정 기준"},
+}
+
+
+def power_planner_ui(tab_key, design, scale=None):
+    """각 탭 조사지 관리 아래 검정력 · 필요 패널 수 설계 UI"""
+    cfg = POWER_PLANNER[design]
+    with st.expander("🔋 검정력 · 필요 패널 수 설계", expanded=False):
+        closed_available = design in POWER_CLOSED_FORM
+        st.caption("닫힌 식(비중심 F·t)은 즉시 계산, 시뮬레이션은 가상 조사지로 실제 검정을 반복해 "
+                   "리커트 반올림까지 반영합니다." if closed_available else
+                   "순위법은 닫힌 식이 없어 가상 순위 조사지로 Friedman 검정을 반복합니다.")
+        c1, c2, c3, c4 = st.columns(4)
+        effects_str = c1.text_input("효과 크기 (쉼표 구분)", cfg['effects'], key=f"{tab_key}_pw_eff",
+                                    help=cfg['help'])
+        alphas = c2.multiselect("유의수준 α", [0.05, 0.01, 0.001], [0.05], key=f"{tab_key}_pw_a")
+        target = c3.selectbox("목표 검정력", [0.8, 0.9, 0.95], key=f"{tab_key}_pw_t")
+        max_n = c4.number_input("최대 패널 수", 10, 500, cfg['max_n'], 10, key=f"{tab_key}_pw_n")
+        d1, d2, d3 = st.columns(3)
+        n_samples = d1.number_input("시료 수", 2 if design == 'anova' else 3, 12, 3,
+                                    key=f"{tab_key}_pw_k") if cfg['samples'] else 1
+        n_reps = d2.number_input("반복 수", 1, 5, 1, key=f"{tab_key}_pw_r") if cfg['reps'] else 1
+        method = d3.radio("계산 방법", ["닫힌 식", "시뮬레이션"], key=f"{tab_key}_pw_m",
+                          horizontal=True) if closed_available else "시뮬레이션"
+        try:
+            effects = [float(e) for e in effects_str.split(",") if e.strip()]
+        except ValueError:
+            st.error("효과 크기는 숫자를 쉼표로 구분해 입력하세요.")
+            return
+        if not effects or not alphas:
+            return
+        effect_err = power_effect_error(design, effects)
+        if effect_err:
+            st.error(f"{effect_err} (입력: {effects_str})")
+            return
+
+        # 격자는 계산에 쓴 설정과 함께 저장 — 설정이 바뀌면 이전 시뮬레이션 곡선을 그대로 보여주지 않음
+        state_key = f"{tab_key}_pw_grid"
+        params = (method, tuple(effects), tuple(sorted(alphas)), int(n_samples), int(n_reps), int(max_n), scale)
+        try:
+            if method == "닫힌 식":
+                ns = list(range(2, int(max_n) + 1))
+                st.session_state[state_key] = {
+                    "params": params,
+                    "grid": power_grid(design, ns, effects, alphas, n_samples, n_reps)}
+            else:
+                n_sims = st.select_slider("가상 연구 수 (격자 칸당)", [500, 1000, 2000, 5000], 2000,
+                                          key=f"{tab_key}_pw_sims")
+                params += (n_sims,)
+                if st.button("🎲 시뮬레이션 실행", key=f"{tab_key}_pw_run"):
+                    step = max(1, int(max_n) // 20)
+                    ns = list(range(max(3, step), int(max_n) + 1, step))
+                    bar = st.progress(0.0, text="시뮬레이션 준비 중...")
+                    def _power_progress(done, total):
+                        bar.progress(done / total, text=f"{done}/{total} 격자 칸")
+                    st.session_state[state_key] = {
+                        "params": params,
+                        "grid": power_grid(design, ns, effects, alphas, n_samples, n_reps,
+                                           method="simulation", scale=scale, n_sims=n_sims,
+                                           on_progress=_power_progress)}
+                    bar.empty()
+        except ValueError as e:
+            st.error(f"검정력 계산 오류: {e}")
+            return
+
+        stored = st.session_state.get(state_key)
+        if not stored or stored["grid"].empty:
+            return
+        if stored["params"] != params:
+            st.info("설정이 바뀌었습니다 — 🎲 시뮬레이션 실행을 다시 눌러 곡선을 갱신하세요.")
+            return
+        grid = stored["grid"]
+        need = required_panels(grid, target)
+        st.dataframe(need.rename(columns={"필요 패널수": f"필요 패널수 (검정력 {target:.0%})"}),
+                     use_container_width=True, hide_index=True)
+        fig_pw = go.Figure()
+        for (effect, alpha), g in grid.groupby(["효과크기", "α"], sort=True):
+            fig_pw.add_trace(go.Scatter(x=g["패널수"], y=g["검정력"], mode="lines",
+                                        name=f"효과 {effect:g} · α={alpha:g}"))
+        fig_pw.add_hline(y=target, line_dash="dash", line_color="#10b981",
+                         annotation_text=f"목표 {target:.0%}")
+        fig_pw.update_layout(title=f"패널 수별 검정력 ({grid['방법'].iloc[0]})", xaxis_title="패널 수",
+                             yaxis_title="검정력", yaxis_range=[0, 1])
+        apply_plotly_theme(fig_pw)
+        st.plotly_chart(fig_pw, use_container_width=True)
+
+
 # ============================================================================
 # HTML 통합 리포트 생성 (기존 유지 + 확장)
 # ============================================================================
@@ -4911,6 +4771,7 @@ with tabs[0]:
     scale_value = 9 if "9점" in selected_scale else 7
     
     form_manager_ui("t1", "anova", scale=scale_value)
+    power_planner_ui("t1", "anova", scale=scale_value)
     
     st.divider()
     st.subheader("📤 조사지 업로드 & 분석")
@@ -4942,20 +4803,27 @@ with tabs[0]:
                 key="t1_pc")
             
             alpha = st.slider("유의수준 α", 0.001, 0.10, 0.05, 0.001, key="t1_a")
+            with_interaction = st.checkbox("시료×패널 상호작용 포함 (반복 측정 시)", value=False,
+                key="t1_inter", disabled=panel_col == "(없음)",
+                help="패널이 같은 시료를 2회 이상 평가한 경우에만 추정됩니다")
             
             if st.button("🚀 ANOVA 분석 실행", type="primary", key="t1_run") and score_col:
                 try:
+                    anova_res = run_anova(df, score_col, sample_col,
+                        None if panel_col == "(없음)" else panel_col, with_interaction)
+                    anova_table = anova_res['table']
                     if panel_col == "(없음)":
-                        formula = f"Q('{score_col}') ~ C(Q('{sample_col}'))"
                         model_type = "One-way ANOVA"
+                    elif anova_res['interaction']:
+                        model_type = "Two-way ANOVA (시료 + 패널 + 시료×패널)"
                     else:
-                        formula = f"Q('{score_col}') ~ C(Q('{sample_col}')) + C(Q('{panel_col}'))"
                         model_type = "Two-way ANOVA (시료 + 패널)"
                     
-                    model = ols(formula, data=df).fit()
-                    anova_table = anova_lm(model, typ=2)
-                    
                     st.subheader(f"📋 {model_type} 결과")
+                    if anova_res['method'] == 'statsmodels':
+                        st.caption("불균형 설계 — statsmodels 최소제곱(Type II)으로 계산")
+                    elif with_interaction and not anova_res['interaction']:
+                        st.caption("반복 측정이 없어 상호작용 항은 제외했습니다")
                     
                     # 지표 해석 expander (신규)
                     teaching_box("ANOVA 지표 정의 (F-value, p-value, p-adj 설명)",
@@ -5028,10 +4896,8 @@ with tabs[0]:
                     
                     # Tukey HSD
                     st.subheader("🔬 Tukey HSD 사후검정")
-                    tukey = pairwise_tukeyhsd(df[score_col], df[sample_col], alpha=alpha)
-                    tukey_df = pd.DataFrame(
-                        data=tukey._results_table.data[1:],
-                        columns=tukey._results_table.data[0])
+                    tukey_res = tukey_hsd(df[score_col], df[sample_col], alpha=alpha)
+                    tukey_df = tukey_res['table']
                     def highlight_sig(row):
                         return ['background-color: #d4edda' if row['reject'] else '' for _ in row]
                     st.dataframe(tukey_df.style.apply(highlight_sig, axis=1),
@@ -5045,6 +4911,9 @@ with tabs[0]:
                         st.success(f"✅ 유의차 쌍 ({len(sig_pairs)}개): {pair_text}")
                     else:
                         st.warning("⚠️ Tukey HSD에서 유의한 쌍이 없음 — 추가 분석 고려")
+                    st.markdown("**동질군** (같은 문자를 공유하면 유의차 없음)")
+                    st.dataframe(letters_table(tukey_res, sample_col).style.format({'평균': '{:.3f}'}),
+                        use_container_width=True, hide_index=True)
                     
                     # 시각화
                     st.subheader("📈 시각화")
@@ -5058,20 +4927,31 @@ with tabs[0]:
                     with c_v2:
                         summary = df.groupby(sample_col)[score_col].agg(['mean','std','count']).reset_index()
                         summary['se'] = summary['std']/np.sqrt(summary['count'])
+                        summary['동질군'] = summary[sample_col].map(tukey_res['letters'])
                         fig_bar = go.Figure()
                         fig_bar.add_trace(go.Bar(
                             x=summary[sample_col], y=summary['mean'],
                             error_y=dict(type='data', array=summary['se']),
                             marker_color=PLOTLY_THEME['colorway'][:len(summary)],
-                            text=summary['mean'].round(2), textposition='outside'))
+                            text=[f"{m:.2f} {g}" for m, g in zip(summary['mean'], summary['동질군'])],
+                            textposition='outside'))
                         fig_bar.update_layout(title=f"시료별 평균 ± SE",
                             yaxis_title=score_col, yaxis_range=[0, scale_value + 1])
                         apply_plotly_theme(fig_bar)
                         st.plotly_chart(fig_bar, use_container_width=True)
                     
+                    boot_ci = cluster_means(df, score_col, sample_col,
+                        None if panel_col == "(없음)" else panel_col)
+                    st.markdown("**시료 평균 95% 부트스트랩 CI** "
+                                f"({'패널' if panel_col != '(없음)' else '관측'} 단위 재표집 {N_BOOT:,}회)")
+                    st.dataframe(boot_ci.style.format({'평균': '{:.3f}', 'CI 하한': '{:.3f}',
+                        'CI 상한': '{:.3f}', '부트 SE': '{:.3f}'}),
+                        use_container_width=True, hide_index=True)
+                    
                     st.session_state.results['anova'] = {
                         'model_type': model_type, 'anova_table': anova_table,
-                        'tukey': tukey_df, 'alpha': alpha, 'summary': summary,
+                        'tukey': tukey_df, 'tukey_letters': tukey_res['letters'], 'boot_ci': boot_ci,
+                        'alpha': alpha, 'summary': summary,
                         'f_sample': f_sample, 'p_sample': p_sample,
                         'scale': scale_value
                     }
@@ -5101,6 +4981,61 @@ Tukey HSD:
                     import traceback
                     with st.expander("상세 오류"):
                         st.code(traceback.format_exc())
+            
+            # 다속성 일괄 분석 (QDA: 속성 컬럼 전체)
+            batch_panel = None if panel_col == "(없음)" else panel_col
+            attr_cols = attribute_columns(df, (sample_col, batch_panel))
+            with st.expander(f"🧮 다속성 일괄 분석 ({len(attr_cols)}개 속성)"):
+                st.caption("숫자형 속성 컬럼 전체에 ANOVA + Tukey HSD + Friedman을 한 번에 실행합니다. "
+                           "속성별 결과는 캐시되어 같은 데이터는 다시 계산하지 않습니다.")
+                batch_attrs = st.multiselect("분석 속성", attr_cols, default=attr_cols, key="t1_batch_attrs")
+                scaling_attrs = [a for a in batch_attrs if a in SCALING_ATTR_TYPES]
+                batch_cat = (st.selectbox("제품 카테고리 (평점법 합격 판정)", list(JAR_OPTIMAL_BY_CATEGORY),
+                                          key="t1_batch_cat") if scaling_attrs else None)
+                if st.button("🚀 전체 속성 분석", key="t1_batch_run", disabled=not batch_attrs):
+                    try:
+                        bar = st.progress(0.0, text="분석 준비 중...")
+                        def _batch_progress(done, total, attr):
+                            bar.progress(done / total, text=f"{done}/{total} — {attr}")
+                        batch_df, batch_details = analyze_attributes(
+                            df, batch_attrs, sample_col, batch_panel, alpha, on_progress=_batch_progress)
+                        bar.empty()
+                        
+                        n_sig = int(batch_df['유의'].sum())
+                        b1, b2, b3 = st.columns(3)
+                        b1.metric("분석 속성", f"{len(batch_df)}개")
+                        b2.metric("ANOVA 유의", f"{n_sig}개")
+                        b3.metric("Friedman 유의", f"{int((batch_df['Friedman p'] < alpha).sum())}개")
+                        st.dataframe(batch_df.style.format({
+                            'F': '{:.3f}', 'p': '{:.4f}', 'Friedman χ²': '{:.3f}', 'Friedman p': '{:.4f}'},
+                            na_rep='-'), use_container_width=True, hide_index=True)
+                        
+                        fig_batch = px.bar(batch_df.sort_values('F'), x='F', y='속성', orientation='h',
+                            color='유의', color_discrete_map={True: '#10b981', False: '#94a3b8'},
+                            title="속성별 시료 효과 F")
+                        fig_batch.update_layout(height=max(300, 24 * len(batch_df)))
+                        apply_plotly_theme(fig_batch)
+                        st.plotly_chart(fig_batch, use_container_width=True)
+                        
+                        batch_pass = None
+                        if scaling_attrs:
+                            means_tbl = sample_means(df, scaling_attrs, sample_col)
+                            batch_pass = pd.DataFrame([
+                                {'시료': smp, **{k: v for k, v in evaluate_scaling_pass_status(
+                                    row.dropna().to_dict(), category=batch_cat).items()
+                                    if k in ('pass_status', 'hedonic_passed', 'hedonic_total',
+                                             'jar_within', 'jar_total')}}
+                                for smp, row in means_tbl.iterrows()])
+                            st.markdown("**시료별 평점법 합격 판정**")
+                            st.dataframe(batch_pass, use_container_width=True, hide_index=True)
+                        
+                        st.session_state.results['anova_batch'] = {
+                            'summary': batch_df, 'alpha': alpha, 'pass': batch_pass,
+                            'tukey': {a: r['tukey'] for a, r in batch_details.items()},
+                            'letters': {a: r['letters'] for a, r in batch_details.items()}
+                        }
+                    except Exception as e:
+                        st.error(f"일괄 분석 오류: {e}")
 
 
 # ============================================================================
@@ -5195,14 +5130,8 @@ with tabs[1]:
                 alpha_u = c2.selectbox("유의수준 α", [0.05, 0.01, 0.001], key="t2_a_u")
                 
                 p0_u = 1/3 if "삼점" in tt_u else 1/2
-                r_u = binomtest(correct_u, total_u, p0_u, alternative='greater')
-                p_val_u = r_u.pvalue
-                
-                min_c_u = total_u
-                for x in range(total_u+1):
-                    if binomtest(x, total_u, p0_u, alternative='greater').pvalue < alpha_u:
-                        min_c_u = x
-                        break
+                p_val_u = discrimination_pvalue(correct_u, total_u, p0_u)
+                min_c_u = critical_count(total_u, p0_u, alpha_u)
                 
                 m1, m2, m3, m4 = st.columns(4)
                 m1.metric("정답률", f"{correct_u/total_u*100:.1f}%")
@@ -5256,13 +5185,8 @@ with tabs[1]:
             alpha = st.selectbox("유의수준 α", [0.05, 0.01, 0.001], key="t2_a_direct")
         with col2:
             p0 = 1/3 if "삼점" in tt else 1/2
-            r = binomtest(correct_p, total_p, p0, alternative='greater')
-            p_val = r.pvalue
-            min_c = total_p
-            for x in range(total_p+1):
-                if binomtest(x, total_p, p0, alternative='greater').pvalue < alpha:
-                    min_c = x
-                    break
+            p_val = discrimination_pvalue(correct_p, total_p, p0)
+            min_c = critical_count(total_p, p0, alpha)
             
             st.caption(f"P₀ = {p0:.4f}")
             m1, m2, m3 = st.columns(3)
@@ -5282,16 +5206,37 @@ with tabs[1]:
             }
     
     with st.expander("📚 표준 최소 정답자수 기준표"):
-        st.markdown("**삼점검정 (α=0.05)**")
-        st.dataframe(pd.DataFrame({
-            '패널수': [12,15,18,20,24,27,30,36,42,48,54,60],
-            '최소정답': [8,9,10,11,13,14,15,17,19,21,23,26]
-        }).T, use_container_width=True)
-        st.markdown("**일-이점검정 (α=0.05)**")
-        st.dataframe(pd.DataFrame({
-            '패널수': [10,12,15,18,20,24,30,36,42,48],
-            '최소정답': [8,9,11,13,15,17,20,23,26,29]
-        }).T, use_container_width=True)
+        st.caption("정확 이항분포 기준 — P(X ≥ 최소정답) < α 를 만족하는 최소 정답자 수")
+        st.markdown("**삼점검정**")
+        st.dataframe(critical_table(1/3, ns=[12,15,18,20,24,27,30,36,42,48,54,60]).T,
+                     use_container_width=True)
+        st.markdown("**일-이점검정**")
+        st.dataframe(critical_table(1/2, ns=[10,12,15,18,20,24,30,36,42,48]).T,
+                     use_container_width=True)
+    
+    with st.expander("🔋 검정력 · 필요 패널 수"):
+        pc1, pc2, pc3, pc4 = st.columns(4)
+        tt_pw = pc1.radio("검사 종류", ["삼점검정", "일-이점검정"], key="t2_pw_tt")
+        pd_pw = pc2.slider("구별자 비율 pd", 0.05, 0.8, 0.3, 0.05, key="t2_pw_pd",
+                           help="실제로 차이를 구별하는 패널 비율 (정답률 = pd + (1-pd)·P₀)")
+        alpha_pw = pc3.selectbox("유의수준 α", [0.05, 0.01, 0.001], key="t2_pw_a")
+        target_pw = pc4.selectbox("목표 검정력", [0.8, 0.9, 0.95], key="t2_pw_t")
+        p0_pw = 1/3 if "삼점" in tt_pw else 1/2
+        n_first, n_stable = sample_size(p0_pw, pd_pw, alpha_pw, target_pw)
+        m1, m2, m3 = st.columns(3)
+        m1.metric("정답률 p₁", f"{pd_pw + (1 - pd_pw) * p0_pw:.3f}")
+        m2.metric("최소 필요 패널", f"{n_first}명" if n_first else "2000명 초과")
+        m3.metric("이후 항상 충족", f"{n_stable}명" if n_stable else "-",
+                  help="이항분포 이산성 때문에 검정력은 패널 수에 따라 톱니 모양으로 변합니다")
+        curve = power_curve(p0_pw, pd_pw, alpha_pw, max_n=max(60, min(2000, (n_stable or n_first or 200) + 20)))
+        fig_pw = go.Figure(go.Scatter(x=curve["패널수"], y=curve["검정력"], mode="lines",
+                                      line=dict(color="#3b82f6")))
+        fig_pw.add_hline(y=target_pw, line_dash="dash", line_color="#10b981",
+                         annotation_text=f"목표 {target_pw:.0%}")
+        fig_pw.update_layout(title="패널 수별 검정력", xaxis_title="패널 수", yaxis_title="검정력",
+                             yaxis_range=[0, 1])
+        apply_plotly_theme(fig_pw)
+        st.plotly_chart(fig_pw, use_container_width=True)
     
     if st.button("🤖 Claude AI 해석", key="t2_ai") and st.session_state.api_key:
         r = st.session_state.results.get('discrimination', {})
@@ -5323,6 +5268,7 @@ with tabs[2]:
     teaching_highlight(TEACHING_CONTENT['ranking_teaching'])
     
     form_manager_ui("t3", "ranking")
+    power_planner_ui("t3", "ranking")
     
     st.divider()
     st.subheader("📤 조사지 업로드 & 분석")
@@ -5341,6 +5287,12 @@ with tabs[2]:
             help="예: 시료A, 시료B, 시료C ..."
         )
         alpha_r = st.slider("유의수준 α", 0.001, 0.10, 0.05, 0.001, key="t3_a")
+        ce1, ce2 = st.columns(2)
+        exact_r = ce1.checkbox("정확·순열 p-value 함께 계산", value=True, key="t3_exact",
+                               help="소규모 패널은 χ²·정규 근사가 부정확 — 귀무분포를 직접 계산 "
+                                    "(상태가 많으면 몬테카를로 순열)")
+        n_perm_r = ce2.number_input("최대 순열 수", 1000, 200000, 20000, 1000, key="t3_nperm",
+                                    disabled=not exact_r)
         
         if st.button("🚀 순위법 분석 실행 (3가지 검정)", type="primary", key="t3_run"):
             if len(sample_cols) < 2:
@@ -5364,12 +5316,15 @@ with tabs[2]:
                             rank_sums[s] = int(data_matrix[:, i].sum())
                         
                         st.subheader("📊 순위합 요약")
+                        rank_ci = rank_sum_ci(data_matrix, sample_cols).set_index('시료')
                         rs_df = pd.DataFrame([
-                            {'시료': s, '순위합': R, '평균순위': R/n}
+                            {'시료': s, '순위합': R, '평균순위': R/n,
+                             '95% CI': f"{rank_ci.loc[s, 'CI 하한']:g} ~ {rank_ci.loc[s, 'CI 상한']:g}"}
                             for s, R in sorted(rank_sums.items(), key=lambda x: x[1])
                         ])
                         st.dataframe(rs_df.style.format({'평균순위': '{:.2f}'}),
                                     use_container_width=True)
+                        st.caption(f"95% CI: 패널 단위 부트스트랩 {N_BOOT:,}회")
                         st.caption("💡 순위합이 **낮을수록 선호도 높음** (1=최상)")
                         
                         # ═══════════════════════════════════════════════════
@@ -5488,6 +5443,55 @@ with tabs[2]:
                                 f"임계값 {chi2_result['chi2_crit']:.3f}"
                             )
                         
+                        # ═══════════════════════════════════════════════════
+                        # (4) 정확 · 순열 검정 (소규모 패널)
+                        # ═══════════════════════════════════════════════════
+                        exact_result = None
+                        if exact_r:
+                            st.markdown("---")
+                            st.subheader("🎯 (4) 정확 · 순열 검정")
+                            rank_matrix = data_matrix.astype(float)
+                            exact_result = friedman_exact(rank_matrix, alpha=alpha_r,
+                                                          n_perm=int(n_perm_r), seed=0)
+                            method_label = ("정확 분포" if exact_result['method'] == 'exact'
+                                            else f"몬테카를로 순열 {exact_result['n_perm']:,}회")
+                            c1, c2, c3, c4 = st.columns(4)
+                            c1.metric("χ² (동점 보정)", f"{exact_result['chi2']:.3f}")
+                            c2.metric("근사 p", f"{exact_result['p_asymptotic']:.4f}")
+                            c3.metric("정확 p", f"{exact_result['p_value']:.4f}")
+                            c4.metric("계산 방식", method_label)
+                            if exact_result['method'] == 'monte-carlo':
+                                lo_ci, hi_ci = exact_result['ci']
+                                st.caption(f"💡 p-value 99% 구간 [{lo_ci:.4f}, {hi_ci:.4f}]"
+                                           + (" — α 판정이 확실해져 조기 종료" if exact_result['early_stop'] else ""))
+                            if exact_result['p_value'] < alpha_r:
+                                st.success(f"✅ 정확 검정에서도 **유의차 있음** (p={exact_result['p_value']:.4f})")
+                            else:
+                                st.warning(f"⚠️ 정확 검정 결과 **유의차 없음** (p={exact_result['p_value']:.4f})")
+                            
+                            ex_range_df, ex_range_info = rank_range_exact(rank_matrix, sample_cols, alpha_r)
+                            ex_diff_df, ex_diff_info = rank_difference_exact(rank_matrix, sample_cols, alpha_r)
+                            if ex_range_df is not None:
+                                ce1, ce2 = st.columns(2)
+                                with ce1:
+                                    st.markdown("**순위합 범위 검정 (정확)**")
+                                    st.dataframe(ex_range_df.style.format({'순위합': '{:g}', '정확 p': '{:.4f}'}),
+                                                 use_container_width=True, hide_index=True)
+                                    st.caption(f"💡 정확 유의 범위: 하한 {ex_range_info['R_lower'] if ex_range_info['R_lower'] is not None else '-'}"
+                                               f" / 상한 {ex_range_info['R_upper'] if ex_range_info['R_upper'] is not None else '-'}")
+                                with ce2:
+                                    st.markdown("**순위합 차이 검정 (정확)**")
+                                    st.dataframe(ex_diff_df.style.format(
+                                        {'|R1-R2|': '{:g}', '정확 p': '{:.4f}'}),
+                                        use_container_width=True, hide_index=True)
+                                    ex_homo = ex_diff_info['homogeneous_groups']
+                                    st.caption("💡 정확 임계값 |R1-R2| ≥ "
+                                               f"{ex_diff_info['threshold'] if ex_diff_info['threshold'] is not None else '-'}"
+                                               " · 동질군: " + ", ".join(f"{s_}({ex_homo[s_]})" for s_ in
+                                                   sorted(ex_homo, key=lambda x: rank_sums[x])))
+                            else:
+                                st.caption("순위가 0.5 단위가 아니어서 순위합 범위·차이 정확 검정은 생략")
+                        
                         # ═══════════════════════════════════════════════════
                         # 종합 시각화 (동질군 포함 막대그래프)
                         # ═══════════════════════════════════════════════════
@@ -5584,7 +5588,10 @@ with tabs[2]:
                             'df': chi2_result['df'],
                             'chi2_crit': chi2_result['chi2_crit'],
                             'range_test': range_df.to_dict(orient='records'),
-                            'diff_threshold': diff_info['threshold']
+                            'diff_threshold': diff_info['threshold'],
+                            'exact': ({k_: exact_result[k_] for k_ in
+                                       ('chi2', 'p_value', 'p_asymptotic', 'method', 'n_perm')}
+                                      if exact_result else None)
                         }
                         
                         # AI 해석
@@ -5612,6 +5619,7 @@ with tabs[2]:
 p-value = {chi2_result['p_value']:.4f}
 임계값 χ²({alpha_r}, df={chi2_result['df']}) = {chi2_result['chi2_crit']:.3f}
 결론: {'유의차 있음' if chi2_result['significant'] else '유의차 없음'}
+{f"정확·순열 p-value = {exact_result['p_value']:.4f} ({exact_result['method']})" if exact_result else ''}
 
 식품 R&D 관점에서 다음을 해석해주세요:
 1. 3가지 검정 결과의 종합 해석
@@ -5649,6 +5657,7 @@ with tabs[3]:
     
     # 4-1. 조사지 관리
     form_manager_ui("t4", "scaling")
+    power_planner_ui("t4", "scaling")
     
     st.divider()
     
@@ -5735,6 +5744,11 @@ with tabs[3]:
                             })
                     stats_df = pd.DataFrame(stats_rows)
                     mean_scores = dict(zip(stats_df['항목'], stats_df['평균']))
+                    # 패널 단위 부트스트랩 95% CI (항목별 결측 제외 평균)
+                    scale_matrix = dfsc[stats_df['항목'].tolist()].apply(pd.to_numeric, errors='coerce')
+                    scale_ci = bootstrap_stat(scale_matrix.to_numpy(dtype=float), np.nanmean)
+                    stats_df.insert(stats_df.columns.get_loc('SE') + 1, 'CI 하한', scale_ci['lower'])
+                    stats_df.insert(stats_df.columns.get_loc('CI 하한') + 1, 'CI 상한', scale_ci['upper'])
                     
                     # ──────────────────────────────
                     # 1. 통계 표
@@ -5748,9 +5762,11 @@ with tabs[3]:
                     st.dataframe(
                         stats_df.style
                         .apply(highlight_pass, axis=1)
-                        .format({'평균': '{:.2f}', 'SD': '{:.2f}', 'SE': '{:.3f}'}),
+                        .format({'평균': '{:.2f}', 'SD': '{:.2f}', 'SE': '{:.3f}',
+                                 'CI 하한': '{:.2f}', 'CI 상한': '{:.2f}'}),
                         use_container_width=True
                     )
+                    st.caption(f"CI: 패널 단위 부트스트랩 95% ({N_BOOT:,}회)")
                     
                     # ──────────────────────────────
                     # 2. 합격 판정 (3단계)
@@ -5807,6 +5823,11 @@ with tabs[3]:
                                              else f"최적 {opt} · {direction}")
                                 st.metric(jar_name, f"{score:.2f}", delta_str,
                                          delta_color="normal" if within else "inverse")
+                                jar_ci = (jar_deviation_ci(dfsc[jar_name], opt, tol)
+                                          if jar_name in dfsc.columns else None)
+                                if jar_ci:
+                                    st.caption(f"편차 95% CI {jar_ci['lower']:.2f}~{jar_ci['upper']:.2f} · "
+                                               f"적정 확률 {jar_ci['p_within']:.0%}")
                     
                     # ──────────────────────────────
                     # 3. 시각화
@@ -6472,7 +6493,60 @@ with tabs[3]:
                                     st.dataframe(match_df, use_container_width=True, hide_index=True)
                                 if unmatched:
                                     st.warning(f"⚠️ 매칭 실패: {', '.join(unmatched)}")
-                        
+
+                        # 빙점·경도 스윕 (원료 비율 × 오버런 격자를 한 번에 계산)
+                        if matched:
+                            with st.expander("📈 빙점·경도 스윕 (R&D 튜닝)"):
+                                sweep_recipe = [{'ingredient': m['input_name'], 'ratio_pct': m['ratio']}
+                                                for m in matched]
+                                sw1, sw2, sw3 = st.columns(3)
+                                sweep_ing = sw1.selectbox("변경할 원료", [m['input_name'] for m in matched],
+                                                          key="t4_ice_sweep_ing")
+                                base_ratio = next(m['ratio'] for m in matched if m['input_name'] == sweep_ing)
+                                sweep_lo, sweep_hi = sw2.slider(
+                                    "비율 범위(%)", 0.0, 60.0,
+                                    (max(0.0, round(base_ratio * 0.5, 1)), min(60.0, round(base_ratio * 1.5, 1))),
+                                    step=0.5, key="t4_ice_sweep_range")
+                                base_overrun = int(ice_data.get('overrun_pct', 70))
+                                sweep_overruns = sw3.multiselect("오버런(%)",
+                                                                 sorted({20, 30, 40, 50, 70, 90, 100, base_overrun}),
+                                                                 default=[base_overrun],
+                                                                 key="t4_ice_sweep_overrun")
+                                sweep_df = ice_cream_sweep(
+                                    sweep_recipe, load_ice_cream_index(), sweep_ing,
+                                    np.linspace(sweep_lo, sweep_hi, 21),
+                                    overrun_pct=sweep_overruns or [base_overrun],
+                                )
+                                sweep_df['오버런'] = sweep_df['overrun_pct'].map(lambda v: f"{v:g}%")
+                                curve = sweep_df.drop_duplicates('ratio_pct')
+                                fp_fig = go.Figure()
+                                fp_fig.add_trace(go.Scatter(x=curve['ratio_pct'], y=curve['predicted_freezing_point_c'],
+                                                            mode='lines+markers', name='예상빙점(°C)'))
+                                fp_fig.add_trace(go.Scatter(x=curve['ratio_pct'], y=curve['hardness'],
+                                                            mode='lines', name='경도(1~7)', yaxis='y2',
+                                                            line=dict(dash='dash')))
+                                fp_fig.update_layout(title="예상빙점·경도 곡선", xaxis_title=f'{sweep_ing} (%)',
+                                                     yaxis=dict(title='예상빙점(°C)'),
+                                                     yaxis2=dict(title='경도', overlaying='y', side='right',
+                                                                 range=[0.5, 7.5]),
+                                                     legend=dict(orientation='h', y=-0.25))
+                                hd_fig = px.line(sweep_df, x='ratio_pct', y='serving_volume_ml', color='오버런',
+                                                 labels={'ratio_pct': f'{sweep_ing} (%)',
+                                                         'serving_volume_ml': '1회분 부피(ml)'},
+                                                 title="1회분 부피 (오버런별)")
+                                sc1, sc2 = st.columns(2)
+                                sc1.plotly_chart(fp_fig, use_container_width=True)
+                                sc2.plotly_chart(hd_fig, use_container_width=True)
+                                st.dataframe(
+                                    curve[
+                                        ['ratio_pct', 'ts_pct', 'rel_sweetness', 'predicted_freezing_point_c',
+                                         'hardness', 'fpdf']
+                                    ].rename(columns={'ratio_pct': f'{sweep_ing}(%)', 'ts_pct': 'TS(%)',
+                                                      'rel_sweetness': '상대감미',
+                                                      'predicted_freezing_point_c': '예상빙점(°C)',
+                                                      'hardness': '경도(1~7)', 'fpdf': 'FPDF'}),
+                                    use_container_width=True, hide_index=True)
+
                         st.divider()
                     
                     # 물리화학 (음료/기타 - 기존 표시)
@@ -7899,57 +7973,10 @@ with tabs[4]:
             else:
                 if st.button("🚀 패널 신뢰도 분석", type="primary", key="t5_run"):
                     try:
-                        # 패널별 식별력
-                        discrim_rows = []
-                        for panel in sorted(dfrel['패널'].unique()):
-                            pd_panel = dfrel[dfrel['패널']==panel]
-                            agg = pd_panel.groupby('시료')['점수'].mean().reset_index()
-                            groups = [pd_panel[pd_panel['시료']==s]['점수'].values 
-                                     for s in agg['시료']]
-                            if len(groups) >= 2:
-                                f, p = f_oneway(*groups)
-                                discrim_rows.append({
-                                    '패널': panel, 'F': f, 'p-value': p,
-                                    '판정': '우수' if p<0.05 else '보통'
-                                })
-                        discrim_df = pd.DataFrame(discrim_rows)
-                        
-                        # 패널별 CV
-                        cv_rows = []
-                        for panel in sorted(dfrel['패널'].unique()):
-                            cvs = []
-                            for s in dfrel['시료'].unique():
-                                scores = dfrel[(dfrel['패널']==panel)&(dfrel['시료']==s)]['점수']
-                                if scores.mean() > 0 and len(scores) > 1:
-                                    cvs.append(scores.std()/scores.mean()*100)
-                            if cvs:
-                                avg_cv = np.mean(cvs)
-                                cv_rows.append({
-                                    '패널': panel,
-                                    '평균 CV(%)': avg_cv,
-                                    '판정': ('매우 일관' if avg_cv < 10 
-                                           else '일관' if avg_cv < 20 
-                                           else '편차 큼')
-                                })
-                        cv_df = pd.DataFrame(cv_rows)
-                        
-                        # ICC
-                        try:
-                            avg_by_panel_sample = dfrel.groupby(['패널','시료'])['점수'].mean().reset_index()
-                            wide = avg_by_panel_sample.pivot(index='시료', columns='패널', values='점수')
-                            
-                            n_samples = wide.shape[0]
-                            k_panels = wide.shape[1]
-                            grand_mean = wide.values.mean()
-                            msb = n_samples * wide.mean(axis=0).var(ddof=1)
-                            msw = wide.var(axis=1, ddof=1).mean()
-                            
-                            if msw > 0 and (msb + (k_panels - 1) * msw) > 0:
-                                icc = (msb - msw) / (msb + (k_panels - 1) * msw)
-                            else:
-                                icc = 0
-                        except Exception:
-                            icc = 0
+                        # 패널 × 시료 × 반복 배열 한 번 구성 → 식별력·CV·ICC·반복성 일괄 계산
+                        rel = analyze_reliability(dfrel)
+                        discrim_df, cv_df, icc = rel['discrim_df'], rel['cv_df'], rel['icc']
+                        repeat_df, cronbach = rel['repeat_df'], rel['cronbach_alpha']
                         
                         c1, c2, c3 = st.columns(3)
                         c1.metric("ICC", f"{icc:.3f}",
@@ -7983,8 +8010,20 @@ with tabs[4]:
                             st.dataframe(cv_df.style.format({'평균 CV(%)':'{:.2f}'}),
                                 use_container_width=True)
                         
+                        st.subheader("반복성 · 합의도")
+                        r1, r2 = st.columns([1, 3])
+                        r1.metric("Cronbach α (패널=항목)",
+                            "-" if np.isnan(cronbach) else f"{cronbach:.3f}",
+                            help="시료별 패널 평균으로 계산 — 0.7 이상이면 패널 간 순위 판단이 일관")
+                        r1.caption("제외 시 α가 전체 α보다 높은 패널은 패널 합의를 낮추는 패널입니다.")
+                        r2.dataframe(repeat_df.style.format({
+                            '반복성 SD': '{:.3f}', '반복성 한계': '{:.3f}',
+                            '합의 상관 r': '{:.3f}', '제외 시 α': '{:.3f}'}, na_rep='-'),
+                            use_container_width=True, hide_index=True)
+                        
                         st.session_state.results['reliability'] = {
-                            'discrim_df': discrim_df, 'cv_df': cv_df, 'icc': icc
+                            'discrim_df': discrim_df, 'cv_df': cv_df, 'icc': icc,
+                            'repeat_df': repeat_df, 'cronbach_alpha': cronbach
                         }
                         
                         if st.session_state.api_key:
@@ -8063,7 +8102,11 @@ with tabs[6]:
         project = st.text_input("프로젝트명", "2026 신제품 개발 — 복숭아 RTD",
             key="t7_pn")
         author = st.text_input("작성자", "류지성 (Sweet Lab)", key="t7_au")
-        
+        stored_kb = (st.session_state.results.disk_bytes()
+                     + st.session_state.interpretations.disk_bytes()) / 1024
+        st.caption(f"💾 분석 결과 {len(st.session_state.results)}건 · 표는 세션 임시 저장소 "
+                   f"({stored_kb:,.1f} KB)에서 필요할 때 읽어옵니다")
+
         available = []
         if 'anova' in st.session_state.results: available.append("ANOVA")
         if 'discrimination' in st.session_state.results: available.append("차이식별")